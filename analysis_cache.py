@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from packet_extraction import DECODER_VERSION
+from packet_record import PacketRecord, LivePacketRecord
+from packet_table import PacketTable, StringColumn, BlobColumn, PayloadColumn
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".analysis_cache")
+CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+FORMAT_VERSION = 2
+NUMERIC_COLUMNS = ("ts_ns", "size", "src_port", "dst_port", "ports_shown", "l4", "tcp_flags")
+DIGEST_INDEX = "digests.json"
+STALE_TEMP_SECONDS = 24 * 60 * 60
+
+
+def _read_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, data):
+    directory = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def file_digest(file_path, cache_dir=CACHE_DIR):
+    """Content digest of a capture, memoised per (path, size, mtime) so unchanged files are hashed once."""
+    stat = os.stat(file_path)
+    path = os.path.abspath(file_path)
+    index_path = os.path.join(cache_dir, DIGEST_INDEX)
+    index = _read_json(index_path, {})
+    entry = index.get(path)
+    if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+        return entry[2]
+
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    digest = digest.hexdigest()
+    os.makedirs(cache_dir, exist_ok=True)
+    index = {known: entry for known, entry in _read_json(index_path, {}).items() if os.path.exists(known)}
+    index[path] = [stat.st_size, stat.st_mtime_ns, digest]
+    _write_json(index_path, index)
+    return digest
+
+
+def cache_key(file_path, filters=None, display_filter=None, timestamp_format=None, cache_dir=CACHE_DIR,
+              time_range=None):
+    """Key of an analysis; ``file_path`` may also be a list of captures merged into one stream."""
+    filters = filters or {}
+    if isinstance(file_path, (list, tuple)):
+        digest = [file_digest(path, cache_dir) for path in file_path]
+    else:
+        digest = file_digest(file_path, cache_dir)
+    parts = [FORMAT_VERSION, DECODER_VERSION, digest, display_filter or "",
+             filters.get("ip_a") or "", filters.get("ip_b") or "", timestamp_format or "", time.tzname,
+             list(time_range) if time_range else None]
+    return hashlib.blake2b(json.dumps(parts).encode('utf-8'), digest_size=20).hexdigest()
+
+
+def lookup(file_path, filters=None, display_filter=None, timestamp_format=None, cache_dir=CACHE_DIR, time_range=None):
+    """Return ``(key, cached)`` where ``cached`` is what ``load`` gives; the key is None if the file can't be read."""
+    try:
+        key = cache_key(file_path, filters, display_filter, timestamp_format, cache_dir, time_range)
+    except OSError:
+        return None, None
+    return key, load(key, cache_dir)
+
+
+def load(key, cache_dir=CACHE_DIR):
+    """Return ``(table, protocol_counts)`` for a cached analysis, or None on a miss."""
+    entry = os.path.join(cache_dir, key)
+    meta = _read_json(os.path.join(entry, "meta.json"), None)
+    if meta is None or meta.get("version") != FORMAT_VERSION:
+        return None
+    try:
+        columns = {name: np.load(os.path.join(entry, name + ".npy"), mmap_mode='r') for name in NUMERIC_COLUMNS}
+        for name in ("timestamp", "protocol", "src_ip", "dst_ip"):
+            columns[name] = StringColumn(np.load(os.path.join(entry, name + ".npy"), mmap_mode='r'),
+                                         meta["values"][name])
+        # Payloads are stored unrendered; the table renders the rows that are read.
+        payload = BlobColumn(np.load(os.path.join(entry, "payload_offsets.npy"), mmap_mode='r'),
+                             np.load(os.path.join(entry, "payload.npy"), mmap_mode='r'), text=False)
+        columns["payload"] = PayloadColumn(payload)
+    except (OSError, ValueError, KeyError):
+        return None
+    os.utime(entry)
+    table = PacketTable(record_type=LivePacketRecord if meta["live"] else PacketRecord, **columns)
+    return table, meta["protocol_counts"]
+
+
+def store(key, table, protocol_counts, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = os.path.join(cache_dir, key)
+    temp_entry = tempfile.mkdtemp(dir=cache_dir, prefix=key + ".")
+    try:
+        for name in NUMERIC_COLUMNS:
+            np.save(os.path.join(temp_entry, name + ".npy"), getattr(table, name))
+        values = {}
+        for name in ("timestamp", "protocol", "src_ip", "dst_ip"):
+            column = getattr(table, name)
+            np.save(os.path.join(temp_entry, name + ".npy"), column.codes)
+            values[name] = column.values
+        payload = table.payload.stored()
+        np.save(os.path.join(temp_entry, "payload_offsets.npy"), payload.offsets)
+        np.save(os.path.join(temp_entry, "payload.npy"), payload.blob)
+        _write_json(os.path.join(temp_entry, "meta.json"), {
+            "version": FORMAT_VERSION,
+            "live": table.record_type is LivePacketRecord,
+            "values": values,
+            "protocol_counts": dict(protocol_counts),
+        })
+        if os.path.isdir(entry):
+            shutil.rmtree(entry, ignore_errors=True)
+        os.replace(temp_entry, entry)
+    except OSError:
+        shutil.rmtree(temp_entry, ignore_errors=True)
+        return
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """Drop least recently used entries until the cache fits in ``max_bytes``.
+
+    ``<key>.*`` directories are entries another writer is still storing;
+    they are left alone unless they are a day old, i.e. abandoned.
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if not os.path.isdir(path):
+            continue
+        if "." in name:
+            try:
+                abandoned = time.time() - os.path.getmtime(path) > STALE_TEMP_SECONDS
+            except OSError:
+                # Renamed into place (or removed) by its writer meanwhile.
+                continue
+            if abandoned:
+                shutil.rmtree(path, ignore_errors=True)
+            continue
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        entries.append((os.path.getmtime(path), size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
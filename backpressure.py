@@ -0,0 +1,111 @@
+import threading
+
+from collections import deque
+
+POLICIES = ("block", "drop-oldest", "sample", "aggregate-only")
+DEFAULT_POLICY = "drop-oldest"
+SAMPLE_EVERY = 10
+
+
+class PacketQueue:
+    """Bounded queue between a packet producer and the Socket.IO emitter, with an explicit policy for a full queue.
+
+    ``block`` makes the producer wait for room, ``drop-oldest`` discards the
+    oldest queued packet, ``sample`` admits only every ``sample_every``-th
+    packet once the queue is half full (still dropping the oldest when it is
+    full) and ``aggregate-only`` queues nothing, keeping per-protocol packet
+    and byte totals instead. The counters account for every packet offered:
+    it ends up emitted, dropped (whether turned away or pushed out of the
+    queue later), aggregated or still queued.
+    """
+
+    def __init__(self, maxsize, policy=DEFAULT_POLICY, sample_every=SAMPLE_EVERY):
+        self.maxsize = maxsize
+        self.sample_every = sample_every
+        self._packets = deque()
+        self._aggregates = {}
+        self._lock = threading.Condition()
+        self.policy = None
+        self.set_policy(policy)
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.offered = 0
+        self.enqueued = 0
+        self.dropped = 0
+        self.aggregated = 0
+        self.emitted = 0
+
+    def set_policy(self, policy):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy {policy!r}, expected one of: {', '.join(POLICIES)}")
+        with self._lock:
+            self.policy = policy
+            # Producers blocked under the old policy re-check the queue.
+            self._lock.notify_all()
+
+    def put(self, packet):
+        with self._lock:
+            self.offered += 1
+            if self.policy == "aggregate-only":
+                self._aggregate(packet)
+                return
+            if self.policy == "block":
+                while len(self._packets) >= self.maxsize and self.policy == "block":
+                    self._lock.wait()
+            elif (self.policy == "sample" and len(self._packets) >= self.maxsize // 2
+                  and self.offered % self.sample_every):
+                self.dropped += 1
+                return
+            if len(self._packets) >= self.maxsize:
+                self._packets.popleft()
+                self.dropped += 1
+            self._packets.append(packet)
+            self.enqueued += 1
+
+    def _aggregate(self, packet):
+        totals = self._aggregates.get(packet["protocol"])
+        if totals is None:
+            totals = self._aggregates[packet["protocol"]] = {"packets": 0, "bytes": 0}
+        totals["packets"] += 1
+        totals["bytes"] += packet["size"]
+        self.aggregated += 1
+
+    def get_batch(self, limit):
+        """Up to ``limit`` queued packets, oldest first; they are counted as emitted."""
+        with self._lock:
+            count = min(limit, len(self._packets))
+            batch = [self._packets.popleft() for _ in range(count)]
+            self.emitted += count
+            if count:
+                self._lock.notify_all()
+            return batch
+
+    def take_aggregates(self):
+        """Per-protocol totals aggregated since the previous call."""
+        with self._lock:
+            aggregates, self._aggregates = self._aggregates, {}
+            return aggregates
+
+    def clear(self):
+        """Drop everything queued or aggregated and start counting afresh."""
+        with self._lock:
+            self._packets.clear()
+            self._aggregates = {}
+            self._reset_counters()
+            self._lock.notify_all()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "policy": self.policy,
+                "queued": len(self._packets),
+                "offered": self.offered,
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "aggregated": self.aggregated,
+                "emitted": self.emitted,
+            }
+
+    def __len__(self):
+        return len(self._packets)
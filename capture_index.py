@@ -0,0 +1,180 @@
+import json
+import mmap
+import os
+import tempfile
+
+import numpy as np
+
+import pcap_reader
+
+INDEX_SUFFIX = ".idx"
+FORMAT_VERSION = 1
+INDEX_DTYPE = np.dtype([("frame", "<i8"), ("offset", "<i8"), ("ts_ns", "<i8"), ("flow", "<u4"), ("section", "<i4")])
+
+
+class CaptureIndex:
+    """Per-record index of a capture: frame number, file offset, timestamp and flow hash.
+
+    ``section`` points into ``states``, the pcapng byte order and interface
+    table needed to resume decoding at that record (always -1 for pcap).
+    """
+
+    def __init__(self, records, states, size, mtime_ns):
+        self.records = records
+        self.states = states
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def ts_ns(self):
+        return self.records["ts_ns"]
+
+    @property
+    def offsets(self):
+        return self.records["offset"]
+
+    def state(self, row):
+        section = int(self.records["section"][row])
+        if section < 0:
+            return None
+        endian, interfaces = self.states[section]
+        return endian, tuple(tuple(interface) for interface in interfaces)
+
+    def byte_range(self, first, last):
+        """``(start, end, state)`` covering rows ``first`` up to but excluding ``last``, as taken by ``iter_frames``."""
+        start = int(self.offsets[first]) if first < len(self) else self.size
+        end = int(self.offsets[last]) if last < len(self) else self.size
+        return start, end, self.state(first) if first < len(self) else None
+
+    def time_slice(self, start_ns, end_ns):
+        """Byte range of the records with ``start_ns <= ts_ns < end_ns``, found by binary search.
+
+        Captures whose timestamps go backwards fall back to the span between
+        the first and last matching record.
+        """
+        ts_ns = self.ts_ns
+        if len(ts_ns) < 2 or bool(np.all(ts_ns[1:] >= ts_ns[:-1])):
+            first = int(np.searchsorted(ts_ns, start_ns, side="left"))
+            last = int(np.searchsorted(ts_ns, end_ns, side="left"))
+        else:
+            rows = np.flatnonzero((ts_ns >= start_ns) & (ts_ns < end_ns))
+            first, last = (int(rows[0]), int(rows[-1]) + 1) if len(rows) else (len(self), len(self))
+        return self.byte_range(first, max(first, last))
+
+    def flow_rows(self, flow):
+        return np.flatnonzero(self.records["flow"] == flow)
+
+
+def index_path(file_path):
+    return file_path + INDEX_SUFFIX
+
+
+def _pcapng_sections(file_path):
+    # Offsets at which the pcapng byte order or interface table changes,
+    # paired with the state that applies from there on.
+    with open(file_path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        starts, states = [], []
+        for offset, block_type, block_len, endian, interfaces in pcap_reader._iter_pcapng_blocks(mm):
+            if block_type == 1 or block_type == 0x0A0D0D0A:
+                starts.append(offset + block_len)
+                states.append([endian, [list(interface) for interface in interfaces]])
+        return starts, states
+    finally:
+        mm.close()
+
+
+def build_index(file_path):
+    stat = os.stat(file_path)
+    recorder = pcap_reader.IndexRecorder()
+    for _ in recorder.track(pcap_reader.iter_frames(file_path, offsets=True)):
+        pass
+    return recorded_index(file_path, recorder, stat)
+
+
+def recorded_index(file_path, recorder, stat=None):
+    """Index of ``file_path`` from the records a ``pcap_reader.IndexRecorder`` collected over the whole file."""
+    stat = stat or os.stat(file_path)
+    offsets, timestamps, flows = recorder.recorded()
+    records = np.zeros(len(offsets), dtype=INDEX_DTYPE)
+    records["frame"] = np.arange(1, len(offsets) + 1)
+    records["offset"] = offsets
+    records["ts_ns"] = timestamps
+    records["flow"] = flows
+    records["section"] = -1
+    states = []
+    with open(file_path, 'rb') as f:
+        magic = f.read(4)
+    if magic == pcap_reader.PCAPNG_SHB and len(records):
+        starts, states = _pcapng_sections(file_path)
+        records["section"] = np.searchsorted(np.array(starts, dtype=np.int64), records["offset"], side="right") - 1
+    return CaptureIndex(records, states, stat.st_size, stat.st_mtime_ns)
+
+
+def save_index(index, path):
+    meta = {"version": FORMAT_VERSION, "size": index.size, "mtime_ns": index.mtime_ns, "states": index.states}
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, records=index.records, meta=np.array(json.dumps(meta)))
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_index(path):
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta.get("version") != FORMAT_VERSION:
+            return None
+        return CaptureIndex(data["records"], meta["states"], meta["size"], meta["mtime_ns"])
+
+
+def save_recorded(file_path, recorder):
+    """Save the index a full decode pass recorded next to the capture; it stays in memory only if that fails."""
+    index = recorded_index(file_path, recorder)
+    try:
+        save_index(index, index_path(file_path))
+    except OSError:
+        pass
+    return index
+
+
+def has_index(file_path):
+    """Whether ``file_path`` has an up-to-date index saved next to it; only the index metadata is read."""
+    stat = os.stat(file_path)
+    try:
+        with np.load(index_path(file_path), allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+    except (OSError, ValueError, KeyError):
+        return False
+    return (meta.get("version") == FORMAT_VERSION and meta.get("size") == stat.st_size
+            and meta.get("mtime_ns") == stat.st_mtime_ns)
+
+
+def load_index(file_path, build=True):
+    """Index of ``file_path``, read from its ``.idx`` file or built (and saved next to it) when missing or stale."""
+    stat = os.stat(file_path)
+    path = index_path(file_path)
+    try:
+        index = read_index(path)
+    except (OSError, ValueError, KeyError):
+        index = None
+    if index is not None and index.size == stat.st_size and index.mtime_ns == stat.st_mtime_ns:
+        return index
+    if not build:
+        return None
+    index = build_index(file_path)
+    try:
+        save_index(index, path)
+    except OSError:
+        pass
+    return index
@@ -0,0 +1,227 @@
+import json
+import os
+import tempfile
+import time
+
+from datetime import datetime
+
+PACKETS_LOG = "captured_packets.ndjson"
+DATA_USAGE_LOG = "data_usage.ndjson"
+FSYNC_INTERVAL = 1.0
+MAX_LOG_BYTES = 256 * 1024 * 1024
+REPLACE_ATTEMPTS = 5
+REPLACE_RETRY_DELAY = 0.05
+ROTATE_RETRY_INTERVAL = 5.0
+
+
+class AppendLog:
+    """Append-only NDJSON file holding one JSON document per line.
+
+    Every ``write`` is flushed so readers can follow the file while it grows;
+    it is fsynced at most once per ``fsync_interval`` seconds. Past
+    ``max_bytes`` the file is rotated: it atomically becomes ``<path>.1`` and
+    writing continues in a fresh file. Should a reader keep the log open so
+    long that it cannot be renamed (Windows refuses that), rotation is put
+    off and writing carries on in the same file.
+    """
+
+    def __init__(self, path, fsync_interval=FSYNC_INTERVAL, max_bytes=MAX_LOG_BYTES):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._last_sync = time.monotonic()
+        self._rotate_after = 0.0
+
+    def write(self, records):
+        self._file.write("".join(json.dumps(record) + "\n" for record in records))
+        self._file.flush()
+        if time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+        if self.max_bytes and self._file.tell() >= self.max_bytes and time.monotonic() >= self._rotate_after:
+            self.rotate()
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+
+    def rotate(self):
+        self.sync()
+        self._file.close()
+        try:
+            _retry_while_open(os.replace, self.path, self.path + ".1")
+        except PermissionError:
+            self._rotate_after = time.monotonic() + ROTATE_RETRY_INTERVAL
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def reset(self):
+        self._file.close()
+        clear(self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+
+def clear(path):
+    """Replace a log with an empty one and drop its rotated segment.
+
+    Readers see either the old file or the empty one, never a partial one.
+    A file that a reader holds open throughout is emptied in place instead;
+    readers notice it got shorter and start over.
+    """
+    try:
+        _retry_while_open(os.remove, path + ".1")
+    except FileNotFoundError:
+        pass
+    except PermissionError:
+        _truncate(path + ".1")
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    os.close(fd)
+    try:
+        _retry_while_open(os.replace, temp_path, path)
+    except PermissionError:
+        os.remove(temp_path)
+        _truncate(path)
+
+
+def _retry_while_open(operation, *paths):
+    """Run ``operation`` on ``paths``, retrying for a while on PermissionError.
+
+    Windows will not rename or delete a file that another process opened
+    without share-delete access; the log readers only hold it for one read.
+    """
+    for attempt in range(REPLACE_ATTEMPTS):
+        try:
+            return operation(*paths)
+        except PermissionError:
+            if attempt == REPLACE_ATTEMPTS - 1:
+                raise
+            time.sleep(REPLACE_RETRY_DELAY * (attempt + 1))
+
+
+def _truncate(path):
+    open(path, 'w').close()
+
+
+def data_usage_entry(second, size):
+    return {"timestamp": datetime.fromtimestamp(second).strftime("%H:%M:%S"), "ts": second, "data_usage": str(size)}
+
+
+def _parse_lines(lines):
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+
+def read_records(path):
+    """Documents of an NDJSON log, starting with those rotated out to ``<path>.1``.
+
+    A last line that is still being written is left out.
+    """
+    return _read_complete(path + ".1") + _read_complete(path)
+
+
+def _read_complete(path):
+    records = []
+    try:
+        f = open(path, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        return records
+    with f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            records.extend(_parse_lines([line]))
+    return records
+
+
+class LogTail:
+    """Follows a growing NDJSON log by byte offset, parsing only what was appended since the previous read.
+
+    The first read starts with the rotated ``<path>.1`` segment, if any. The
+    file being replaced is told apart by its inode: when the old one now
+    sits at ``<path>.1`` the log was rotated and reading carries on across
+    both files; otherwise it was cleared for a new capture session, as it
+    also was when the file got shorter than the offset.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.inode = None
+
+    def read(self):
+        """``(records, reset)``; after ``reset`` the records start a new session."""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return [], False
+        with f:
+            stat = os.fstat(f.fileno())
+            records = []
+            reset = False
+            if self.inode is None:
+                records = self._read_from(self.path + ".1")
+                self.offset = 0
+            elif stat.st_ino != self.inode:
+                if _inode(self.path + ".1") == self.inode:
+                    records = self._read_from(self.path + ".1")
+                else:
+                    reset = True
+                self.offset = 0
+            elif stat.st_size < self.offset:
+                reset = True
+                self.offset = 0
+            self.inode = stat.st_ino
+            records.extend(self._read_lines(f))
+        return records, reset
+
+    def _read_from(self, path):
+        try:
+            with open(path, 'rb') as f:
+                return self._read_lines(f)
+        except FileNotFoundError:
+            return []
+
+    def _read_lines(self, f):
+        f.seek(self.offset)
+        data = f.read()
+        # A last line without its newline is still being written; it is read next time.
+        end = data.rfind(b"\n") + 1
+        self.offset += end
+        return _parse_lines(data[:end].splitlines())
+
+
+def _inode(path):
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+
+def read_packets(path):
+    return read_records(path)
+
+
+def read_data_usage(path):
+    """Per-second totals from a data-usage log, in time order.
+
+    The sniffer appends the bytes seen since its previous write, so one
+    second can appear on several lines; they are summed here.
+    """
+    totals = {}
+    for entry in read_records(path):
+        totals[entry["ts"]] = totals.get(entry["ts"], 0) + int(entry["data_usage"])
+    return [data_usage_entry(second, size) for second, size in sorted(totals.items())]
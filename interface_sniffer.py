@@ -1,6 +1,4 @@
 import argparse
-import asyncio
-import pyshark
 import threading
 import queue
 import curses
@@ -9,32 +7,19 @@ import json
 import csv
 import os
 import sys
+import capture_log
+import tshark_fields
 
 from datetime import datetime
+from packet_extraction import clip_payload
+from packet_record import to_dicts
 from pcap_analyzer import clean_string, wrap_text
+from ring_buffer import RingBuffer
+from shared_ring import PacketRing
 
 python_cmd = sys.executable
-
-def write_packets_to_json(packets, json_file):
-    directory = os.path.dirname(json_file)
-    if directory and not os.path.exists(directory):
-        os.makedirs(directory)
-
-    data = {
-        "packets": packets
-    }
-    with open(json_file, 'w') as f:
-        json.dump(data, f, indent=4)
-
-def write_data_usage_to_json(data_usage, json_file):
-    directory = os.path.dirname(json_file)
-    if directory and not os.path.exists(directory):
-        os.makedirs(directory)
-
-    data_usage_list = [{"timestamp": str(timestamp), "data_usage": str(size)} for timestamp, size in data_usage.items()]
-
-    with open(json_file, 'w') as f:
-        json.dump(data_usage_list, f, indent=4)
+# Rendered lines kept for scrolling; older packets stay available in the capture log.
+MAX_PACKET_LINES = 10000
 
 def export_packets(stdscr, packet_data, interface_name):
     if not packet_data:
@@ -85,7 +70,7 @@ def export_packets(stdscr, packet_data, interface_name):
     if choice in [2, 3]:
         json_path = f"{base_export_path}.json"
         with open(json_path, 'w', encoding='utf-8') as jsonfile:
-            json.dump({"packets": packet_data}, jsonfile, indent=4)
+            json.dump({"packets": to_dicts(packet_data)}, jsonfile, indent=4)
         exported_files.append(json_path)
     if exported_files:
         return f"Exportovaných {len(packet_data)} paketov do: {', '.join(exported_files)}"
@@ -100,289 +85,55 @@ def sanitize_filename(name):
 
 
 def sniff_packets(interface, packet_queue, stop_event, sniffing_event, packets_json_file, data_usage_json_file,
-                  display_filter=""):
-    asyncio.set_event_loop(asyncio.new_event_loop())
-    if display_filter:
-        capture = pyshark.LiveCapture(interface=interface, display_filter=display_filter)
-    else:
-        capture = pyshark.LiveCapture(interface=interface, display_filter="ip")
-    packets = []
+                  display_filter="", ring=None):
+    # Both logs are append-only: each write adds the packets captured since
+    # the previous one and the bytes they added to each second. Live charts
+    # read the packets straight from ``ring`` when one is given.
+    packets_log = capture_log.AppendLog(packets_json_file)
+    data_usage_log = capture_log.AppendLog(data_usage_json_file)
+    packets_log.reset()
+    data_usage_log.reset()
+    if ring is not None:
+        ring.reset()
+    pending_packets = []
     data_usage = {}
 
-    try:
-        for packet in capture.sniff_continuously():
-            if stop_event.is_set():
-                break
+    def write_pending():
+        packets_log.write(to_dicts(pending_packets))
+        data_usage_log.write([capture_log.data_usage_entry(second, size) for second, size in data_usage.items()])
+        pending_packets.clear()
+        data_usage.clear()
 
+    try:
+        for packet_info in tshark_fields.live_capture(interface, display_filter or "ip", stop_event=stop_event):
             if not sniffing_event.is_set():
                 continue
 
-            try:
-                timestamp = packet.sniff_time.strftime("%H:%M:%S")
-                src_ip = packet.ip.src
-                dst_ip = packet.ip.dst
-                if hasattr(packet, 'udp'):
-                    protocol = 'UDP'
-                else:
-                    protocol = packet.highest_layer
-                size = int(packet.length)
-                src_port = packet[packet.transport_layer].srcport if hasattr(packet, "transport_layer") else "-"
-                dst_port = packet[packet.transport_layer].dstport if hasattr(packet, "transport_layer") else "-"
-                payload = "N/A"
-
-                try:
-                    raw_protocols = ['TLS', 'QUIC', 'LLMNR', 'SSDP']
-                    if protocol in raw_protocols and hasattr(packet, 'data'):
-                        protocol_layer = getattr(packet, protocol.lower(), None)
-                        if protocol_layer:
-                            for field_name in dir(protocol_layer):
-                                if not field_name.startswith('_') and field_name not in ['field_names', 'layer_name']:
-                                    try:
-                                        field_value = getattr(protocol_layer, field_name)
-                                        if isinstance(field_value, (str, bytes)):
-                                            if len(field_value) > 0:
-                                                payload = f"{field_name}: {field_value[:50]}"
-                                                break
-                                    except Exception as e:
-                                        payload = f"Error accessing {field_name}: {str(e)}"
-                    else:
-                        if protocol == "UDP" and hasattr(packet, "udp"):
-                            if (hasattr(packet.udp, "dstport") and int(packet.udp.dstport) == 12345):
-                                try:
-                                    import struct
-                                    import json
-                                    import time
-
-                                    payload_bytes = None
-                                    if hasattr(packet.udp, "payload"):
-                                        try:
-                                            udp_payload_hex = packet.udp.payload.replace(':', '')
-                                            payload_bytes = bytes.fromhex(udp_payload_hex)
-                                        except:
-                                            pass
-
-                                    if payload_bytes is None and hasattr(packet, "data"):
-                                        try:
-                                            data_layer = packet.data
-                                            if hasattr(data_layer, "data"):
-                                                udp_payload_hex = data_layer.data.replace(':', '')
-                                                payload_bytes = bytes.fromhex(udp_payload_hex)
-                                        except:
-                                            pass
-
-                                    if payload_bytes is None and hasattr(packet, "frame_raw"):
-                                        try:
-                                            raw_data = packet.frame_raw.value
-                                            frame_bytes = bytes.fromhex(raw_data)
-                                            udp_data_offset = 42
-                                            if len(frame_bytes) > udp_data_offset:
-                                                payload_bytes = frame_bytes[udp_data_offset:]
-                                        except:
-                                            pass
-
-                                    if payload_bytes and len(payload_bytes) >= 20:
-                                        sent_timestamp, sequence, sent_timestamp_ns = struct.unpack('!dIQ',
-                                                                                                    payload_bytes[:20])
-                                        current_time_ns = time.time_ns()
-                                        delay_ns = current_time_ns - sent_timestamp_ns
-                                        delay_ms = delay_ns / 1_000_000.0
-                                        current_time = time.time()
-                                        delay_ms_regular = (current_time - sent_timestamp) * 1000
-                                        try:
-                                            json_payload = payload_bytes[20:].decode('utf-8')
-                                            payload_data = json.loads(json_payload)
-                                            message = payload_data.get('message', 'N/A')
-                                        except:
-                                            message = 'Parse error'
-                                        if delay_ms < 0:
-                                            payload = f"Seq:{sequence} Delay:{delay_ms:.1f}ms(NEG!) Alt:{delay_ms_regular:.1f}ms Msg:{message[:15]}"
-                                        else:
-                                            payload = f"Seq:{sequence} Delay:{delay_ms:.1f}ms Msg:{message[:20]}"
-
-                                    elif payload_bytes and len(payload_bytes) >= 12:
-                                        sent_timestamp, sequence = struct.unpack('!dI', payload_bytes[:12])
-                                        current_time = time.time()
-                                        delay_ms = (current_time - sent_timestamp) * 1000
-
-                                        try:
-                                            json_payload = payload_bytes[12:].decode('utf-8')
-                                            payload_data = json.loads(json_payload)
-                                            message = payload_data.get('message', 'N/A')
-                                        except:
-                                            message = 'Parse error'
-
-                                        if delay_ms < 0:
-                                            payload = f"Seq:{sequence} Delay:{delay_ms:.1f}ms(NEG-OLD!) Msg:{message[:15]}"
-                                        else:
-                                            payload = f"Seq:{sequence} Delay:{delay_ms:.1f}ms Msg:{message[:20]}"
-                                    else:
-                                        available_attrs = [attr for attr in dir(packet.udp) if not attr.startswith('_')]
-                                        payload = f"Port:12345 Attrs:{','.join(available_attrs[:3])} Len:{packet.udp.length if hasattr(packet.udp, 'length') else 'N/A'}"
-
-                                except Exception as e:
-                                    payload = f"Port:12345 ParseError: {str(e)[:25]}"
-                            else:
-                                if hasattr(packet.udp, "length"):
-                                    payload = f"Len: {packet.udp.length}"
-                        elif protocol == 'HTTP' and hasattr(packet, 'http'):
-                            http_data = []
-                            if hasattr(packet.http, 'request_method'):
-                                http_data.append(f"Method: {packet.http.request_method}")
-                            if hasattr(packet.http, 'request_uri'):
-                                http_data.append(f"URI: {packet.http.request_uri}")
-                            if hasattr(packet.http, 'response_code'):
-                                http_data.append(f"Status: {packet.http.response_code}")
-                            if hasattr(packet.http, 'host'):
-                                http_data.append(f"Host: {packet.http.host}")
-                            payload = ', '.join(http_data)
-                        elif protocol == 'MDNS' and hasattr(packet, 'mdns'):
-                            mdns_data = []
-                            if hasattr(packet.mdns, 'qry_name'):
-                                mdns_data.append(f"Query Name: {packet.mdns.qry_name}")
-                            if hasattr(packet.mdns, 'qry_type'):
-                                mdns_data.append(f"Query Type: {packet.mdns.qry_type}")
-                            if hasattr(packet.mdns, 'a'):
-                                mdns_data.append(f"Answer: {packet.mdns.a}")
-                            payload = ', '.join(mdns_data) if mdns_data else "N/A"
-                        elif protocol == 'ICMP' and hasattr(packet, 'icmp'):
-                            icmp_data = []
-                            if hasattr(packet.icmp, 'type'):
-                                icmp_data.append(f"Type: {packet.icmp.type}")
-                            if hasattr(packet.icmp, 'code'):
-                                icmp_data.append(f"Code: {packet.icmp.code}")
-                            payload = ', '.join(icmp_data)
-                        elif protocol == 'DNS' and hasattr(packet, 'dns'):
-                            dns_data = []
-                            is_response = str(getattr(packet.dns, 'flags_response', '0')) in ['1', 'true', 'True']
-                            dns_data.append("Response" if is_response else "Query")
-                            if hasattr(packet.dns, 'qry_name'):
-                                dns_data.append(f"Name: {packet.dns.qry_name}")
-                            if is_response and hasattr(packet.dns, 'a'):
-                                dns_data.append(f"Answer: {packet.dns.a}")
-                            payload = ', '.join(dns_data)
-                        elif protocol == 'ARP' and hasattr(packet, 'arp'):
-                            arp_data = []
-                            if hasattr(packet.arp, 'opcode'):
-                                opcode = int(packet.arp.opcode)
-                                arp_data.append("who-has" if opcode == 1 else "is-at")
-                            if hasattr(packet.arp, 'src_proto_ipv4'):
-                                arp_data.append(f"Sender: {packet.arp.src_proto_ipv4}")
-                            if hasattr(packet.arp, 'dst_proto_ipv4'):
-                                arp_data.append(f"Target: {packet.arp.dst_proto_ipv4}")
-                            payload = ', '.join(arp_data)
-                        elif protocol == 'MODBUS' and hasattr(packet, 'modbus'):
-                            modbus_data = []
-                            if hasattr(packet.modbus, 'func_code'):
-                                modbus_data.append(f"Code: {packet.modbus.func_code}")
-                            if hasattr(packet.modbus, 'exception_code'):
-                                modbus_data.append(f"Exception: {packet.modbus.exception_code}")
-                            if hasattr(packet.modbus, 'transaction_id'):
-                                modbus_data.append(f"Transaction ID: {packet.modbus.transaction_id}")
-                            payload = ', '.join(modbus_data)
-                        elif protocol == 'DNP3' and hasattr(packet, 'dnp3'):
-                            dnp3_data = []
-                            if hasattr(packet.dnp3, 'ctl_func'):
-                                dnp3_data.append(f"Code: {packet.dnp3.ctl_func}")
-                            if hasattr(packet.dnp3, 'al_obj'):
-                                dnp3_data.append(f"Object: {packet.dnp3.al_obj}")
-                            if hasattr(packet.dnp3, 'al_class'):
-                                dnp3_data.append(f"Class: {packet.dnp3.al_class}")
-                            payload = ', '.join(dnp3_data)
-                        elif protocol == 'S7COMM' and hasattr(packet, 's7comm'):
-                            s7_data = []
-                            if hasattr(packet.s7comm, 'param_func'):
-                                s7_data.append(f"Code: {packet.s7comm.param_func}")
-                            if hasattr(packet.s7comm, 'param_setup_rack_num'):
-                                s7_data.append(f"Rack: {packet.s7comm.param_setup_rack_num}")
-                            if hasattr(packet.s7comm, 'param_setup_slot_num'):
-                                s7_data.append(f"Slot: {packet.s7comm.param_setup_slot_num}")
-                            if hasattr(packet.s7comm, 'item_data_type'):
-                                s7_data.append(f"Data Type: {packet.s7comm.item_data_type}")
-                            payload = ', '.join(s7_data)
-                        elif hasattr(packet, 'tcp'):
-                            src_port = packet.tcp.srcport
-                            dst_port = packet.tcp.dstport
-
-                            tcp_payload = []
-                            if hasattr(packet.tcp, 'flags'):
-                                try:
-                                    flag_value = int(packet.tcp.flags, 16)
-                                    flags = []
-                                    if flag_value & 0x01: flags.append("FIN")
-                                    if flag_value & 0x02: flags.append("SYN")
-                                    if flag_value & 0x04: flags.append("RST")
-                                    if flag_value & 0x08: flags.append("PSH")
-                                    if flag_value & 0x10: flags.append("ACK")
-                                    if flag_value & 0x20: flags.append("URG")
-                                    if flags:
-                                        tcp_payload.append(f"[{','.join(flags)}]")
-                                except ValueError:
-                                    pass
-                            if hasattr(packet.tcp, 'seq'):
-                                tcp_payload.append(f"seq={packet.tcp.seq}")
-                            if hasattr(packet.tcp, 'ack'):
-                                tcp_payload.append(f"ack={packet.tcp.ack}")
-                            if hasattr(packet.tcp, 'window_size'):
-                                tcp_payload.append(f"win={packet.tcp.window_size}")
-
-                            extra_tcp_info = []
-                            if hasattr(packet.tcp, 'analysis_retransmission'):
-                                extra_tcp_info.append("Retransmission")
-
-                            combined_payload = ', '.join(tcp_payload + extra_tcp_info) if (
-                                        tcp_payload or extra_tcp_info) else "N/A"
-                            payload = combined_payload
-                        else:
-                            for field_name in dir(protocol_layer):
-                                if not field_name.startswith('_') and field_name not in ['field_names', 'layer_name']:
-                                    field_value = getattr(protocol_layer, field_name)
-                                    if isinstance(field_value, str) and len(field_value) > 0:
-                                        payload = f"{field_name}: {field_value}"
-                                        break
-                    if payload == "N/A" and hasattr(packet, "frame_raw"):
-                        raw_data = packet.frame_raw.value
-                        printable_chars = ''.join(
-                            chr(byte) if 32 <= byte <= 126 else '.' for byte in bytes.fromhex(raw_data))
-                        payload = printable_chars[:30] + "..." if len(printable_chars) > 30 else printable_chars
-
-                except Exception as e:
-                    payload = f"Error extracting payload: {str(e)[:20]}"
-                payload = clean_string(payload)
-                if len(payload) > 40:
-                    payload = payload[:37] + "..."
-
-                packet_info = {
-                    "timestamp": timestamp,
-                    "src_ip": src_ip,
-                    "dst_ip": dst_ip,
-                    "protocol": protocol,
-                    "src_port": src_port,
-                    "dst_port": dst_port,
-                    "size": size,
-                    "payload": payload
-                }
-
-                packet_queue.put(packet_info)
-                packets.append(packet_info)
-
-                if timestamp in data_usage:
-                    data_usage[timestamp] += size
-                else:
-                    data_usage[timestamp] = size
+            packet_info["payload"] = clip_payload(packet_info["payload"])
+            second = packet_info.ts_ns // 1_000_000_000
+            size = packet_info.size
 
-                if len(packets) % 10 == 0:
-                    write_packets_to_json(packets, packets_json_file)
-                    write_data_usage_to_json(data_usage, data_usage_json_file)
+            packet_queue.put(packet_info)
+            pending_packets.append(packet_info)
+            if ring is not None:
+                ring.publish(packet_info)
 
-            except AttributeError as e:
-                continue
+            if second in data_usage:
+                data_usage[second] += size
+            else:
+                data_usage[second] = size
+
+            if len(pending_packets) >= 10:
+                write_pending()
     finally:
-        capture.close()
-        write_packets_to_json(packets, packets_json_file)
-        write_data_usage_to_json(data_usage, data_usage_json_file)
+        write_pending()
+        packets_log.close()
+        data_usage_log.close()
 
 
 def display_packets(stdscr, interface, filters):
+    interfaces = [interface] if isinstance(interface, str) else list(interface)
+    interface_name = ", ".join(interfaces)
     stdscr.clear()
     max_y, max_x = stdscr.getmaxyx()
 
@@ -395,21 +146,22 @@ def display_packets(stdscr, interface, filters):
     json_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'live_visualisations')
     os.makedirs(json_dir, exist_ok=True)
 
-    packets_json_file = os.path.join(json_dir, 'captured_packets.json')
-    data_usage_json_file = os.path.join(json_dir, 'data_usage.json')
+    packets_json_file = os.path.join(json_dir, capture_log.PACKETS_LOG)
+    data_usage_json_file = os.path.join(json_dir, capture_log.DATA_USAGE_LOG)
+    ring = PacketRing()
 
     sniff_thread = threading.Thread(target=sniff_packets,
-                                    args=(interface, packet_queue, stop_event, sniffing_event, packets_json_file,
-                                          data_usage_json_file),
+                                    args=(interfaces, packet_queue, stop_event, sniffing_event, packets_json_file,
+                                          data_usage_json_file, "", ring),
                                     daemon=True)
     sniff_thread.start()
-    all_packet_lines = []
+    all_packet_lines = RingBuffer(MAX_PACKET_LINES)
     scroll_position = 0
     visible_lines = max_y - 12
 
     packet_count = 0
 
-    stdscr.addstr(0, 0, f"Sledovanie paketov na rozhraní: {interface}")
+    stdscr.addstr(0, 0, f"Sledovanie paketov na rozhraní: {interface_name}")
     stdscr.addstr(2, 0,
                   "| Čas      | Zdrojová IP     | Cieľová IP      | Protokol | Porty          | Veľkosť      | Dáta ")
     stdscr.addstr(3, 0, "-" * 120)
@@ -418,14 +170,18 @@ def display_packets(stdscr, interface, filters):
 
     while True:
         packets_added = False
+        dropped_lines = all_packet_lines.dropped
         while not packet_queue.empty():
             packet_info = packet_queue.get()
             packet_count += 1
 
+            data = clip_payload(packet_info['payload'], 40)
+            if len(interfaces) > 1:
+                data = f"[{packet_info['interface']}] {data}"
             packet_info_str = (f"| {packet_info['timestamp']} | "
                                f"{packet_info['src_ip']:<15} | {packet_info['dst_ip']:<15} | "
                                f"{packet_info['protocol']:<8} | {packet_info['src_port']:<5} -> {packet_info['dst_port']:<5} | "
-                               f"{packet_info['size']:<5} bajtov | {packet_info['payload']}")
+                               f"{packet_info['size']:<5} bajtov | {data}")
 
             wrapped_lines = wrap_text(packet_info_str, max_x - 2)
 
@@ -435,6 +191,9 @@ def display_packets(stdscr, interface, filters):
                 packets_added = True
         if packets_added and sniffing_event.is_set():
             scroll_position = max(0, len(all_packet_lines) - visible_lines)
+        else:
+            # Keep the same lines in view when older ones roll off the buffer.
+            scroll_position = max(0, scroll_position - (all_packet_lines.dropped - dropped_lines))
         for i in range(4, max_y - 8):
             stdscr.addstr(i, 0, " " * (max_x - 1))
         visible_end = min(len(all_packet_lines), scroll_position + visible_lines)
@@ -474,6 +233,9 @@ def display_packets(stdscr, interface, filters):
             subprocess.run([
                 python_cmd, r"two_devices.py",
             ])
+            stop_event.set()
+            sniff_thread.join()
+            ring.close()
             return
         elif key == ord('B') or key == ord('b'):
             was_sniffing = sniffing_event.is_set()
@@ -494,16 +256,16 @@ def display_packets(stdscr, interface, filters):
                     stop_event.set()
                     if sniff_thread.is_alive():
                         sniff_thread.join()
-                    all_packet_lines = []
+                    all_packet_lines.clear()
                     scroll_position = 0
                     packet_count = 0
                     stop_event = threading.Event()
                     sniff_thread = threading.Thread(
                         target=sniff_packets,
                         args=(
-                            interface, packet_queue, stop_event, sniffing_event, packets_json_file,
+                            interfaces, packet_queue, stop_event, sniffing_event, packets_json_file,
                             data_usage_json_file,
-                            current_display_filter),
+                            current_display_filter, ring),
                         daemon=True
                     )
                     sniff_thread.start()
@@ -519,20 +281,20 @@ def display_packets(stdscr, interface, filters):
             stdscr.clear()
             stdscr.refresh()
 
-            stdscr.addstr(0, 0, f"Sledovanie paketov na rozhraní: {interface}")
+            stdscr.addstr(0, 0, f"Sledovanie paketov na rozhraní: {interface_name}")
             stdscr.addstr(2, 0,
                           "| Čas      | Zdrojová IP     | Cieľová IP      | Protokol | Porty          | Veľkosť      | Dáta ")
             stdscr.addstr(3, 0, "-" * 120)
             if os.name == 'nt':
                 process = subprocess.Popen(
-                    [python_cmd, "live_visualisations_selector.py", json_dir],
+                    [python_cmd, "live_visualisations_selector.py", json_dir, "--ring", ring.name],
                     creationflags=subprocess.CREATE_NEW_CONSOLE,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE
                 )
             else:
                 process = subprocess.Popen(
-                    [python_cmd, "live_visualisations_selector.py", json_dir],
+                    [python_cmd, "live_visualisations_selector.py", json_dir, "--ring", ring.name],
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
                     start_new_session=True
@@ -544,14 +306,12 @@ def display_packets(stdscr, interface, filters):
                 sniffing_event.clear()
 
             try:
-                with open(packets_json_file, 'r') as f:
-                    data = json.load(f)
-                    packets_to_export = data.get("packets", [])
+                packets_to_export = capture_log.read_packets(packets_json_file)
 
                 if not packets_to_export:
                     status_msg = "Žiadne pakety dostupné na export."
                 else:
-                    status_msg = export_packets(stdscr, packets_to_export, interface)
+                    status_msg = export_packets(stdscr, packets_to_export, "_".join(interfaces))
                 stdscr.addstr(max_y - 2, 0, " " * max_x)
                 stdscr.addstr(max_y - 2, 0, status_msg[:max_x - 1].center(max_x))
                 stdscr.refresh()
@@ -579,8 +339,9 @@ def display_packets(stdscr, interface, filters):
             stop_event.set()
             sniff_thread.join()
 
-            write_packets_to_json([], packets_json_file)
-            write_data_usage_to_json({}, data_usage_json_file)
+            capture_log.clear(packets_json_file)
+            capture_log.clear(data_usage_json_file)
+            ring.close()
 
             stdscr.addstr(max_y - 2, 0, "Zachytávanie zastavené.".center(max_x))
             stdscr.refresh()
@@ -591,7 +352,8 @@ def display_packets(stdscr, interface, filters):
 
 def main():
     parser = argparse.ArgumentParser(description="Snímač paketov s rozhraním curses.")
-    parser.add_argument("--interface", required=True, help="Sieťové rozhranie na zachytávanie")
+    parser.add_argument("--interface", required=True, nargs="+",
+                        help="Sieťové rozhranie na zachytávanie; pri viacerých sa pakety zlúčia podľa času")
     parser.add_argument("--pcap_file", help="PCAP súbor")
     args = parser.parse_args()
     curses.setupterm()
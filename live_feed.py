@@ -0,0 +1,110 @@
+import os
+
+import numpy as np
+
+import capture_log
+
+from packet_record import LivePacketRecord, packet_ts_ns
+from pcap_reader import TimestampFormatter
+from shared_ring import RingReader
+
+
+class LogFeed:
+    """Hands out the documents of a capture log that a live chart has not seen yet."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.tail = capture_log.LogTail(path)
+
+    def poll(self):
+        """``(records, reset)``; after ``reset`` the chart has to drop what it aggregated before."""
+        return self.tail.read()
+
+    def close(self):
+        pass
+
+
+class RingFeed:
+    """Hands out the packets the sniffer publishes to its shared-memory ring, without any JSON parsing.
+
+    The first poll reads the packets log once for the history the ring no
+    longer holds. The sniffer publishes each packet before logging it, so the
+    ring carries on from the last logged packet, found by its timestamp: a
+    rotated log no longer starts at the ring's first record.
+    """
+
+    def __init__(self, ring, log_path=None):
+        self.reader = RingReader(ring)
+        self.log_path = log_path
+        self.name = os.path.basename(log_path) if log_path else ring
+        self.format_timestamp = TimestampFormatter("%H:%M:%S")
+
+    def poll(self):
+        history = []
+        if self.reader.generation is None and self.log_path:
+            history = capture_log.read_packets(self.log_path)
+        records, reset = self.reader.read()
+        if history:
+            records = records[self._after(history, records["ts_ns"]):]
+        return history + self._packets(records), reset
+
+    @staticmethod
+    def _after(history, ts_ns):
+        # Index of the first ring record past ``history``; packets captured
+        # in the same nanosecond as the last logged one are told apart by count.
+        last = packet_ts_ns(history[-1])
+        logged = 1
+        while logged < len(history) and packet_ts_ns(history[-1 - logged]) == last:
+            logged += 1
+        return min(int(np.searchsorted(ts_ns, last, "left")) + logged, int(np.searchsorted(ts_ns, last, "right")))
+
+    def _packets(self, records):
+        missing = LivePacketRecord.missing_port
+        format_timestamp = self.format_timestamp
+        return [{
+            "timestamp": format_timestamp(ts_ns),
+            "src_ip": src_ip.decode('ascii'),
+            "dst_ip": dst_ip.decode('ascii'),
+            "protocol": protocol.decode('ascii'),
+            "src_port": str(src_port) if src_port >= 0 else missing,
+            "dst_port": str(dst_port) if dst_port >= 0 else missing,
+            "size": size,
+            "ts_ns": ts_ns,
+        } for ts_ns, size, src_port, dst_port, protocol, src_ip, dst_ip in zip(
+            records["ts_ns"].tolist(), records["size"].tolist(), records["src_port"].tolist(),
+            records["dst_port"].tolist(), records["protocol"].tolist(), records["src_ip"].tolist(),
+            records["dst_ip"].tolist())]
+
+    def close(self):
+        self.reader.close()
+
+
+class PacketHistory:
+    """All packets of the packets log, kept between reads so each one parses only the newly appended lines."""
+
+    def __init__(self, path):
+        self.tail = capture_log.LogTail(path)
+        self.packets = []
+
+    def read(self):
+        records, reset = self.tail.read()
+        if reset:
+            self.packets = []
+        self.packets.extend(records)
+        return self.packets
+
+
+def open_feed(log_path, ring=None):
+    """Feed for a live chart: the sniffer's ring when one is given, otherwise the capture log itself."""
+    if ring:
+        try:
+            return RingFeed(ring, log_path)
+        except FileNotFoundError:
+            # The sniffer has already exited and removed its ring.
+            pass
+    return LogFeed(log_path)
+
+
+def as_feed(source):
+    return source if hasattr(source, "poll") else LogFeed(source)
@@ -1,20 +1,31 @@
-import json
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import numpy as np
 from matplotlib.animation import FuncAnimation
 from datetime import datetime
+import live_feed
 
 def plot_data_usage(file_path):
     fig, ax = plt.subplots(figsize=(12, 6))
+    feed = live_feed.as_feed(file_path)
+    totals = {}
     timestamps = []
     data_usage = []
     def animate(i):
         nonlocal timestamps, data_usage
-        with open(file_path, 'r') as file:
-            data = json.load(file)
-        timestamps = [datetime.strptime(entry["timestamp"], "%H:%M:%S") for entry in data]
-        data_usage = [int(entry["data_usage"]) for entry in data]
+        entries, reset = feed.poll()
+        if reset:
+            totals.clear()
+        # Entries of the data-usage log, or packets when the feed is the sniffer's ring.
+        for entry in entries:
+            if "data_usage" in entry:
+                second, size = entry["ts"], int(entry["data_usage"])
+            else:
+                second, size = entry["ts_ns"] // 1_000_000_000, entry["size"]
+            totals[second] = totals.get(second, 0) + size
+        ordered = sorted(totals.items())
+        timestamps = [datetime.fromtimestamp(second) for second, _ in ordered]
+        data_usage = [size for _, size in ordered]
         data_usage_kb = [size / 1024 for size in data_usage]
 
         ax.clear()
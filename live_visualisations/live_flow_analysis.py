@@ -1,22 +1,24 @@
-import json
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 from collections import defaultdict
+import live_feed
 
 def plot_flow_analysis(json_file):
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 10))
+    feed = live_feed.as_feed(json_file)
+    # flow key -> [packet count, total bytes]
+    flows = defaultdict(lambda: [0, 0])
 
     def animate(i):
         ax1.clear()
         ax2.clear()
         try:
-            with open(json_file, 'r') as f:
-                data = json.load(f)
-                packets = data['packets']
+            packets, reset = feed.poll()
         except Exception as e:
             print(f"Error pri načítavaní JSON súboru: {e}")
             return
-        flows = defaultdict(list)
+        if reset:
+            flows.clear()
         for packet in packets:
             flow_key = (
                 packet.get('src_ip', 'unknown'),
@@ -25,13 +27,12 @@ def plot_flow_analysis(json_file):
                 packet.get('dst_port', 'unknown'),
                 packet.get('protocol', 'unknown')
             )
-            flows[flow_key].append(packet)
+            flow = flows[flow_key]
+            flow[0] += 1
+            flow[1] += packet.get('size', 0)
         flow_stats = []
-        for flow_key, flow_packets in flows.items():
+        for flow_key, (packet_count, total_bytes) in flows.items():
             src_ip, dst_ip, src_port, dst_port, protocol = flow_key
-            packet_count = len(flow_packets)
-            total_bytes = sum(packet.get('size', 0) for packet in flow_packets)
-            timestamps = [packet.get('timestamp', '00:00:00') for packet in flow_packets]
             flow_info = {
                 'src_ip': src_ip,
                 'dst_ip': dst_ip,
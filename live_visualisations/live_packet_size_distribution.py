@@ -1,22 +1,23 @@
-import json
 import matplotlib.pyplot as plt
 import numpy as np
-import os
 from matplotlib.animation import FuncAnimation
+import live_feed
 
 def plot_packet_size_distribution(json_file):
     fig, ax = plt.subplots(figsize=(10, 6))
+    feed = live_feed.as_feed(json_file)
+    sizes = []
 
     def animate(i):
         ax.clear()
         try:
-            with open(json_file, 'r') as f:
-                data = json.load(f)
-                packets = data.get('packets', [])
+            packets, reset = feed.poll()
         except Exception as e:
             print(f"Error pri načítavaní JSON súboru: {e}")
             return
-        sizes = [packet['size'] for packet in packets if 'size' in packet]
+        if reset:
+            sizes.clear()
+        sizes.extend(packet['size'] for packet in packets if 'size' in packet)
         if sizes:
             max_size = max(sizes)
             if max_size <= 1500:
@@ -42,7 +43,7 @@ def plot_packet_size_distribution(json_file):
         else:
             ax.text(0.5, 0.5, "Žiadne údaje o veľkosti paketov nie sú k dispozícii",
                     horizontalalignment='center', fontsize=14)
-        file_name = os.path.basename(json_file)
+        file_name = feed.name
         ax.set_title(f"Analýza veľkosti paketov - {file_name}", fontsize=14)
 
         plt.tight_layout()
@@ -1,19 +1,19 @@
-import json
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
-import os
+import live_feed
 
 def plot_protocols(json_file):
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 7))
+    feed = live_feed.as_feed(json_file)
+    protocol_counts = {}
 
     def animate(i):
         ax1.clear()
         ax2.clear()
         try:
-            with open(json_file, 'r') as f:
-                data = json.load(f)
-            packets = data.get('packets', [])
-            protocol_counts = {}
+            packets, reset = feed.poll()
+            if reset:
+                protocol_counts.clear()
             for packet in packets:
                 protocol = packet.get('protocol', 'Unknown')
                 if protocol in protocol_counts:
@@ -45,7 +45,7 @@ def plot_protocols(json_file):
                     autopct='', startangle=90, colors=colors)
             ax2.set_title('Distribúcia protokolov (%)')
             ax2.axis('equal')
-            file_name = os.path.basename(json_file)
+            file_name = feed.name
             plt.suptitle(f"Analýza protokolov - {file_name}", fontsize=16)
 
             plt.tight_layout()
@@ -1,23 +1,27 @@
-import json
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 from collections import Counter
+import live_feed
 
 def plot_top_senders_receivers(json_file, top_n=5):
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+    feed = live_feed.as_feed(json_file)
+    src_ips = Counter()
+    dst_ips = Counter()
 
     def animate(i):
         ax1.clear()
         ax2.clear()
         try:
-            with open(json_file, 'r') as f:
-                data = json.load(f)
-                packets = data['packets']
+            packets, reset = feed.poll()
         except Exception as e:
             print(f"Error pri načítaní JSON súboru: {e}")
             return
-        src_ips = Counter([packet['src_ip'] for packet in packets])
-        dst_ips = Counter([packet['dst_ip'] for packet in packets])
+        if reset:
+            src_ips.clear()
+            dst_ips.clear()
+        src_ips.update(packet['src_ip'] for packet in packets)
+        dst_ips.update(packet['dst_ip'] for packet in packets)
         top_senders = src_ips.most_common(top_n)
         top_receivers = dst_ips.most_common(top_n)
         sender_ips = [ip for ip, count in top_senders]
@@ -1,23 +1,25 @@
-import json
 import matplotlib.pyplot as plt
 import networkx as nx
 from matplotlib.animation import FuncAnimation
+import live_feed
 
 def plot_network_topology(json_file, max_nodes=20):
     fig, ax = plt.subplots(figsize=(8, 6))
+    feed = live_feed.as_feed(json_file)
+    edge_weights = {}
+    edge_protocols = {}
 
     def animate(i):
         ax.clear()
         try:
-            with open(json_file, 'r') as f:
-                data = json.load(f)
-                packets = data['packets']
+            packets, reset = feed.poll()
         except Exception as e:
             print(f"Error pri načítaní JSON súboru: {e}")
             return
+        if reset:
+            edge_weights.clear()
+            edge_protocols.clear()
         G = nx.DiGraph()
-        edge_weights = {}
-        edge_protocols = {}
         for packet in packets:
             src = packet['src_ip']
             dst = packet['dst_ip']
@@ -1,7 +1,8 @@
 import argparse
 import curses
 import os
-import json
+import capture_log
+import live_feed
 
 from live_visualisations.live_plot_protocols import plot_protocols
 from live_visualisations.live_data_usage import plot_data_usage
@@ -31,14 +32,14 @@ from specific_visualisations.dnp3_events import plot_dnp3_events
 from specific_visualisations.s7_racks import plot_s7_racks
 from specific_visualisations.s7_functions import plot_s7_functions
 general_vis_file_types = {
-    "Objem dát v čase": "data_usage.json",
-    "Distribúcia protokolov": "captured_packets.json",
-    "Top odosielatelia a prijímatelia": "captured_packets.json",
-    "Prepojenie aktívnych zariadení": "captured_packets.json",
-    "Distribúcia veľkosti paketov": "captured_packets.json",
-    "Analýza tokov": "captured_packets.json",
-    "Distribúcia portov": "captured_packets.json",
-    "Počet paketov v čase": "captured_packets.json"
+    "Objem dát v čase": capture_log.DATA_USAGE_LOG,
+    "Distribúcia protokolov": capture_log.PACKETS_LOG,
+    "Top odosielatelia a prijímatelia": capture_log.PACKETS_LOG,
+    "Prepojenie aktívnych zariadení": capture_log.PACKETS_LOG,
+    "Distribúcia veľkosti paketov": capture_log.PACKETS_LOG,
+    "Analýza tokov": capture_log.PACKETS_LOG,
+    "Distribúcia portov": capture_log.PACKETS_LOG,
+    "Počet paketov v čase": capture_log.PACKETS_LOG
 }
 
 protocol_visualizations = {
@@ -105,7 +106,7 @@ protocol_vis_function_map = {
 }
 
 
-def protocol_visualization_menu(stdscr, protocol, visualizations, json_dir):
+def protocol_visualization_menu(stdscr, protocol, visualizations, json_dir, history):
     current_selection = 0
     while True:
         stdscr.clear()
@@ -134,11 +135,9 @@ def protocol_visualization_menu(stdscr, protocol, visualizations, json_dir):
                 selected_vis = visualizations[current_selection - 1]
                 func = protocol_vis_function_map.get(selected_vis)
                 if func:
-                    captured_packets_json = os.path.join(json_dir, "captured_packets.json")
+                    captured_packets_json = os.path.join(json_dir, capture_log.PACKETS_LOG)
                     if os.path.isfile(captured_packets_json):
-                        with open(captured_packets_json, 'r') as f:
-                            data = json.load(f)
-                        func(data)
+                        func(history.read())
                     else:
                         stdscr.clear()
                         stdscr.addstr(0, 0, f"Chyba: Súbor {captured_packets_json} neexistuje.")
@@ -184,7 +183,7 @@ def protocol_menu(stdscr, protocols):
             return "q"
 
 
-def select_visualization(stdscr, json_dir):
+def select_visualization(stdscr, json_dir, ring=None):
     visualizations = [
         "Objem dát v čase",
         "Distribúcia protokolov",
@@ -201,6 +200,8 @@ def select_visualization(stdscr, json_dir):
         "TCP", "UDP", "ICMP", "DNS", "HTTP", "ARP", "Modbus", "DNP3", "S7"
     ]
 
+    # Reopening a chart parses only the packets logged since the previous one.
+    history = live_feed.PacketHistory(os.path.join(json_dir, capture_log.PACKETS_LOG))
     current_selection = 0
     while True:
         stdscr.clear()
@@ -234,11 +235,14 @@ def select_visualization(stdscr, json_dir):
                     stdscr.refresh()
                     stdscr.getch()
                     continue
-                result = protocol_visualization_menu(stdscr, protocol, visualizations_for_protocol, json_dir)
+                result = protocol_visualization_menu(stdscr, protocol, visualizations_for_protocol, json_dir, history)
                 if result == "q":
                     return "q"
             else:
-                json_file_type = general_vis_file_types.get(selected_vis, "captured_packets.json")
+                json_file_type = general_vis_file_types.get(selected_vis, capture_log.PACKETS_LOG)
+                if ring:
+                    # The ring carries every packet, data usage is summed from them.
+                    json_file_type = capture_log.PACKETS_LOG
                 json_file_path = os.path.join(json_dir, json_file_type)
 
                 if not os.path.isfile(json_file_path):
@@ -247,24 +251,28 @@ def select_visualization(stdscr, json_dir):
                     stdscr.refresh()
                     stdscr.getch()
                     continue
-                if selected_vis == "Objem dát v čase":
-                    plot_data_usage(json_file_path)
-                elif selected_vis == "Distribúcia protokolov":
-                    plot_protocols(json_file_path)
-                elif selected_vis == "Top odosielatelia a prijímatelia":
-                    plot_top_senders_receivers(json_file_path)
-                elif selected_vis == "Prepojenie aktívnych zariadení":
-                    plot_network_topology(json_file_path)
-                elif selected_vis == "Distribúcia veľkosti paketov":
-                    plot_packet_size_distribution(json_file_path)
-                elif selected_vis == "Analýza tokov":
-                    plot_flow_analysis(json_file_path)
-                elif selected_vis == "Distribúcia portov" or selected_vis == "Počet paketov v čase":
+                if selected_vis == "Distribúcia portov" or selected_vis == "Počet paketov v čase":
                     stdscr.clear()
                     stdscr.addstr(0, 0, "Táto vizualizácia zatiaľ nie je implementovaná.")
                     stdscr.refresh()
                     stdscr.getch()
                     continue
+                feed = live_feed.open_feed(json_file_path, ring)
+                try:
+                    if selected_vis == "Objem dát v čase":
+                        plot_data_usage(feed)
+                    elif selected_vis == "Distribúcia protokolov":
+                        plot_protocols(feed)
+                    elif selected_vis == "Top odosielatelia a prijímatelia":
+                        plot_top_senders_receivers(feed)
+                    elif selected_vis == "Prepojenie aktívnych zariadení":
+                        plot_network_topology(feed)
+                    elif selected_vis == "Distribúcia veľkosti paketov":
+                        plot_packet_size_distribution(feed)
+                    elif selected_vis == "Analýza tokov":
+                        plot_flow_analysis(feed)
+                finally:
+                    feed.close()
         elif key == ord('q'):
             return "q"
 
@@ -272,15 +280,16 @@ def select_visualization(stdscr, json_dir):
 def main():
     parser = argparse.ArgumentParser(description="Live Visualizations for Network Data")
     parser.add_argument("json_dir",
-                        help="Directory containing JSON data files (captured_packets.json and data_usage.json)")
+                        help="Directory containing the capture logs (captured_packets.ndjson and data_usage.ndjson)")
+    parser.add_argument("--ring", help="Shared-memory ring the sniffer publishes packets to")
     args = parser.parse_args()
 
     json_dir = args.json_dir
     if not os.path.isdir(json_dir):
         print(f"Adresár {json_dir} neexistuje.")
         return
-    captured_packets_path = os.path.join(json_dir, "captured_packets.json")
-    data_usage_path = os.path.join(json_dir, "data_usage.json")
+    captured_packets_path = os.path.join(json_dir, capture_log.PACKETS_LOG)
+    data_usage_path = os.path.join(json_dir, capture_log.DATA_USAGE_LOG)
 
     if not os.path.isfile(captured_packets_path):
         print(f"Súbor {captured_packets_path} neexistuje.")
@@ -288,9 +297,9 @@ def main():
     if not os.path.isfile(data_usage_path):
         print(f"Súbor {data_usage_path} neexistuje.")
     if os.path.isfile(captured_packets_path) or os.path.isfile(data_usage_path):
-        curses.wrapper(lambda stdscr: select_visualization(stdscr, json_dir))
+        curses.wrapper(lambda stdscr: select_visualization(stdscr, json_dir, args.ring))
     else:
-        print("Žiadne potrebné JSON súbory neboli nájdené v zadanom adresári.")
+        print("Žiadne potrebné súbory so záznamom neboli nájdené v zadanom adresári.")
 
 
 if __name__ == "__main__":
@@ -106,7 +106,7 @@ def main(stdscr):
 
     parser = argparse.ArgumentParser(description="Packet capture tool.")
     parser.add_argument("--pcap_file", type=str, help="Cesta k súboru PCAP")
-    parser.add_argument("--interface", type=str, help="Sieťové rozhranie na real-time capture")
+    parser.add_argument("--interface", type=str, nargs="+", help="Sieťové rozhrania na real-time capture")
     parser.add_argument("--ip_a", type=str, help="IP adresa A")
     parser.add_argument("--ip_b", type=str, help="IP adresa B")
     args = parser.parse_args()
@@ -171,7 +171,8 @@ def main(stdscr):
 
     if args.interface:
         curses.endwin()
-        subprocess.run([python_cmd, "interface_sniffer.py", "--interface", args.interface])
+        interfaces = [args.interface] if isinstance(args.interface, str) else args.interface
+        subprocess.run([python_cmd, "interface_sniffer.py", "--interface", *interfaces])
 
     if args.pcap_file:
         subprocess.run([python_cmd, "pcap_analyzer.py", args.pcap_file])
@@ -0,0 +1,242 @@
+import json
+import marshal
+import struct
+import time
+
+from packet_record import PacketRecord, LivePacketRecord
+
+RAW_PROTOCOLS = ('TLS', 'QUIC', 'LLMNR', 'SSDP')
+TCP_APPLICATION_PROTOCOLS = ('HTTP', 'MODBUS', 'DNP3', 'S7COMM') + RAW_PROTOCOLS
+TLS_CONTENT_TYPES = {20: "Change Cipher Spec", 21: "Alert", 22: "Handshake", 23: "Application Data"}
+TLS_HANDSHAKE_TYPES = {0: "Hello Request", 1: "Client Hello", 2: "Server Hello", 4: "New Session Ticket",
+                       8: "Encrypted Extensions", 11: "Certificate", 12: "Server Key Exchange",
+                       13: "Certificate Request", 14: "Server Hello Done", 15: "Certificate Verify",
+                       16: "Client Key Exchange", 20: "Finished"}
+TCP_FLAG_NAMES = ((0x01, "FIN"), (0x02, "SYN"), (0x04, "RST"), (0x08, "PSH"), (0x10, "ACK"), (0x20, "URG"))
+LATENCY_PROBE_PORT = 12345
+PAYLOAD_LIMIT = 200
+# Part of every analysis cache key: bump it whenever decoding or payload rendering changes.
+DECODER_VERSION = 1
+
+
+def _labelled(pairs):
+    return ', '.join(f"{label}: {value}" for label, value in pairs if value)
+
+
+def _udp(fields, details, tcp_state):
+    return f"Len: {details}"
+
+
+def _http(fields, details, tcp_state):
+    method, uri, status, host = details
+    return _labelled((("Method", method), ("URI", uri), ("Status", status), ("Host", host)))
+
+
+def _mdns(fields, details, tcp_state):
+    qry_name, qry_type, answer = details
+    return _labelled((("Query Name", qry_name), ("Query Type", qry_type), ("Answer", answer))) or "N/A"
+
+
+def _icmp(fields, details, tcp_state):
+    return f"Type: {details[0]}, Code: {details[1]}"
+
+
+def _dns(fields, details, tcp_state):
+    is_response, qry_name, answer = details
+    dns_data = ["Response" if is_response else "Query"]
+    if qry_name:
+        dns_data.append(f"Name: {qry_name}")
+    if is_response and answer:
+        dns_data.append(f"Answer: {answer}")
+    return ', '.join(dns_data)
+
+
+def _arp(fields, details, tcp_state):
+    opcode, sender, target = details
+    arp_data = []
+    if opcode is not None:
+        arp_data.append("who-has" if opcode == 1 else "is-at")
+    if sender:
+        arp_data.append(f"Sender: {sender}")
+    if target:
+        arp_data.append(f"Target: {target}")
+    return ', '.join(arp_data)
+
+
+def _codes(labels, values):
+    return ', '.join(f"{label}: {value}" for label, value in zip(labels, values) if value is not None)
+
+
+def _modbus(fields, details, tcp_state):
+    return _codes(("Code", "Exception", "Transaction ID"), details)
+
+
+def _dnp3(fields, details, tcp_state):
+    return _codes(("Code", "Object", "Class"), details)
+
+
+def _s7comm(fields, details, tcp_state):
+    return _codes(("Code", "Rack", "Slot", "Data Type"), details)
+
+
+def _tls(fields, details, tcp_state):
+    content_type, handshake_type, server_name = details
+    if handshake_type is not None:
+        return _labelled((("Handshake", TLS_HANDSHAKE_TYPES.get(handshake_type, handshake_type)),
+                          ("SNI", server_name)))
+    return _labelled((("Record", TLS_CONTENT_TYPES.get(content_type, content_type)),)) or "N/A"
+
+
+def _tcp(fields, details, tcp_state):
+    relative_seq, relative_ack, window, retransmission = tcp_state
+    flag_value = fields["tcp"][2]
+    flags = [name for bit, name in TCP_FLAG_NAMES if flag_value & bit]
+    tcp_payload = []
+    if flags:
+        tcp_payload.append(f"[{','.join(flags)}]")
+    if relative_seq is not None:
+        tcp_payload.append(f"seq={relative_seq}")
+    if relative_ack is not None:
+        tcp_payload.append(f"ack={relative_ack}")
+    if window is not None:
+        tcp_payload.append(f"win={window}")
+    if retransmission:
+        tcp_payload.append("Retransmission")
+    return ', '.join(tcp_payload) if tcp_payload else "N/A"
+
+
+PAYLOAD_HANDLERS = {
+    "UDP": _udp,
+    "HTTP": _http,
+    "MDNS": _mdns,
+    "ICMP": _icmp,
+    "ICMPV6": _icmp,
+    "DNS": _dns,
+    "ARP": _arp,
+    "MODBUS": _modbus,
+    "DNP3": _dnp3,
+    "S7COMM": _s7comm,
+    "TLS": _tls,
+}
+for _protocol in RAW_PROTOCOLS:
+    PAYLOAD_HANDLERS.setdefault(_protocol, None)
+
+
+# Handlers that can come up with "N/A", in which case the first data bytes are shown instead.
+FALLBACK_HANDLERS = (None, _mdns, _tls, _tcp)
+
+
+def _payload_handler(protocol, details, tcp_state):
+    if details is None and tcp_state is None:
+        return None
+    return PAYLOAD_HANDLERS.get(protocol, _tcp if tcp_state is not None else None)
+
+
+def format_payload(fields, tcp_state=None):
+    details = fields["details"]
+    payload = "N/A"
+    handler = _payload_handler(fields["protocol"], details, tcp_state)
+    if handler is not None:
+        payload = handler(fields, details, tcp_state)
+    if payload == "N/A" and fields["data"]:
+        payload = ''.join(chr(b) if 32 <= b <= 126 else '.' for b in fields["data"][:30])
+    return payload
+
+
+def render_payload(inputs):
+    """Summary text of a payload stored as ``PayloadInputs`` bytes (or as marshalled text, returned as is)."""
+    value = marshal.loads(inputs)
+    if isinstance(value, str):
+        return value
+    protocol, details, tcp_flags, tcp_state, data = value
+    # Of the TCP header the handlers only read the flags.
+    fields = {"protocol": protocol, "details": details, "tcp": (None, None, tcp_flags), "data": data}
+    return format_payload(fields, tcp_state)
+
+
+def payload_bytes(payload):
+    """Stored form of a record's payload: ``PayloadInputs`` as they are, rendered text marshalled alike."""
+    return payload if isinstance(payload, bytes) else marshal.dumps(payload)
+
+
+class PayloadInputs(bytes):
+    """Everything ``format_payload`` reads from one packet, marshalled into a compact byte string.
+
+    Records keep these instead of the summary text, which is only rendered
+    when the payload is first read. The data bytes are only kept when the
+    handler may fall back to them.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, fields, tcp_state):
+        protocol = fields["protocol"]
+        details = fields["details"]
+        data = fields["data"]
+        if data and _payload_handler(protocol, details, tcp_state) in FALLBACK_HANDLERS:
+            data = data[:30]
+        else:
+            data = None
+        tcp = fields.get("tcp")
+        return cls(marshal.dumps((protocol, details, tcp[2] if tcp else 0, tcp_state, data)))
+
+    def render(self):
+        return render_payload(self)
+
+
+def latency_probe_payload(payload_bytes, udp_length):
+    if payload_bytes and len(payload_bytes) >= 20:
+        sent_timestamp, sequence, sent_timestamp_ns = struct.unpack('!dIQ', payload_bytes[:20])
+        delay_ms = (time.time_ns() - sent_timestamp_ns) / 1_000_000.0
+        delay_ms_regular = (time.time() - sent_timestamp) * 1000
+        try:
+            message = json.loads(bytes(payload_bytes[20:]).decode('utf-8')).get('message', 'N/A')
+        except Exception:
+            message = 'Parse error'
+        if delay_ms < 0:
+            return f"Seq:{sequence} Delay:{delay_ms:.1f}ms(NEG!) Alt:{delay_ms_regular:.1f}ms Msg:{message[:15]}"
+        return f"Seq:{sequence} Delay:{delay_ms:.1f}ms Msg:{message[:20]}"
+    if payload_bytes and len(payload_bytes) >= 12:
+        sent_timestamp, sequence = struct.unpack('!dI', payload_bytes[:12])
+        delay_ms = (time.time() - sent_timestamp) * 1000
+        try:
+            message = json.loads(bytes(payload_bytes[12:]).decode('utf-8')).get('message', 'N/A')
+        except Exception:
+            message = 'Parse error'
+        if delay_ms < 0:
+            return f"Seq:{sequence} Delay:{delay_ms:.1f}ms(NEG-OLD!) Msg:{message[:15]}"
+        return f"Seq:{sequence} Delay:{delay_ms:.1f}ms Msg:{message[:20]}"
+    return f"Port:{LATENCY_PROBE_PORT} Len:{udp_length if udp_length is not None else 'N/A'}"
+
+
+def make_packet_info(fields, tcp_state, ts_ns, timestamp, size, live=False, interface=None):
+    protocol = fields["protocol"]
+    if live:
+        ports_shown = True
+        if protocol == "UDP" and fields["dst_port"] == LATENCY_PROBE_PORT:
+            payload = latency_probe_payload(fields["data"], fields["details"])
+        else:
+            payload = format_payload(fields, tcp_state)
+    else:
+        ports_shown = tcp_state is not None and protocol not in TCP_APPLICATION_PROTOCOLS
+        payload = PayloadInputs.of(fields, tcp_state)
+    tcp = fields.get("tcp")
+    columns = (ts_ns, timestamp, fields["src_ip"], fields["dst_ip"], protocol, fields["l4"],
+               fields["src_port"], fields["dst_port"], size, tcp[2] if tcp else 0, ports_shown, payload)
+    if live:
+        return LivePacketRecord(*columns, interface=interface)
+    return PacketRecord(*columns)
+
+
+def clean_payload(payload):
+    if not isinstance(payload, str):
+        payload = str(payload)
+    return ''.join(c if 32 <= ord(c) <= 126 else '.' for c in payload)
+
+
+def clip_payload(payload, limit=PAYLOAD_LIMIT):
+    payload = clean_payload(payload)
+    if len(payload) > limit:
+        payload = payload[:limit - 3] + "..."
+    return payload
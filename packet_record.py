@@ -0,0 +1,148 @@
+from collections.abc import Mapping
+from datetime import datetime
+
+LEGACY_KEYS = ("timestamp", "src_ip", "dst_ip", "protocol", "src_port", "dst_port", "size", "payload", "ts_ns")
+LEGACY_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class PacketRecord(Mapping):
+    """Compact decoded packet.
+
+    Ports, size, TCP flags and the capture timestamp are stored as native ints;
+    protocol names and addresses are shared interned strings. The record reads
+    like the legacy packet dict (``packet["src_port"]`` gives ``"N/A"`` where the
+    analyzer hides ports) so existing consumers keep working, and ``to_dict()``
+    produces that dict for JSON exports and Socket.IO payloads. Decoded
+    records hold their payload as ``packet_extraction.PayloadInputs`` until
+    ``payload`` is first read, which renders and keeps the text.
+    """
+
+    __slots__ = ("ts_ns", "timestamp", "src_ip", "dst_ip", "protocol", "l4", "src_port", "dst_port",
+                 "size", "tcp_flags", "ports_shown", "_payload")
+    missing_port = "N/A"
+    _keys = LEGACY_KEYS
+
+    def __init__(self, ts_ns, timestamp, src_ip, dst_ip, protocol, l4, src_port, dst_port, size, tcp_flags,
+                 ports_shown, payload):
+        self.ts_ns = ts_ns
+        self.timestamp = timestamp
+        self.src_ip = src_ip
+        self.dst_ip = dst_ip
+        self.protocol = protocol
+        self.l4 = l4
+        self.src_port = src_port
+        self.dst_port = dst_port
+        self.size = size
+        self.tcp_flags = tcp_flags
+        self.ports_shown = ports_shown
+        self._payload = payload
+
+    @property
+    def payload(self):
+        payload = self._payload
+        if not isinstance(payload, str):
+            payload = self._payload = payload.render()
+        return payload
+
+    @payload.setter
+    def payload(self, value):
+        self._payload = value
+
+    def _port(self, port):
+        if not self.ports_shown or port is None:
+            return self.missing_port
+        return str(port)
+
+    def __getitem__(self, key):
+        if key == "src_port":
+            return self._port(self.src_port)
+        if key == "dst_port":
+            return self._port(self.dst_port)
+        if key in self._keys:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key != "payload":
+            raise KeyError(key)
+        self.payload = value
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self):
+        return {
+            "timestamp": self.timestamp,
+            "src_ip": self.src_ip,
+            "dst_ip": self.dst_ip,
+            "protocol": self.protocol,
+            "src_port": self._port(self.src_port),
+            "dst_port": self._port(self.dst_port),
+            "size": self.size,
+            "payload": self.payload,
+            "ts_ns": self.ts_ns
+        }
+
+
+class LivePacketRecord(PacketRecord):
+    """Record from a live capture, where transport ports are always shown and absent ones read as "-".
+
+    ``interface`` names the interface the packet was captured on.
+    """
+
+    __slots__ = ("interface",)
+    missing_port = "-"
+    _keys = LEGACY_KEYS + ("interface",)
+
+    def __init__(self, *args, interface=None):
+        super().__init__(*args)
+        self.interface = interface
+
+    def to_dict(self):
+        packet = super().to_dict()
+        packet["interface"] = self.interface
+        return packet
+
+
+def packet_ts_ns(packet, timestamp_format=LEGACY_TIMESTAMP_FORMAT):
+    """Capture time of a record or legacy packet dict in epoch nanoseconds, or None.
+
+    Dicts written before records carried ``ts_ns`` fall back to parsing their
+    second-resolution ``timestamp`` string.
+    """
+    ts_ns = packet.get("ts_ns")
+    if ts_ns is not None:
+        return ts_ns
+    try:
+        return int(datetime.strptime(packet.get("timestamp"), timestamp_format).timestamp()) * 1_000_000_000
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_time_ns(value):
+    """Epoch nanoseconds of an ISO 8601 date and time (``2024-05-01 10:00:00``), read as local time."""
+    moment = datetime.fromisoformat(value)
+    return int(moment.replace(microsecond=0).timestamp()) * 1_000_000_000 + moment.microsecond * 1000
+
+
+def time_range_ns(start=None, end=None):
+    """``(start_ns, end_ns)`` for optional ISO start/end strings, or None when neither is given."""
+    if not start and not end:
+        return None
+    return (parse_time_ns(start) if start else 0,
+            parse_time_ns(end) if end else 2 ** 63 - 1)
+
+
+def ns_to_datetime(ts_ns):
+    seconds, nanoseconds = divmod(ts_ns, 1_000_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=nanoseconds // 1000)
+
+
+def to_dicts(packets):
+    return [packet.to_dict() if isinstance(packet, PacketRecord) else packet for packet in packets]
@@ -0,0 +1,397 @@
+import os
+import sys
+
+from array import array
+
+import numpy as np
+
+from packet_extraction import payload_bytes, render_payload
+from packet_record import PacketRecord, LivePacketRecord, packet_ts_ns
+
+
+PAYLOAD_MEMO_ROWS = 65536
+NUMERIC_DTYPES = (("ts_ns", np.int64), ("size", np.int64), ("src_port", np.int32), ("dst_port", np.int32),
+                  ("ports_shown", bool), ("l4", np.uint8), ("tcp_flags", np.uint16))
+STRING_COLUMNS = ("timestamp", "protocol", "src_ip", "dst_ip")
+
+
+def most_common(values, n=None):
+    """Vectorised ``Counter(values).most_common(n)`` for an integer array.
+
+    Ties keep first-occurrence order, like ``Counter``.
+    """
+    if not len(values):
+        return []
+    unique, first, counts = np.unique(values, return_index=True, return_counts=True)
+    order = np.lexsort((first, -counts))
+    if n is not None:
+        order = order[:n]
+    return [(unique[i].item(), counts[i].item()) for i in order]
+
+
+class StringColumn:
+    """Dictionary-encoded string column: ``codes`` index into ``values``."""
+
+    def __init__(self, codes, values):
+        self.codes = codes
+        self.values = values
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        return self.values[self.codes[index]]
+
+    def __iter__(self):
+        values = self.values
+        return (values[code] for code in self.codes.tolist())
+
+    def most_common(self, n=None):
+        return [(self.values[code], count) for code, count in most_common(self.codes, n)]
+
+    def take(self, rows):
+        return StringColumn(self.codes[rows], self.values)
+
+    def code_of(self, value):
+        """Code of ``value`` in the dictionary, or -1 if it never occurs."""
+        try:
+            return self.values.index(value)
+        except ValueError:
+            return -1
+
+
+class BlobColumn:
+    """String column stored as one UTF-8 buffer plus ``len + 1`` offsets; rows are decoded on access.
+
+    ``rows`` optionally selects a subset of the stored strings without copying
+    the buffer. With ``text=False`` the column holds byte strings and rows are
+    returned undecoded.
+    """
+
+    def __init__(self, offsets, blob, rows=None, text=True):
+        self.offsets = offsets
+        self.blob = blob
+        self.rows = rows
+        self.text = text
+
+    @classmethod
+    def from_bytes(cls, values, text=True):
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in values], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b"".join(values), dtype=np.uint8), text=text)
+
+    def __len__(self):
+        return len(self.offsets) - 1 if self.rows is None else len(self.rows)
+
+    def __getitem__(self, index):
+        if self.rows is not None:
+            index = self.rows[index]
+        value = self.blob[self.offsets[index]:self.offsets[index + 1]].tobytes()
+        return value.decode('utf-8', 'surrogatepass') if self.text else value
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def take(self, rows):
+        return BlobColumn(self.offsets, self.blob, rows if self.rows is None else self.rows[rows], self.text)
+
+
+class PayloadColumn:
+    """Payload summaries kept in their stored form; a row's text is rendered when it is read.
+
+    ``inputs`` is a list of rendered strings and ``PayloadInputs``, or a
+    ``BlobColumn`` of bytes as ``packet_extraction.payload_bytes`` stores
+    them. The last ``PAYLOAD_MEMO_ROWS`` rendered rows are memoised.
+    """
+
+    def __init__(self, inputs):
+        self.inputs = inputs
+        self._memo = {}
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def __getitem__(self, index):
+        text = self._memo.get(index)
+        if text is None:
+            text = self.inputs[index]
+            if not isinstance(text, str):
+                text = render_payload(text)
+            if len(self._memo) >= PAYLOAD_MEMO_ROWS:
+                del self._memo[next(iter(self._memo))]
+            self._memo[index] = text
+        return text
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def take(self, rows):
+        if isinstance(self.inputs, BlobColumn):
+            return PayloadColumn(self.inputs.take(rows))
+        return PayloadColumn([self.inputs[index] for index in rows.tolist()])
+
+    def stored(self):
+        """The column as one ``BlobColumn`` of stored payloads, rendering nothing."""
+        if isinstance(self.inputs, BlobColumn) and self.inputs.rows is None:
+            return self.inputs
+        if isinstance(self.inputs, BlobColumn):
+            return BlobColumn.from_bytes([self.inputs[index] for index in range(len(self.inputs))], text=False)
+        return BlobColumn.from_bytes([payload_bytes(payload) for payload in self.inputs], text=False)
+
+
+class _Encoder:
+    def __init__(self, values=None, index=None):
+        self.values = [] if values is None else values
+        self.index = {} if index is None else index
+        self.codes = array('i')
+
+    def append(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def column(self):
+        return StringColumn(np.array(self.codes, dtype=np.int32), self.values)
+
+
+class PacketTableBuilder:
+    def __init__(self):
+        self.ts_ns = array('q')
+        self.size = array('q')
+        self.src_port = array('i')
+        self.dst_port = array('i')
+        self.ports_shown = array('b')
+        self.l4 = array('B')
+        self.tcp_flags = array('H')
+        self.timestamp = _Encoder()
+        self.protocol = _Encoder()
+        self.src_ip = _Encoder()
+        self.dst_ip = _Encoder(self.src_ip.values, self.src_ip.index)
+        self.payload = []
+        self.record_type = PacketRecord
+        self._parsed_timestamps = {}
+
+    def append(self, packet):
+        if isinstance(packet, PacketRecord):
+            ts_ns = packet.ts_ns
+            src_port = packet.src_port
+            dst_port = packet.dst_port
+            ports_shown = packet.ports_shown
+            l4 = packet.l4
+            tcp_flags = packet.tcp_flags
+            payload = packet._payload
+            self.record_type = type(packet)
+        else:
+            ts_ns = packet.get("ts_ns")
+            if ts_ns is None:
+                ts_ns = self._parse_timestamp(packet)
+            src_port = _legacy_port(packet["src_port"])
+            dst_port = _legacy_port(packet["dst_port"])
+            ports_shown = src_port is not None or dst_port is not None
+            l4 = 0
+            tcp_flags = 0
+            payload = packet["payload"]
+            if packet["src_port"] == LivePacketRecord.missing_port:
+                self.record_type = LivePacketRecord
+        self.ts_ns.append(-1 if ts_ns is None else ts_ns)
+        self.size.append(packet["size"])
+        self.src_port.append(-1 if src_port is None else src_port)
+        self.dst_port.append(-1 if dst_port is None else dst_port)
+        self.ports_shown.append(ports_shown)
+        self.l4.append(l4)
+        self.tcp_flags.append(tcp_flags)
+        self.timestamp.append(packet["timestamp"])
+        self.protocol.append(packet["protocol"])
+        self.src_ip.append(packet["src_ip"])
+        self.dst_ip.append(packet["dst_ip"])
+        self.payload.append(payload)
+
+    def _parse_timestamp(self, packet):
+        timestamp = packet["timestamp"]
+        if timestamp not in self._parsed_timestamps:
+            self._parsed_timestamps[timestamp] = packet_ts_ns(packet)
+        return self._parsed_timestamps[timestamp]
+
+    def build(self):
+        return PacketTable(
+            **{name: np.array(getattr(self, name), dtype=dtype) for name, dtype in NUMERIC_DTYPES},
+            **{name: getattr(self, name).column() for name in STRING_COLUMNS},
+            payload=PayloadColumn(self.payload),
+            record_type=self.record_type,
+        )
+
+
+class SpillingTableBuilder(PacketTableBuilder):
+    """``PacketTableBuilder`` that keeps at most about ``memory_budget`` bytes of rows in memory.
+
+    Whenever the buffered rows reach the budget they are appended to one raw
+    file per column under ``directory`` (string columns as dictionary codes,
+    payloads in their stored form as one blob plus offsets). The built table
+    maps those files, so rows are paged in from disk when they are read; the
+    files have to stay in place for as long as the table is in use.
+    """
+
+    # In-memory cost of a buffered row's numeric columns, string codes and
+    # list slot; its payload (inputs or text) is counted by its actual size.
+    ROW_BYTES = 64
+
+    def __init__(self, directory, memory_budget):
+        super().__init__()
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.buffered_bytes = 0
+        self.spilled_rows = 0
+        self.payload_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        with open(self._path("payload_offsets"), 'wb') as f:
+            np.zeros(1, dtype=np.int64).tofile(f)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + ".bin")
+
+    def _append_file(self, name, values):
+        with open(self._path(name), 'ab') as f:
+            values.tofile(f)
+
+    def append(self, packet):
+        super().append(packet)
+        self.buffered_bytes += self.ROW_BYTES + sys.getsizeof(self.payload[-1])
+        if self.buffered_bytes >= self.memory_budget:
+            self.spill()
+
+    def spill(self):
+        if not len(self.size):
+            return
+        for name, dtype in NUMERIC_DTYPES:
+            column = getattr(self, name)
+            self._append_file(name, np.array(column, dtype=dtype))
+            del column[:]
+        for name in STRING_COLUMNS:
+            codes = getattr(self, name).codes
+            self._append_file(name, np.array(codes, dtype=np.int32))
+            del codes[:]
+        payload = BlobColumn.from_bytes([payload_bytes(value) for value in self.payload], text=False)
+        self._append_file("payload_offsets", payload.offsets[1:] + self.payload_bytes)
+        self._append_file("payload", payload.blob)
+        self.payload_bytes += len(payload.blob)
+        self.spilled_rows += len(payload)
+        self.payload = []
+        self.buffered_bytes = 0
+
+    def _map(self, name, dtype, count):
+        if not count:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode='r', shape=(count,))
+
+    def build(self):
+        self.spill()
+        rows = self.spilled_rows
+        return PacketTable(
+            **{name: self._map(name, dtype, rows) for name, dtype in NUMERIC_DTYPES},
+            **{name: StringColumn(self._map(name, np.int32, rows), getattr(self, name).values)
+               for name in STRING_COLUMNS},
+            payload=PayloadColumn(BlobColumn(self._map("payload_offsets", np.int64, rows + 1),
+                                             self._map("payload", np.uint8, self.payload_bytes), text=False)),
+            record_type=self.record_type,
+        )
+
+
+def _legacy_port(value):
+    if isinstance(value, int):
+        return value
+    return int(value) if isinstance(value, str) and value.isdigit() else None
+
+
+class PacketTable:
+    """Columnar packet dataset.
+
+    Numeric columns are NumPy arrays (``-1`` marks a missing timestamp or
+    port); timestamps, protocols and addresses are dictionary-encoded
+    ``StringColumn``s. Iterating or indexing yields ``PacketRecord`` rows, so
+    code written against the packet list keeps working on a table.
+    """
+
+    def __init__(self, ts_ns, size, src_port, dst_port, ports_shown, l4, tcp_flags, timestamp, protocol, src_ip,
+                 dst_ip, payload, record_type=PacketRecord):
+        self.ts_ns = ts_ns
+        self.size = size
+        self.src_port = src_port
+        self.dst_port = dst_port
+        self.ports_shown = ports_shown
+        self.l4 = l4
+        self.tcp_flags = tcp_flags
+        self.timestamp = timestamp
+        self.protocol = protocol
+        self.src_ip = src_ip
+        self.dst_ip = dst_ip
+        self.payload = payload
+        self.record_type = record_type
+
+    @classmethod
+    def from_packets(cls, packets, builder=None):
+        builder = builder or PacketTableBuilder()
+        for packet in packets:
+            builder.append(packet)
+        return builder.build()
+
+    def __len__(self):
+        return len(self.size)
+
+    def __getitem__(self, index):
+        ts_ns = self.ts_ns[index].item()
+        src_port = self.src_port[index].item()
+        dst_port = self.dst_port[index].item()
+        return self.record_type(
+            ts_ns if ts_ns >= 0 else None, self.timestamp[index], self.src_ip[index], self.dst_ip[index],
+            self.protocol[index], self.l4[index].item(), src_port if src_port >= 0 else None,
+            dst_port if dst_port >= 0 else None, self.size[index].item(), self.tcp_flags[index].item(),
+            bool(self.ports_shown[index]), self.payload[index])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def take(self, rows):
+        """New table holding the given row indices, in that order."""
+        payload = self.payload.take(rows)
+        return PacketTable(self.ts_ns[rows], self.size[rows], self.src_port[rows], self.dst_port[rows],
+                           self.ports_shown[rows], self.l4[rows], self.tcp_flags[rows], self.timestamp.take(rows),
+                           self.protocol.take(rows), self.src_ip.take(rows), self.dst_ip.take(rows), payload,
+                           self.record_type)
+
+    def host_mask(self, ip_a=None, ip_b=None):
+        """Boolean mask of the rows ``pcap_reader.matches_hosts`` would keep."""
+        if not ip_a and not ip_b:
+            return np.ones(len(self), dtype=bool)
+        src = self.src_ip.codes
+        dst = self.dst_ip.codes
+        a = self.src_ip.code_of(ip_a) if ip_a else -1
+        b = self.src_ip.code_of(ip_b) if ip_b else -1
+        if ip_a and ip_b:
+            mask = ((src == a) & (dst == b)) | ((src == b) & (dst == a))
+        else:
+            host = a if ip_a else b
+            mask = (src == host) | (dst == host)
+        return mask & (src != self.src_ip.code_of("N/A"))
+
+    def visible_ports(self, ports):
+        return np.where(self.ports_shown & (ports >= 0), ports, -1)
+
+    def protocol_counts(self):
+        return dict(self.protocol.most_common())
+
+    def bytes_per_second(self):
+        valid = self.ts_ns >= 0
+        seconds, inverse = np.unique(self.ts_ns[valid] // 1_000_000_000, return_inverse=True)
+        totals = np.bincount(inverse, weights=self.size[valid], minlength=len(seconds)).astype(np.int64)
+        return seconds, totals
+
+
+def as_table(packets):
+    if isinstance(packets, PacketTable):
+        return packets
+    return PacketTable.from_packets(packets)
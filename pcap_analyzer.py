@@ -3,16 +3,36 @@ import time
 import curses
 import subprocess
 import threading
-import pyshark
+import analysis_cache
+import capture_index
+import pcap_reader
+import record_filter
+import tshark_fields
 import os
 import json
 import csv
 import sys
+import itertools
+import glob
+import heapq
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
 
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from operator import attrgetter
 from datetime import datetime, timedelta
+from packet_record import to_dicts, LEGACY_TIMESTAMP_FORMAT, time_range_ns
+from packet_table import PacketTable, PacketTableBuilder, SpillingTableBuilder
 
 python_cmd = sys.executable
+# Seconds of decoding per display tick while the TUI is still working through a capture.
+DECODE_SLICE = 0.05
+# Packets kept in memory for display before the decoded table is complete.
+DISPLAY_ROWS = 10_000
 
 def clean_string(input_str):
     return input_str.replace('\0', '')
@@ -30,7 +50,7 @@ def wrap_text(text, width):
     return lines
 
 def export_packets(stdscr, packet_data, count, pcap_filename):
-    displayed_packets = packet_data[:count]
+    displayed_packets = list(itertools.islice(packet_data, count))
 
     if not displayed_packets:
         return "Žiadne pakety na export."
@@ -80,219 +100,329 @@ def export_packets(stdscr, packet_data, count, pcap_filename):
     if choice in [2, 3]:
         json_path = f"{base_export_path}_pakety.json"
         with open(json_path, 'w', encoding='utf-8') as jsonfile:
-            json.dump(displayed_packets, jsonfile, indent=4)
+            json.dump(to_dicts(displayed_packets), jsonfile, indent=4)
         exported_files.append(json_path)
     if exported_files:
         return f"Exportovaných {count} paketov do: {', '.join(exported_files)}"
     else:
         return "Export nebol vykonaný."
 
-def analyze_packets(file_path, filters, display_filter=None):
-    if display_filter:
-        cap = pyshark.FileCapture(file_path, display_filter=display_filter)
+class PacketStats:
+    def __init__(self):
+        self.protocol_counts = Counter()
+        self.data_usage = defaultdict(int)
+        self.total_packets = 0
+        # How many packets the source will yield, when that is known up front (a cached table).
+        self.expected_packets = None
+
+    def add(self, packet_info):
+        self.protocol_counts[packet_info["protocol"]] += 1
+        self.data_usage[packet_info.ts_ns // 1_000_000_000] += packet_info.size
+        self.total_packets += 1
+
+    @classmethod
+    def from_table(cls, table, protocol_counts):
+        stats = cls()
+        stats.protocol_counts.update(protocol_counts)
+        seconds, totals = table.bytes_per_second()
+        stats.data_usage.update(zip(seconds.tolist(), totals.tolist()))
+        stats.total_packets = len(table)
+        return stats
+
+    def as_dict(self):
+        return {
+            "protocol_counts": self.protocol_counts,
+            "data_usage": dict(self.data_usage)
+        }
+
+
+def load_session(session):
+    """Analysis result for a session handed over by ``pcap_analyzer``, or None if it is no longer cached."""
+    cached = analysis_cache.load(session) if session else None
+    if cached is None:
+        return None
+    table, protocol_counts = cached
+    result = PacketStats.from_table(table, protocol_counts).as_dict()
+    result["filtered_packets"] = table
+    return result
+
+
+SPILL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".spill")
+SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(value):
+    """Byte count from a size such as ``512M`` or ``2G``."""
+    value = value.strip().upper().removesuffix("B")
+    if value and value[-1] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+
+CAPTURE_EXTENSIONS = tuple(extension + suffix for extension in (".pcap", ".pcapng", ".cap")
+                           for suffix in ("", ".gz", ".xz", ".zst"))
+
+
+def capture_paths(source):
+    """Expand a capture source into capture files: a file, a directory, a glob pattern or a list of those.
+
+    Directories and patterns expand in name order, which for rotating
+    capture sets (``cap_00001_*.pcapng`` ...) is also their time order.
+    """
+    if isinstance(source, (list, tuple)):
+        return [path for item in source for path in capture_paths(item)]
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if name.lower().endswith(CAPTURE_EXTENSIONS) and os.path.isfile(os.path.join(source, name)))
+    if not os.path.exists(source) and glob.has_magic(source):
+        paths = sorted(path for path in glob.glob(source) if os.path.isfile(path))
+        if not paths:
+            raise FileNotFoundError(f"{source} does not match any capture")
+        return paths
+    return [source]
+
+
+def capture_name(source):
+    """Name of a capture source for titles and export file names."""
+    if isinstance(source, (list, tuple)):
+        return ", ".join(os.path.basename(path) for path in source) if len(source) > 1 else source[0]
+    return source
+
+
+def _cache_source(file_path):
+    paths = capture_paths(file_path)
+    return paths[0] if len(paths) == 1 else paths
+
+
+def _file_source(file_path, filters, display_filter=None, workers=None, time_range=None, executor=None):
+    if display_filter or not pcap_reader.is_supported(file_path):
+        return tshark_fields.read_packets(file_path, filters, display_filter, time_range=time_range)
+    if time_range is not None and pcap_reader.compression(file_path) is None:
+        # Only the records inside the window are read, located through the capture index.
+        byte_range = capture_index.load_index(file_path).time_slice(*time_range)
+        return pcap_reader.read_packets(file_path, filters, time_range=time_range, byte_range=byte_range)
+    if workers is None:
+        workers = pcap_reader.default_workers(file_path)
+    index = None
+    if time_range is None and pcap_reader.compression(file_path) is None and not capture_index.has_index(file_path):
+        # The first full pass over a capture records its index on the way.
+        index = pcap_reader.IndexRecorder()
+    packets = pcap_reader.read_packets(file_path, filters, workers=workers, time_range=time_range, executor=executor,
+                                       index=index)
+    if index is None:
+        return packets
+    return _saving_index(packets, file_path, index)
+
+
+def _saving_index(packets, file_path, index):
+    # Saved only once every record has been read; an abandoned pass leaves no index behind.
+    yield from packets
+    capture_index.save_recorded(file_path, index)
+
+
+def _merged_source(paths, filters, display_filter=None, workers=None, time_range=None):
+    # Every capture is decoded on its own (shards of all of them share one
+    # process pool) and the streams are merged by timestamp. Each capture has
+    # to be in time order itself; equal timestamps keep the order of ``paths``.
+    if workers is None:
+        workers = pcap_reader.default_workers(paths)
+    executor = None
+    if workers > 1 and time_range is None and not display_filter:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    sources = []
+    try:
+        sources = [_file_source(path, filters, display_filter, workers, time_range, executor) for path in paths]
+        yield from heapq.merge(*sources, key=attrgetter("ts_ns"))
+    finally:
+        for source in sources:
+            source.close()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _decoded_source(file_path, filters, display_filter=None, workers=None, time_range=None):
+    paths = capture_paths(file_path)
+    if len(paths) == 1:
+        return _file_source(paths[0], filters, display_filter, workers, time_range)
+    return _merged_source(paths, filters, display_filter, workers, time_range)
+
+
+def iter_packets(file_path, filters, display_filter=None, workers=None, stats=None, use_cache=True, session=None,
+                 time_range=None):
+    cached = analysis_cache.load(session) if session else None
+    if cached is not None:
+        # A handed-over session holds the whole capture; host filters are applied to the table rows.
+        table = cached[0]
+        filters = filters or {}
+        rows = np.flatnonzero(table.host_mask(filters.get("ip_a"), filters.get("ip_b"))).tolist()
+        packet_source = (table[index] for index in rows)
+        expected_packets = len(rows)
     else:
-        cap = pyshark.FileCapture(file_path)
-
-    protocol_counts = Counter()
-    filtered_packets = []
-    data_usage = defaultdict(int)
-
-    for packet in cap:
-        try:
-            if hasattr(packet, 'ip'):
-                src_ip = packet.ip.src
-                dst_ip = packet.ip.dst
-            else:
-                if filters and (filters.get('ip_a') or filters.get('ip_b')):
-                    continue
-                src_ip = "N/A"
-                dst_ip = "N/A"
-            if filters:
-                if filters.get('ip_a') and filters.get('ip_b'):
-                    if not ((src_ip == filters['ip_a'] and dst_ip == filters['ip_b']) or
-                            (src_ip == filters['ip_b'] and dst_ip == filters['ip_a'])):
-                        continue
-                elif filters.get('ip_a'):
-                    if src_ip != filters['ip_a'] and dst_ip != filters['ip_a']:
-                        continue
-                elif filters.get('ip_b'):
-                    if src_ip != filters['ip_b'] and dst_ip != filters['ip_b']:
-                        continue
-            timestamp = packet.sniff_time.strftime("%Y-%m-%d %H:%M:%S")
-            packet_size = int(packet.length) if hasattr(packet, 'length') else 0
-
-            if hasattr(packet, 'udp'):
-                protocol = 'UDP'
-            else:
-                protocol = packet.highest_layer
-            src_port = "N/A"
-            dst_port = "N/A"
-            payload = "N/A"
-            raw_protocols = ['TLS', 'QUIC', 'LLMNR', 'SSDP']
-            if protocol in raw_protocols and hasattr(packet, 'data'):
-                protocol_layer = getattr(packet, protocol.lower(), None)
-                if protocol_layer:
-                    for field_name in dir(protocol_layer):
-                        if not field_name.startswith('_') and field_name not in ['field_names', 'layer_name']:
-                            try:
-                                field_value = getattr(protocol_layer, field_name)
-                                if isinstance(field_value, (str, bytes)):
-                                    if len(field_value) > 0:
-                                        payload = f"{field_name}: {field_value[:50]}"
-                                        break
-                            except Exception as e:
-                                payload = f"Error accessing {field_name}: {str(e)}"
-            else:
-                if protocol == "UDP" and hasattr(packet, "udp"):
-                    if hasattr(packet.udp, "length"):
-                        payload = f"Len: {packet.udp.length}"
-                elif protocol == 'HTTP' and hasattr(packet, 'http'):
-                    http_data = []
-                    if hasattr(packet.http, 'request_method'):
-                        http_data.append(f"Method: {packet.http.request_method}")
-                    if hasattr(packet.http, 'request_uri'):
-                        http_data.append(f"URI: {packet.http.request_uri}")
-                    if hasattr(packet.http, 'response_code'):
-                        http_data.append(f"Status: {packet.http.response_code}")
-                    if hasattr(packet.http, 'host'):
-                        http_data.append(f"Host: {packet.http.host}")
-                    payload = ', '.join(http_data)
-                elif protocol == 'MDNS' and hasattr(packet, 'mdns'):
-                    mdns_data = []
-                    if hasattr(packet.mdns, 'qry_name'):
-                        mdns_data.append(f"Query Name: {packet.mdns.qry_name}")
-                    if hasattr(packet.mdns, 'qry_type'):
-                        mdns_data.append(f"Query Type: {packet.mdns.qry_type}")
-                    if hasattr(packet.mdns, 'a'):
-                        mdns_data.append(f"Answer: {packet.mdns.a}")
-                    payload = ', '.join(mdns_data) if mdns_data else "N/A"
-                elif protocol == 'ICMP' and hasattr(packet, 'icmp'):
-                    icmp_data = []
-                    if hasattr(packet.icmp, 'type'):
-                        icmp_data.append(f"Type: {packet.icmp.type}")
-                    if hasattr(packet.icmp, 'code'):
-                        icmp_data.append(f"Code: {packet.icmp.code}")
-                    payload = ', '.join(icmp_data)
-                elif protocol == 'DNS' and hasattr(packet, 'dns'):
-                    dns_data = []
-                    is_response = str(getattr(packet.dns, 'flags_response', '0')) in ['1', 'true', 'True']
-                    dns_data.append("Response" if is_response else "Query")
-                    if hasattr(packet.dns, 'qry_name'):
-                        dns_data.append(f"Name: {packet.dns.qry_name}")
-                    if is_response and hasattr(packet.dns, 'a'):
-                        dns_data.append(f"Answer: {packet.dns.a}")
-                    payload = ', '.join(dns_data)
-                elif protocol == 'ARP' and hasattr(packet, 'arp'):
-                    arp_data = []
-                    if hasattr(packet.arp, 'opcode'):
-                        opcode = int(packet.arp.opcode)
-                        arp_data.append("who-has" if opcode == 1 else "is-at")
-                    if hasattr(packet.arp, 'src_proto_ipv4'):
-                        arp_data.append(f"Sender: {packet.arp.src_proto_ipv4}")
-                    if hasattr(packet.arp, 'dst_proto_ipv4'):
-                        arp_data.append(f"Target: {packet.arp.dst_proto_ipv4}")
-                    payload = ', '.join(arp_data)
-                elif protocol == 'MODBUS' and hasattr(packet, 'modbus'):
-                    modbus_data = []
-                    if hasattr(packet.modbus, 'func_code'):
-                        modbus_data.append(f"Code: {packet.modbus.func_code}")
-                    if hasattr(packet.modbus, 'exception_code'):
-                        modbus_data.append(f"Exception: {packet.modbus.exception_code}")
-                    if hasattr(packet.modbus, 'transaction_id'):
-                        modbus_data.append(f"Transaction ID: {packet.modbus.transaction_id}")
-                    payload = ', '.join(modbus_data)
-                elif protocol == 'DNP3' and hasattr(packet, 'dnp3'):
-                    dnp3_data = []
-                    if hasattr(packet.dnp3, 'ctl_func'):
-                        dnp3_data.append(f"Code: {packet.dnp3.ctl_func}")
-                    if hasattr(packet.dnp3, 'al_obj'):
-                        dnp3_data.append(f"Object: {packet.dnp3.al_obj}")
-                    if hasattr(packet.dnp3, 'al_class'):
-                        dnp3_data.append(f"Class: {packet.dnp3.al_class}")
-                    payload = ', '.join(dnp3_data)
-                elif protocol == 'S7COMM' and hasattr(packet, 's7comm'):
-                    s7_data = []
-                    if hasattr(packet.s7comm, 'param_func'):
-                        s7_data.append(f"Code: {packet.s7comm.param_func}")
-                    if hasattr(packet.s7comm, 'param_setup_rack_num'):
-                        s7_data.append(f"Rack: {packet.s7comm.param_setup_rack_num}")
-                    if hasattr(packet.s7comm, 'param_setup_slot_num'):
-                        s7_data.append(f"Slot: {packet.s7comm.param_setup_slot_num}")
-                    if hasattr(packet.s7comm, 'item_data_type'):
-                        s7_data.append(f"Data Type: {packet.s7comm.item_data_type}")
-                    payload = ', '.join(s7_data)
-                elif hasattr(packet, 'tcp'):
-                    src_port = packet.tcp.srcport
-                    dst_port = packet.tcp.dstport
-
-                    tcp_payload = []
-                    if hasattr(packet.tcp, 'flags'):
-                        try:
-                            flag_value = int(packet.tcp.flags, 16)
-                            flags = []
-                            if flag_value & 0x01: flags.append("FIN")
-                            if flag_value & 0x02: flags.append("SYN")
-                            if flag_value & 0x04: flags.append("RST")
-                            if flag_value & 0x08: flags.append("PSH")
-                            if flag_value & 0x10: flags.append("ACK")
-                            if flag_value & 0x20: flags.append("URG")
-                            if flags:
-                                tcp_payload.append(f"[{','.join(flags)}]")
-                        except ValueError:
-                            pass
-                    if hasattr(packet.tcp, 'seq'):
-                        tcp_payload.append(f"seq={packet.tcp.seq}")
-                    if hasattr(packet.tcp, 'ack'):
-                        tcp_payload.append(f"ack={packet.tcp.ack}")
-                    if hasattr(packet.tcp, 'window_size'):
-                        tcp_payload.append(f"win={packet.tcp.window_size}")
-
-                    extra_tcp_info = []
-                    if hasattr(packet.tcp, 'analysis_retransmission'):
-                        extra_tcp_info.append("Retransmission")
-
-                    combined_payload = ', '.join(tcp_payload + extra_tcp_info) if (
-                                tcp_payload or extra_tcp_info) else "N/A"
-                    payload = combined_payload
-            if payload == "N/A" and hasattr(packet, 'data'):
-                try:
-                    data_bytes = bytes.fromhex(packet.data.data)
-                    printable_chars = ''.join(chr(b) if 32 <= b <= 126 else '.' for b in data_bytes)
-                    payload = printable_chars[:30]
-                except:
-                    payload = "N/A"
-            packet_info = {
-                "timestamp": timestamp,
-                "src_ip": src_ip,
-                "dst_ip": dst_ip,
-                "protocol": protocol,
-                "src_port": src_port,
-                "dst_port": dst_port,
-                "size": packet_size,
-                "payload": payload
-            }
-
-            filtered_packets.append(packet_info)
-            protocol_counts[protocol] += 1
-            data_usage[timestamp] += packet_size
-
-        except Exception as e:
-            print(f"Error processing packet: {e}")
-
-    return {
-        "protocol_counts": protocol_counts,
-        "filtered_packets": filtered_packets,
-        "data_usage": dict(data_usage)
-    }
+        expected_packets = None
+        if use_cache:
+            _, cached = analysis_cache.lookup(_cache_source(file_path), filters, display_filter,
+                                              LEGACY_TIMESTAMP_FORMAT, time_range=time_range)
+        if cached is not None:
+            packet_source = iter(cached[0])
+            expected_packets = len(cached[0])
+        else:
+            packet_source = _decoded_source(file_path, filters, display_filter, workers, time_range)
+    if stats is None:
+        return packet_source
+    stats.expected_packets = expected_packets
+    return _counted(packet_source, stats)
+
+
+def _counted(packet_source, stats):
+    for packet_info in packet_source:
+        stats.add(packet_info)
+        yield packet_info
+
+
+def iter_packet_batches(file_path, filters, display_filter=None, workers=None, stats=None, batch_size=500):
+    batch = []
+    for packet_info in iter_packets(file_path, filters, display_filter, workers, stats):
+        batch.append(packet_info)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class PacketAnalysis:
+    """``analyze_packets`` handed out a batch at a time.
+
+    ``stats`` grows with every batch ``batches`` yields, so the first packets
+    and running totals can be shown while the rest is still being decoded.
+    Once the batches run out, ``result`` holds what ``analyze_packets``
+    returns; a cached capture has it from the start.
+    """
+
+    def __init__(self, file_path, filters, display_filter=None, workers=None, as_table=False, use_cache=True,
+                 time_range=None, memory_budget=None):
+        # A spilled table stays on disk; turning it into records would undo the budget.
+        self.as_table = as_table or memory_budget is not None
+        self.result = None
+        self.pending = None
+        self.key = cached = None
+        if use_cache:
+            self.key, cached = analysis_cache.lookup(_cache_source(file_path), filters, display_filter,
+                                                     LEGACY_TIMESTAMP_FORMAT, time_range=time_range)
+        if cached is not None:
+            table, protocol_counts = cached
+            self.stats = PacketStats.from_table(table, protocol_counts)
+            self.packets = None
+            self._finish(table)
+            return
+        self.builder = PacketTableBuilder()
+        if memory_budget is not None:
+            os.makedirs(SPILL_DIR, exist_ok=True)
+            self.builder = SpillingTableBuilder(tempfile.mkdtemp(dir=SPILL_DIR), memory_budget)
+        self.stats = PacketStats()
+        self.packets = iter_packets(file_path, filters, display_filter, workers, self.stats, False,
+                                    time_range=time_range)
+
+    def batches(self, batch_size=500):
+        """Yield the decoded packets in lists of ``batch_size``, adding each to the table being built."""
+        if self.packets is None:
+            return
+        batch = []
+        for packet in self.packets:
+            self.builder.append(packet)
+            batch.append(packet)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        self.packets = None
+        self._store(self.builder.build())
+
+    def advance(self, seconds):
+        """Decode for about ``seconds`` and return the packets decoded meanwhile."""
+        if self.pending is None:
+            self.pending = self.batches()
+        decoded = []
+        deadline = time.monotonic() + seconds
+        while self.result is None and time.monotonic() < deadline:
+            decoded.extend(next(self.pending, ()))
+        return decoded
+
+    def finish(self):
+        """Decode whatever is left and return the result."""
+        for _ in self.batches():
+            pass
+        return self.result
+
+    def _store(self, table):
+        cached = None
+        if self.key is not None:
+            analysis_cache.store(self.key, table, self.stats.protocol_counts)
+            # The stored entry maps the same columns from disk, so the
+            # in-memory payload inputs (or spill files) can be let go.
+            cached = analysis_cache.load(self.key)
+        spilled = isinstance(self.builder, SpillingTableBuilder)
+        if cached is not None:
+            table = cached[0]
+            if spilled:
+                shutil.rmtree(self.builder.directory, ignore_errors=True)
+        elif spilled:
+            weakref.finalize(table, shutil.rmtree, self.builder.directory, True)
+        self._finish(table)
+
+    def _finish(self, table):
+        result = self.stats.as_dict()
+        result["session"] = self.key
+        result["filtered_packets"] = table if self.as_table else list(table)
+        self.result = result
+
+
+def analyze_packets(file_path, filters, display_filter=None, workers=None, as_table=False, use_cache=True,
+                    time_range=None, memory_budget=None):
+    """Decode a capture (or capture set) into packet statistics and a table of its packets.
+
+    With ``memory_budget`` (bytes) decoded rows are spilled to disk once the
+    budget is reached and the table pages them back in; the statistics are
+    still aggregated in memory. The table is then returned as it is, even
+    without ``as_table``.
+    """
+    return PacketAnalysis(file_path, filters, display_filter, workers, as_table, use_cache, time_range,
+                          memory_budget).finish()
+
+
+def filter_packets(analysis_result, file_path, filters, display_filter, use_cache=True, time_range=None,
+                   memory_budget=None):
+    """Apply a display filter to an analysed capture.
+
+    Expressions ``record_filter`` understands are evaluated against the
+    decoded table; anything else re-runs the analysis through tshark.
+    """
+    try:
+        table = record_filter.apply_filter(display_filter, analysis_result["filtered_packets"])
+    except record_filter.UnsupportedFilterError:
+        return analyze_packets(file_path, filters, display_filter=display_filter, as_table=True, use_cache=use_cache,
+                               time_range=time_range, memory_budget=memory_budget)
+    result = PacketStats.from_table(table, table.protocol_counts()).as_dict()
+    result["filtered_packets"] = table
+    result["session"] = None
+    return result
 
 
 def main(stdscr):
     stdscr.clear()
     max_y, max_x = stdscr.getmaxyx()
     parser = argparse.ArgumentParser(description="Analýza PCAP súboru")
-    parser.add_argument("pcap_file", type=str, help="Cesta k súboru PCAP")
+    parser.add_argument("pcap_file", type=str, nargs="+",
+                        help="Cesta k súboru PCAP, adresár so záznamami alebo vzor, napr. 'cap_*.pcapng'")
     parser.add_argument("--ip_a", type=str, help="IP adresa prvého zariadenia (voliteľné)")
     parser.add_argument("--ip_b", type=str, help="IP adresa druhého zariadenia (voliteľné)")
+    parser.add_argument("--workers", type=int, help="Počet procesov na dekódovanie (voliteľné)")
+    parser.add_argument("--no-cache", action="store_true", help="Nepoužiť uložené výsledky analýzy")
+    parser.add_argument("--start", type=str, help="Začiatok časového okna, napr. 2024-05-01 10:00:00 (voliteľné)")
+    parser.add_argument("--end", type=str, help="Koniec časového okna, napr. 2024-05-01 10:05:00 (voliteľné)")
+    parser.add_argument("--memory-budget", type=parse_size,
+                        help="Limit pamäte pre dekódované pakety, napr. 512M; zvyšok sa ukladá na disk (voliteľné)")
     args = parser.parse_args()
     filters = {}
     if args.ip_a:
@@ -301,8 +431,17 @@ def main(stdscr):
         filters["ip_b"] = args.ip_b
     if not filters:
         filters = None
-    packets = analyze_packets(args.pcap_file, filters)
-    total_packets = len(packets["filtered_packets"])
+    time_range = time_range_ns(args.start, args.end)
+    capture = args.pcap_file[0] if len(args.pcap_file) == 1 else args.pcap_file
+    pcap_name = capture_name(capture_paths(capture))
+    # Packets are shown as they are decoded; the full result (session, table
+    # for filtering) exists once the analysis has run through the capture.
+    analysis = PacketAnalysis(capture, filters, workers=args.workers, as_table=True, use_cache=not args.no_cache,
+                              time_range=time_range, memory_budget=args.memory_budget)
+    packets = all_packets = session = None
+    # Until then the first packets are kept in a list for display and export.
+    rows = []
+    total_packets = analysis.stats.total_packets
 
     previous_timestamp = None
     pause_start_time = None
@@ -312,7 +451,7 @@ def main(stdscr):
     current_value = 0
     packet_lines = []
     remaining_packets = total_packets
-    protocol_counts = {protocol: 0 for protocol in packets["protocol_counts"].keys()}
+    protocol_counts = {}
     stdscr.timeout(100)
     sniffing_event = threading.Event()
     sniffing_event.set()
@@ -321,7 +460,7 @@ def main(stdscr):
     scroll_position = 0
     visible_lines = max_y - 13
 
-    stdscr.addstr(0, 0, "Analýza PCAP súboru: " + args.pcap_file)
+    stdscr.addstr(0, 0, "Analýza PCAP súboru: " + pcap_name)
     status_msg = "Zachytávanie aktívne. Stlačte E na pozastavenie."
 
     packet_idx = 0
@@ -329,13 +468,26 @@ def main(stdscr):
     processing_complete = False
 
     while True:
+        if packets is None:
+            decoded = analysis.advance(DECODE_SLICE)
+            rows.extend(decoded[:DISPLAY_ROWS - len(rows)])
+            total_packets = analysis.stats.total_packets
+            if analysis.result is not None:
+                packets = all_packets = analysis.result
+                session = packets["session"]
+                rows = packets["filtered_packets"]
+                total_packets = len(rows)
+            remaining_packets = total_packets - current_value
         key = stdscr.getch()
         if key == ord('F') or key == ord('f'):
             return
         elif key == ord('A') or key == ord('a'):
             curses.endwin()
             try:
-                subprocess.run([python_cmd, r"two_devices.py"])
+                command = [python_cmd, r"two_devices.py"]
+                if session and not filters and isinstance(capture, str):
+                    command += ["--pcap_file", capture, "--session", session]
+                subprocess.run(command)
             except Exception as e:
                 print(f"Error running two_devices.py: {e}")
             finally:
@@ -350,7 +502,7 @@ def main(stdscr):
 
             try:
                 curses.endwin()
-                subprocess.run([python_cmd, "filter.py", args.pcap_file])
+                subprocess.run([python_cmd, "filter.py", capture_paths(capture)[0]])
                 stdscr = curses.initscr()
                 curses.start_color()
                 curses.curs_set(0)
@@ -362,14 +514,20 @@ def main(stdscr):
 
                     if display_filter:
                         status_msg = f"Aplikované filtre: {display_filter}"
+                        if packets is None:
+                            packets = all_packets = analysis.finish()
+                            session = packets["session"]
                         protocol_counts = {}
                         packet_lines = []
                         scroll_position = 0
                         current_value = 0
                         packet_idx = 0
                         previous_timestamp = None
-                        packets = analyze_packets(args.pcap_file, filters, display_filter=display_filter)
-                        total_packets = len(packets["filtered_packets"])
+                        packets = filter_packets(all_packets, capture, filters, display_filter,
+                                                 use_cache=not args.no_cache, time_range=time_range,
+                                                 memory_budget=args.memory_budget)
+                        rows = packets["filtered_packets"]
+                        total_packets = len(rows)
                         remaining_packets = total_packets
                         protocol_counts = {protocol: 0 for protocol in packets["protocol_counts"].keys()}
                         processing_complete = False
@@ -379,21 +537,29 @@ def main(stdscr):
                 stdscr.addstr(max_y - 3, 0, f"Chyba pri aplikovaní filtru: {str(e)}".center(max_x))
             if original_sniffing_state:
                 sniffing_event.set()
-            update_display(stdscr, max_x, max_y, args.pcap_file, current_value, total_packets,
+            update_display(stdscr, max_x, max_y, pcap_name, current_value, total_packets,
                            progress_bar_width, protocol_counts, packet_lines, scroll_position,
-                           visible_lines, remaining_packets, status_msg)
+                           visible_lines, remaining_packets, status_msg, packets is None)
         elif key == ord('C') or key == ord('c'):
+            command = [python_cmd, "static_visualisations_selector.py", *args.pcap_file]
+            # The selector charts the whole capture; a host-filtered session would narrow it.
+            if session and not filters:
+                command += ["--session", session]
+            for option, value in (("--start", args.start), ("--end", args.end),
+                                  ("--memory-budget", args.memory_budget and str(args.memory_budget))):
+                if value:
+                    command += [option, value]
             try:
                 if os.name == 'nt':
                     process = subprocess.Popen(
-                        [python_cmd, "static_visualisations_selector.py", args.pcap_file],
+                        command,
                         creationflags=subprocess.CREATE_NEW_CONSOLE,
                         stdout=subprocess.PIPE,
                         stderr=subprocess.PIPE
                     )
                 else:
                     process = subprocess.Popen(
-                        [python_cmd, "static_visualisations_selector.py", args.pcap_file],
+                        command,
                         stdout=subprocess.PIPE,
                         stderr=subprocess.PIPE,
                         start_new_session=True
@@ -402,9 +568,9 @@ def main(stdscr):
 
             except Exception as e:
                 status_msg = f"Chyba pri spustení vizualizácie: {str(e)}"
-            update_display(stdscr, max_x, max_y, args.pcap_file, current_value, total_packets,
+            update_display(stdscr, max_x, max_y, pcap_name, current_value, total_packets,
                            progress_bar_width, protocol_counts, packet_lines, scroll_position,
-                           visible_lines, remaining_packets, status_msg)
+                           visible_lines, remaining_packets, status_msg, packets is None)
             continue
         elif key == ord('D') or key == ord('d'):
             original_sniffing_state = sniffing_event.is_set()
@@ -412,7 +578,8 @@ def main(stdscr):
                 sniffing_event.clear()
 
             try:
-                export_msg = export_packets(stdscr, packets["filtered_packets"], packet_idx, args.pcap_file)
+                export_msg = export_packets(stdscr, rows, packet_idx,
+                                            capture_paths(capture)[0])
                 status_msg = export_msg
                 stdscr.addstr(max_y - 2, 0, status_msg[:max_x - 1].center(max_x))
                 stdscr.refresh()
@@ -429,21 +596,21 @@ def main(stdscr):
                 time.sleep(2)
             if original_sniffing_state:
                 sniffing_event.set()
-            update_display(stdscr, max_x, max_y, args.pcap_file, current_value, total_packets,
+            update_display(stdscr, max_x, max_y, pcap_name, current_value, total_packets,
                            progress_bar_width, protocol_counts, packet_lines, scroll_position,
-                           visible_lines, remaining_packets, status_msg)
+                           visible_lines, remaining_packets, status_msg, packets is None)
             continue
         elif key == curses.KEY_UP and scroll_position > 0:
             scroll_position -= 1
-            update_display(stdscr, max_x, max_y, args.pcap_file, current_value, total_packets,
+            update_display(stdscr, max_x, max_y, pcap_name, current_value, total_packets,
                            progress_bar_width, protocol_counts, packet_lines, scroll_position,
-                           visible_lines, remaining_packets, status_msg)
+                           visible_lines, remaining_packets, status_msg, packets is None)
             continue
         elif key == curses.KEY_DOWN and scroll_position < max(0, len(packet_lines) - visible_lines):
             scroll_position += 1
-            update_display(stdscr, max_x, max_y, args.pcap_file, current_value, total_packets,
+            update_display(stdscr, max_x, max_y, pcap_name, current_value, total_packets,
                            progress_bar_width, protocol_counts, packet_lines, scroll_position,
-                           visible_lines, remaining_packets, status_msg)
+                           visible_lines, remaining_packets, status_msg, packets is None)
             continue
         elif key == ord('E') or key == ord('e'):
             if not processing_complete:
@@ -468,12 +635,12 @@ def main(stdscr):
             time.sleep(0.1)
             continue
 
-        if packet_idx < total_packets:
-            packet_info = packets["filtered_packets"][packet_idx]
-            current_timestamp = datetime.strptime(packet_info["timestamp"], "%Y-%m-%d %H:%M:%S")
+        if packet_idx < len(rows):
+            packet_info = rows[packet_idx]
+            current_timestamp = packet_info.ts_ns
 
             if previous_timestamp:
-                delta_time = (current_timestamp - previous_timestamp).total_seconds()
+                delta_time = (current_timestamp - previous_timestamp) / 1_000_000_000
             previous_timestamp = current_timestamp
 
             current_value += 1
@@ -491,20 +658,20 @@ def main(stdscr):
             if len(packet_lines) > visible_lines:
                 scroll_position = len(packet_lines) - visible_lines
             packet_idx += 1
-            if packet_idx >= total_packets:
-                processing_complete = True
-                status_msg = "Zachytávanie dokončené. Použite menu možnosti alebo F pre koniec."
-        update_display(stdscr, max_x, max_y, args.pcap_file, current_value, total_packets,
+        if packets is not None and packet_idx >= total_packets:
+            processing_complete = True
+            status_msg = "Zachytávanie dokončené. Použite menu možnosti alebo F pre koniec."
+        update_display(stdscr, max_x, max_y, pcap_name, current_value, total_packets,
                        progress_bar_width, protocol_counts, packet_lines, scroll_position,
-                       visible_lines, remaining_packets, status_msg)
+                       visible_lines, remaining_packets, status_msg, packets is None)
 
 
 def update_display(stdscr, max_x, max_y, pcap_file, current_value, total_packets,
                    progress_bar_width, protocol_counts, packet_lines, scroll_position,
-                   visible_lines, remaining_packets, status_msg):
+                   visible_lines, remaining_packets, status_msg, decoding=False):
     stdscr.clear()
     stdscr.addstr(0, 0, "Analýza PCAP súboru: " + pcap_file)
-    num_hashes = int((current_value / total_packets) * progress_bar_width)
+    num_hashes = int((current_value / total_packets) * progress_bar_width) if total_packets else 0
     progress_bar = f"Progress: [{'#' * num_hashes}{' ' * (progress_bar_width - num_hashes)}] {current_value}/{total_packets}"
     stdscr.addstr(1, 0, progress_bar)
 
@@ -523,7 +690,10 @@ def update_display(stdscr, max_x, max_y, pcap_file, current_value, total_packets
     for i, line_idx in enumerate(range(scroll_position, visible_end), start=protocol_y_offset + 2):
         if line_idx < len(packet_lines):
             stdscr.addstr(i, 0, packet_lines[line_idx])
-    stdscr.addstr(max_y - 5, 0, f"Zostávajúce pakety: {remaining_packets}".center(max_x))
+    remaining = f"Zostávajúce pakety: {remaining_packets}"
+    if decoding:
+        remaining += " (dekódovanie prebieha)"
+    stdscr.addstr(max_y - 5, 0, remaining.center(max_x))
     stdscr.addstr(max_y - 4, 0, "MENU: A) Vizualizácia 2 zariadení podľa IP B) Filtrovanie C) Vizualizácia".center(max_x))
     stdscr.addstr(max_y - 3, 0, "D) Export (JSON/CSV) E) ŠTART/STOP zachytávania F) Koniec".center(max_x))
     stdscr.addstr(max_y - 2, 0, status_msg.center(max_x))
@@ -0,0 +1,940 @@
+import gzip
+import itertools
+import lzma
+import mmap
+import os
+import queue
+import socket
+import struct
+import threading
+import zlib
+
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from packet_extraction import TCP_APPLICATION_PROTOCOLS, make_packet_info
+
+PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1000),
+    b"\xa1\xb2\xc3\xd4": (">", 1000),
+    b"\x4d\x3c\xb2\xa1": ("<", 1),
+    b"\xa1\xb2\x3c\x4d": (">", 1),
+}
+PCAPNG_SHB = b"\x0a\x0d\x0d\x0a"
+COMPRESSION_MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"\xfd7zXZ\x00": "xz",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LOOP = 108
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+RAW_IP_LINKTYPES = (12, 14, LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6)
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_ARP = 0x0806
+ETHERTYPE_IPV6 = 0x86DD
+VLAN_ETHERTYPES = (0x8100, 0x88A8, 0x9100)
+
+IPV6_EXTENSION_HEADERS = (0, 43, 60)
+IP_PROTOCOL_NAMES = {1: "ICMP", 2: "IGMP", 6: "TCP", 17: "UDP", 47: "GRE", 50: "ESP", 58: "ICMPV6", 89: "OSPF",
+                     132: "SCTP"}
+TCP_PORT_NAMES = {21: "FTP", 22: "SSH", 23: "TELNET", 25: "SMTP", 88: "KERBEROS", 110: "POP", 143: "IMAP",
+                  389: "LDAP", 3389: "RDP"}
+HTTP_PORTS = (80, 8000, 8080)
+HTTP_METHODS = (b"GET ", b"POST ", b"PUT ", b"DELETE ", b"HEAD ", b"OPTIONS ", b"PATCH ", b"CONNECT ", b"TRACE ")
+MODBUS_PORT = 502
+DNP3_PORT = 20000
+S7COMM_PORT = 102
+TLS_PORTS = (443, 8443)
+
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+SHARDS_PER_WORKER = 4
+DECOMPRESS_CHUNK_BYTES = 1024 * 1024
+DECOMPRESS_QUEUE_CHUNKS = 8
+
+_u16 = struct.Struct("!H")
+_tcp_header = struct.Struct("!HHIIBBH")
+_udp_header = struct.Struct("!HHH")
+
+
+class UnsupportedCaptureError(Exception):
+    pass
+
+
+def compression(file_path):
+    """Name of the compression a capture is stored with (``gzip``, ``xz`` or ``zstd``), or None."""
+    try:
+        with open(file_path, 'rb') as f:
+            magic = f.read(6)
+    except OSError:
+        return None
+    for prefix, name in COMPRESSION_MAGIC.items():
+        if magic.startswith(prefix):
+            return name
+    return None
+
+
+def _open_compressed(file_path, kind):
+    if kind == "gzip":
+        return gzip.open(file_path, 'rb')
+    if kind == "xz":
+        return lzma.open(file_path, 'rb')
+    try:
+        import zstandard
+    except ImportError:
+        raise UnsupportedCaptureError(f"Reading {file_path} requires the zstandard package")
+    return zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), read_across_frames=True, closefd=True)
+
+
+def is_supported(file_path):
+    kind = compression(file_path)
+    try:
+        if kind is not None:
+            with _open_compressed(file_path, kind) as f:
+                magic = f.read(4)
+        else:
+            with open(file_path, 'rb') as f:
+                magic = f.read(4)
+    except Exception:
+        # Unreadable, corrupt or needing a missing decompressor; tshark gets to try instead.
+        return False
+    return magic in PCAP_MAGIC or magic == PCAPNG_SHB
+
+
+def iter_frames(file_path, start=None, end=None, state=None, offsets=False):
+    """Yield ``(ts_ns, orig_len, linktype, frame)`` for each record, prefixed by the record's file offset if ``offsets``.
+
+    Compressed captures are read front to back; their offsets count
+    decompressed bytes and ``start``/``end`` do not apply to them.
+    """
+    kind = compression(file_path)
+    if kind is not None:
+        yield from _iter_compressed_frames(file_path, kind, offsets)
+        return
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        magic = mm[:4]
+        if magic in PCAP_MAGIC:
+            yield from _iter_pcap_frames(mm, start or 24, end, offsets)
+        elif magic == PCAPNG_SHB:
+            yield from _iter_pcapng_frames(mm, start or 0, end, state, offsets)
+        else:
+            raise UnsupportedCaptureError(f"Unsupported capture format: {file_path}")
+    finally:
+        try:
+            mm.close()
+        except BufferError:
+            pass
+
+
+def _decompressed_chunks(file_path, kind):
+    # Decompression runs in its own thread (zlib, lzma and zstandard release
+    # the GIL while they work) and hands chunks over through a bounded queue,
+    # so it overlaps with frame decoding without buffering the whole capture.
+    chunks = queue.Queue(maxsize=DECOMPRESS_QUEUE_CHUNKS)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def produce():
+        try:
+            with _open_compressed(file_path, kind) as f:
+                while not stop.is_set():
+                    # read1 returns what one decompression step produced, so
+                    # when a truncated archive raises EOFError every byte
+                    # decompressed before it has already been handed over.
+                    chunk = f.read1(DECOMPRESS_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    put(chunk)
+        except EOFError:
+            # A truncated archive ends like a truncated capture: at the last complete record.
+            pass
+        except Exception as e:
+            put(e)
+        put(None)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _iter_compressed_frames(file_path, kind, offsets=False):
+    # Decompressed data is parsed a window at a time with the same iterators
+    # as mapped files; the incomplete record at the end of each window is
+    # carried over into the next one.
+    chunks = _decompressed_chunks(file_path, kind)
+    try:
+        window = next(chunks, b"")
+        while len(window) < 24:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            window += chunk
+        magic = window[:4]
+        if magic in PCAP_MAGIC:
+            header, window, base = window[:24], window[24:], 24
+            while True:
+                # Each window starts with the file header, which _iter_pcap_frames reads the format from.
+                window = header + window
+                resume = 24
+                for offset, ts_ns, orig_len, linktype, frame in _iter_pcap_frames(window, 24, None, True):
+                    resume = offset + 16 + len(frame)
+                    if offsets:
+                        yield base + offset - 24, ts_ns, orig_len, linktype, frame
+                    else:
+                        yield ts_ns, orig_len, linktype, frame
+                base += resume - 24
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                window = window[resume:] + chunk
+        elif magic == PCAPNG_SHB:
+            state, base = None, 0
+            while True:
+                resume, next_state = 0, state
+                for offset, _, block_len, endian, interfaces in _iter_pcapng_blocks(window, 0, None, state):
+                    resume, next_state = offset + block_len, (endian, tuple(interfaces))
+                for frame_info in _iter_pcapng_frames(window, 0, resume, state, offsets):
+                    if offsets:
+                        yield (base + frame_info[0],) + frame_info[1:]
+                    else:
+                        yield frame_info
+                state, base = next_state, base + resume
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                window = window[resume:] + chunk
+        elif window:
+            raise UnsupportedCaptureError(f"Unsupported capture format: {file_path}")
+    finally:
+        chunks.close()
+
+
+def _iter_pcap_frames(mm, offset=24, end=None, offsets=False):
+    endian, ns_per_unit = PCAP_MAGIC[mm[:4]]
+    linktype = struct.unpack_from(endian + "I", mm, 20)[0] & 0x0FFFFFFF
+    record_header = struct.Struct(endian + "IIII")
+    view = memoryview(mm)
+    end = len(mm) if end is None else end
+    try:
+        while offset + 16 <= end:
+            ts_sec, ts_frac, incl_len, orig_len = record_header.unpack_from(mm, offset)
+            offset += 16
+            if offset + incl_len > end:
+                break
+            frame = view[offset:offset + incl_len]
+            ts_ns = ts_sec * 1_000_000_000 + ts_frac * ns_per_unit
+            if offsets:
+                yield offset - 16, ts_ns, orig_len, linktype, frame
+            else:
+                yield ts_ns, orig_len, linktype, frame
+            frame.release()
+            offset += incl_len
+    finally:
+        view.release()
+
+
+def _tsresol_to_ns(value):
+    if value & 0x80:
+        return lambda ts: (ts * 1_000_000_000) >> (value & 0x7F)
+    units = 10 ** (value & 0x7F)
+    if units <= 1_000_000_000:
+        factor = 1_000_000_000 // units
+        return lambda ts: ts * factor
+    divisor = units // 1_000_000_000
+    return lambda ts: ts // divisor
+
+
+def _parse_idb(mm, endian, body_start, body_end):
+    linktype, _, snaplen = struct.unpack_from(endian + "HHI", mm, body_start)
+    tsresol = 6
+    offset_ns = 0
+    option = body_start + 8
+    while option + 4 <= body_end:
+        code, length = struct.unpack_from(endian + "HH", mm, option)
+        if code == 0:
+            break
+        value_start = option + 4
+        if code == 9 and length >= 1:
+            tsresol = mm[value_start]
+        elif code == 14 and length >= 8:
+            offset_ns = struct.unpack_from(endian + "q", mm, value_start)[0] * 1_000_000_000
+        option = value_start + ((length + 3) & ~3)
+    return linktype, snaplen, tsresol, offset_ns
+
+
+def _iter_pcapng_blocks(mm, offset=0, end=None, state=None):
+    end = len(mm) if end is None else end
+    endian, interfaces = state if state else ("<", [])
+    interfaces = list(interfaces)
+    while offset + 12 <= end:
+        block_type = mm[offset:offset + 4]
+        if block_type == PCAPNG_SHB:
+            bom = mm[offset + 8:offset + 12]
+            endian = "<" if bom == b"\x4d\x3c\x2b\x1a" else ">"
+            interfaces = []
+        block_type, block_len = struct.unpack_from(endian + "II", mm, offset)
+        if block_len < 12 or offset + block_len > end:
+            break
+        if block_type == 1:
+            interfaces.append(_parse_idb(mm, endian, offset + 8, offset + block_len - 4))
+        yield offset, block_type, block_len, endian, interfaces
+        offset += block_len
+
+
+def _iter_pcapng_frames(mm, offset=0, end=None, state=None, offsets=False):
+    view = memoryview(mm)
+    converters = {}
+    try:
+        for offset, block_type, block_len, endian, interfaces in _iter_pcapng_blocks(mm, offset, end, state):
+            body = offset + 8
+            if block_type == 6 or block_type == 2:
+                if block_type == 6:
+                    if_id, ts_high, ts_low, cap_len, orig_len = struct.unpack_from(endian + "IIIII", mm, body)
+                else:
+                    if_id, _, ts_high, ts_low, cap_len, orig_len = struct.unpack_from(endian + "HHIIII", mm, body)
+                if if_id < len(interfaces):
+                    linktype, _, tsresol, offset_ns = interfaces[if_id]
+                    to_ns = converters.get(tsresol)
+                    if to_ns is None:
+                        to_ns = converters[tsresol] = _tsresol_to_ns(tsresol)
+                    data = body + 20
+                    frame = view[data:data + cap_len]
+                    ts_ns = to_ns((ts_high << 32) | ts_low) + offset_ns
+                    if offsets:
+                        yield offset, ts_ns, orig_len, linktype, frame
+                    else:
+                        yield ts_ns, orig_len, linktype, frame
+                    frame.release()
+            elif block_type == 3 and interfaces:
+                linktype, snaplen, _, _ = interfaces[0]
+                orig_len = struct.unpack_from(endian + "I", mm, body)[0]
+                cap_len = min(orig_len, snaplen) if snaplen else orig_len
+                frame = view[body + 4:body + 4 + cap_len]
+                if offsets:
+                    yield offset, 0, orig_len, linktype, frame
+                else:
+                    yield 0, orig_len, linktype, frame
+                frame.release()
+    finally:
+        view.release()
+
+
+def plan_shards(file_path, count):
+    """Split a capture into ``count`` record-aligned byte ranges of roughly equal size.
+
+    Each shard is ``(start, end, state)``; ``state`` carries the pcapng section
+    endianness and interface table in effect at ``start`` so a worker can
+    resume decoding mid-file.
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        magic = mm[:4]
+        target = max(size // max(count, 1), 1)
+        shards = []
+        if magic in PCAP_MAGIC:
+            record_header = struct.Struct(PCAP_MAGIC[magic][0] + "I")
+            start = offset = 24
+            while offset + 16 <= size:
+                if offset - start >= target:
+                    shards.append((start, offset, None))
+                    start = offset
+                offset += 16 + record_header.unpack_from(mm, offset + 8)[0]
+            shards.append((start, size, None))
+        elif magic == PCAPNG_SHB:
+            start, start_state, state = 0, None, None
+            for offset, _, _, endian, interfaces in _iter_pcapng_blocks(mm):
+                if offset - start >= target:
+                    shards.append((start, offset, start_state))
+                    start, start_state = offset, state
+                state = (endian, tuple(interfaces))
+            shards.append((start, size, start_state))
+        else:
+            raise UnsupportedCaptureError(f"Unsupported capture format: {file_path}")
+        return shards
+    finally:
+        mm.close()
+
+
+_address_cache = {}
+
+
+def _ipv4(frame, offset):
+    raw = bytes(frame[offset:offset + 4])
+    address = _address_cache.get(raw)
+    if address is None:
+        address = socket.inet_ntoa(raw)
+        _address_cache[raw] = address
+    return address
+
+
+def _link_payload(linktype, frame):
+    if linktype == LINKTYPE_ETHERNET:
+        if len(frame) < 14:
+            return None, 0
+        ethertype = _u16.unpack_from(frame, 12)[0]
+        offset = 14
+        while ethertype in VLAN_ETHERTYPES and len(frame) >= offset + 4:
+            ethertype = _u16.unpack_from(frame, offset + 2)[0]
+            offset += 4
+        if ethertype <= 1500:
+            return "LLC", offset
+        return ethertype, offset
+    if linktype in RAW_IP_LINKTYPES:
+        if not frame:
+            return None, 0
+        return (ETHERTYPE_IPV6 if frame[0] >> 4 == 6 else ETHERTYPE_IPV4), 0
+    if linktype in (LINKTYPE_NULL, LINKTYPE_LOOP):
+        if len(frame) < 4:
+            return None, 0
+        family = frame[0] if frame[0] else frame[3]
+        return (ETHERTYPE_IPV4 if family == 2 else ETHERTYPE_IPV6), 4
+    if linktype == LINKTYPE_LINUX_SLL:
+        if len(frame) < 16:
+            return None, 0
+        return _u16.unpack_from(frame, 14)[0], 16
+    if linktype == LINKTYPE_LINUX_SLL2:
+        if len(frame) < 20:
+            return None, 0
+        return _u16.unpack_from(frame, 0)[0], 20
+    return None, 0
+
+
+def flow_hash(linktype, frame):
+    """Direction-independent CRC32 of a frame's IP 5-tuple, or 0 for non-IP frames.
+
+    Both directions of a conversation hash to the same value, so the index can
+    pick out a flow without decoding it.
+    """
+    ethertype, offset = _link_payload(linktype, frame)
+    if ethertype == ETHERTYPE_IPV4 and len(frame) >= offset + 20:
+        l4 = frame[offset + 9]
+        src = bytes(frame[offset + 12:offset + 16])
+        dst = bytes(frame[offset + 16:offset + 20])
+        fragment = _u16.unpack_from(frame, offset + 6)[0] & 0x1FFF
+        transport = None if fragment else offset + (frame[offset] & 0x0F) * 4
+    elif ethertype == ETHERTYPE_IPV6 and len(frame) >= offset + 40:
+        l4 = frame[offset + 6]
+        src = bytes(frame[offset + 8:offset + 24])
+        dst = bytes(frame[offset + 24:offset + 40])
+        transport = offset + 40
+    else:
+        return 0
+    if (l4 == 6 or l4 == 17) and transport is not None and len(frame) >= transport + 4:
+        src += bytes(frame[transport:transport + 2])
+        dst += bytes(frame[transport + 2:transport + 4])
+    if dst < src:
+        src, dst = dst, src
+    return zlib.crc32(src + dst + bytes((l4,)))
+
+
+class IndexRecorder:
+    """File offset, timestamp and flow hash of every record a decode pass reads, collected for ``capture_index``."""
+
+    def __init__(self):
+        self.offsets = array('q')
+        self.timestamps = array('q')
+        self.flows = array('I')
+
+    def track(self, frames):
+        """Record the frames of ``iter_frames(..., offsets=True)`` and pass them on without their offset."""
+        for offset, ts_ns, orig_len, linktype, frame in frames:
+            self.offsets.append(offset)
+            self.timestamps.append(ts_ns)
+            self.flows.append(flow_hash(linktype, frame))
+            yield ts_ns, orig_len, linktype, frame
+
+    def extend(self, recorded):
+        offsets, timestamps, flows = recorded
+        self.offsets.extend(offsets)
+        self.timestamps.extend(timestamps)
+        self.flows.extend(flows)
+
+    def recorded(self):
+        return self.offsets, self.timestamps, self.flows
+
+
+def decode_frame(linktype, frame):
+    fields = {
+        "src_ip": "N/A",
+        "dst_ip": "N/A",
+        "protocol": "DATA",
+        "l4": 0,
+        "src_port": None,
+        "dst_port": None,
+        "details": None,
+        "data": None,
+    }
+    ethertype, offset = _link_payload(linktype, frame)
+    if ethertype is None:
+        fields["protocol"] = "DATA" if linktype == LINKTYPE_ETHERNET else "FRAME"
+        return fields
+    if ethertype == "LLC":
+        fields["protocol"] = "LLC"
+        return fields
+    if ethertype == ETHERTYPE_ARP:
+        fields["protocol"] = "ARP"
+        if len(frame) >= offset + 28:
+            fields["details"] = (_u16.unpack_from(frame, offset + 6)[0],
+                                 _ipv4(frame, offset + 14), _ipv4(frame, offset + 24))
+        return fields
+    if ethertype == ETHERTYPE_IPV4:
+        if len(frame) < offset + 20:
+            fields["protocol"] = "IP"
+            return fields
+        header_len = (frame[offset] & 0x0F) * 4
+        total_len = _u16.unpack_from(frame, offset + 2)[0]
+        fragment = _u16.unpack_from(frame, offset + 6)[0] & 0x1FFF
+        l4 = frame[offset + 9]
+        fields["src_ip"] = _ipv4(frame, offset + 12)
+        fields["dst_ip"] = _ipv4(frame, offset + 16)
+        end = min(len(frame), offset + total_len) if total_len else len(frame)
+        if fragment:
+            fields["protocol"] = "IP"
+            fields["data"] = frame[offset + header_len:end]
+            return fields
+        _decode_transport(fields, l4, frame, offset + header_len, end, "IP")
+        return fields
+    if ethertype == ETHERTYPE_IPV6:
+        if len(frame) < offset + 40:
+            fields["protocol"] = "IPV6"
+            return fields
+        payload_len = _u16.unpack_from(frame, offset + 4)[0]
+        l4 = frame[offset + 6]
+        end = min(len(frame), offset + 40 + payload_len)
+        offset += 40
+        while l4 in IPV6_EXTENSION_HEADERS or l4 == 44 or l4 == 51:
+            if offset + 8 > end:
+                break
+            next_header = frame[offset]
+            if l4 == 44:
+                if _u16.unpack_from(frame, offset + 2)[0] & 0xFFF8:
+                    fields["protocol"] = "IPV6"
+                    return fields
+                offset += 8
+            elif l4 == 51:
+                offset += (frame[offset + 1] + 2) * 4
+            else:
+                offset += (frame[offset + 1] + 1) * 8
+            l4 = next_header
+        _decode_transport(fields, l4, frame, offset, end, "IPV6")
+        return fields
+    fields["protocol"] = "ETH"
+    return fields
+
+
+def _decode_transport(fields, l4, frame, offset, end, network_name):
+    fields["l4"] = l4
+    if l4 == 6 and end - offset >= 20:
+        src_port, dst_port, seq, ack, data_offset, flags, window = _tcp_header.unpack_from(frame, offset)
+        header_len = (data_offset >> 4) * 4
+        data = frame[offset + header_len:end] if offset + header_len < end else frame[end:end]
+        fields["src_port"] = src_port
+        fields["dst_port"] = dst_port
+        fields["tcp"] = (seq, ack, flags, window,
+                         _tcp_window_scale(frame, offset + 20, offset + header_len) if flags & 0x02 else None)
+        fields["data"] = data
+        fields["data_len"] = len(data)
+        fields["protocol"] = _tcp_application(fields, src_port, dst_port, data)
+    elif l4 == 17 and end - offset >= 8:
+        src_port, dst_port, length = _udp_header.unpack_from(frame, offset)
+        fields["src_port"] = src_port
+        fields["dst_port"] = dst_port
+        fields["protocol"] = "UDP"
+        fields["details"] = length
+        fields["data"] = frame[offset + 8:end]
+    elif (l4 == 1 or l4 == 58) and end - offset >= 2:
+        fields["protocol"] = IP_PROTOCOL_NAMES[l4]
+        fields["details"] = (frame[offset], frame[offset + 1])
+    else:
+        fields["protocol"] = IP_PROTOCOL_NAMES.get(l4, network_name)
+        if l4 not in IP_PROTOCOL_NAMES:
+            fields["data"] = frame[offset:end]
+
+
+def _tcp_window_scale(frame, start, end):
+    while start < end:
+        kind = frame[start]
+        if kind == 0:
+            break
+        if kind == 1:
+            start += 1
+            continue
+        if start + 1 >= end:
+            break
+        length = frame[start + 1]
+        if kind == 3 and length == 3 and start + 2 < end:
+            return min(frame[start + 2], 14)
+        if length < 2:
+            break
+        start += length
+    return None
+
+
+def _tcp_application(fields, src_port, dst_port, data):
+    if not data:
+        return "TCP"
+    if src_port in HTTP_PORTS or dst_port in HTTP_PORTS:
+        head = bytes(data[:2048])
+        if head.startswith(HTTP_METHODS) or head.startswith(b"HTTP/"):
+            fields["details"] = _parse_http(head)
+            return "HTTP"
+    if (src_port == MODBUS_PORT or dst_port == MODBUS_PORT) and len(data) >= 8:
+        transaction_id = _u16.unpack_from(data, 0)[0]
+        func_code = data[7]
+        exception_code = data[8] if func_code & 0x80 and len(data) >= 9 else None
+        fields["details"] = (func_code & 0x7F, exception_code, transaction_id)
+        return "MODBUS"
+    if (src_port == DNP3_PORT or dst_port == DNP3_PORT) and len(data) >= 10 and data[0] == 0x05 and data[1] == 0x64:
+        group = variation = None
+        objects = 15 if len(data) > 12 and data[12] in (0x81, 0x82, 0x83) else 13
+        if len(data) > objects + 1:
+            group = data[objects]
+            variation = data[objects + 1]
+        dnp3_class = variation - 1 if group == 60 and 1 <= variation <= 4 else None
+        fields["details"] = (data[3] & 0x0F, group, dnp3_class)
+        return "DNP3"
+    if (src_port == S7COMM_PORT or dst_port == S7COMM_PORT) and len(data) >= 7 and data[0] == 0x03:
+        cotp = 4 + 1 + data[4]
+        if len(data) > cotp + 10 and data[cotp] == 0x32:
+            rosctr = data[cotp + 1]
+            header_len = 12 if rosctr in (2, 3) else 10
+            param = cotp + header_len
+            func = data[param] if len(data) > param else None
+            data_type = None
+            # Read/Write Var jobs: the first item's transport size, like s7comm.item_data_type.
+            if rosctr == 1 and func in (4, 5) and len(data) > param + 5 and data[param + 2] == 0x12:
+                data_type = data[param + 5]
+            # Rack and slot are filled in from the connection request by TcpStreamTracker.
+            fields["details"] = (func, None, None, data_type)
+            return "S7COMM"
+        if data[5] & 0xF0 == 0xE0:
+            fields["rack_slot"] = _cotp_rack_slot(data, min(cotp, len(data)))
+        return "COTP"
+    if (src_port in TLS_PORTS or dst_port in TLS_PORTS) and len(data) >= 5 and 20 <= data[0] <= 23 and data[1] == 3:
+        fields["details"] = _parse_tls(data)
+        return "TLS"
+    name = TCP_PORT_NAMES.get(dst_port) or TCP_PORT_NAMES.get(src_port)
+    return name or "DATA"
+
+
+def _cotp_rack_slot(data, end):
+    # Parameters of a COTP connection request; the called TSAP's second byte is rack * 32 + slot.
+    offset = 11
+    while offset + 2 <= end:
+        code, length = data[offset], data[offset + 1]
+        if code == 0xC2 and length == 2 and offset + 4 <= end:
+            return data[offset + 3] >> 5, data[offset + 3] & 0x1F
+        offset += 2 + length
+    return None
+
+
+def _parse_tls(data):
+    content_type = data[0]
+    handshake_type = server_name = None
+    if content_type == 22 and len(data) >= 6:
+        handshake_type = data[5]
+        if handshake_type == 1:
+            server_name = _tls_server_name(data)
+    return content_type, handshake_type, server_name
+
+
+def _tls_server_name(data):
+    # Record header (5) + handshake header (4) + version (2) + random (32),
+    # then the variable-length session id, cipher suites and compression
+    # methods before the extensions block.
+    end = min(len(data), 5 + _u16.unpack_from(data, 3)[0])
+    offset = 43
+    if offset >= end:
+        return None
+    offset += 1 + data[offset]
+    if offset + 2 > end:
+        return None
+    offset += 2 + _u16.unpack_from(data, offset)[0]
+    if offset >= end:
+        return None
+    offset += 1 + data[offset]
+    if offset + 2 > end:
+        return None
+    extensions_end = min(end, offset + 2 + _u16.unpack_from(data, offset)[0])
+    offset += 2
+    while offset + 4 <= extensions_end:
+        extension_type, length = struct.unpack_from("!HH", data, offset)
+        offset += 4
+        if extension_type == 0:
+            # server_name_list: list length (2), name type (1), name length (2), name
+            if length >= 5 and offset + 5 <= extensions_end and data[offset + 2] == 0:
+                name_length = _u16.unpack_from(data, offset + 3)[0]
+                if offset + 5 + name_length <= extensions_end:
+                    return bytes(data[offset + 5:offset + 5 + name_length]).decode('ascii', 'replace')
+            return None
+        offset += length
+    return None
+
+
+def _parse_http(head):
+    method = uri = status = host = None
+    lines = head.split(b"\r\n")
+    first = lines[0].split(b" ")
+    if head.startswith(b"HTTP/"):
+        if len(first) > 1:
+            status = first[1].decode('latin-1')
+    else:
+        method = first[0].decode('latin-1')
+        if len(first) > 1:
+            uri = first[1].decode('latin-1')
+    for line in lines[1:]:
+        if not line:
+            break
+        if line[:5].lower() == b"host:":
+            host = line[5:].strip().decode('latin-1')
+            break
+    return method, uri, status, host
+
+
+class TcpStreamTracker:
+    def __init__(self):
+        self.streams = {}
+        self.rack_slots = {}
+
+    def update(self, fields):
+        seq, ack, flags, window, window_scale = fields["tcp"]
+        forward = (fields["src_ip"], fields["src_port"], fields["dst_ip"], fields["dst_port"])
+        backward = (fields["dst_ip"], fields["dst_port"], fields["src_ip"], fields["src_port"])
+        rack_slot = fields.get("rack_slot")
+        if rack_slot is not None:
+            self.rack_slots[forward] = self.rack_slots[backward] = rack_slot
+        elif fields["protocol"] == "S7COMM" and forward in self.rack_slots:
+            func, _, _, data_type = fields["details"]
+            fields["details"] = (func, *self.rack_slots[forward], data_type)
+        state = self.streams.get(forward)
+        if state is None:
+            state = [seq, None, None]
+            self.streams[forward] = state
+        reverse = self.streams.get(backward)
+        if flags & 0x02:
+            state[0] = seq
+            state[2] = window_scale
+        base_seq, next_seq, scale = state
+
+        segment_len = fields["data_len"] + (1 if flags & 0x03 else 0)
+        retransmission = (next_seq is not None and segment_len > 0 and
+                          ((seq - next_seq) & 0xFFFFFFFF) > 0x7FFFFFFF and
+                          not (segment_len <= 1 and ((seq + 1 - next_seq) & 0xFFFFFFFF) == 0 and not flags & 0x03))
+        segment_end = (seq + segment_len) & 0xFFFFFFFF
+        if next_seq is None or ((segment_end - next_seq) & 0xFFFFFFFF) < 0x80000000:
+            state[1] = segment_end
+
+        relative_ack = None
+        if flags & 0x10:
+            relative_ack = (ack - reverse[0]) & 0xFFFFFFFF if reverse else ack
+        if not flags & 0x02 and scale is not None and reverse is not None and reverse[2] is not None:
+            window <<= scale
+        return (seq - base_seq) & 0xFFFFFFFF, relative_ack, window, retransmission
+
+
+def matches_hosts(src_ip, dst_ip, ip_a, ip_b):
+    if src_ip == "N/A":
+        return False
+    if ip_a and ip_b:
+        return (src_ip == ip_a and dst_ip == ip_b) or (src_ip == ip_b and dst_ip == ip_a)
+    if ip_a:
+        return src_ip == ip_a or dst_ip == ip_a
+    return src_ip == ip_b or dst_ip == ip_b
+
+
+class TimestampFormatter:
+    def __init__(self, timestamp_format):
+        self.timestamp_format = timestamp_format
+        self.last_second = None
+        self.last_value = None
+
+    def __call__(self, ts_ns):
+        second = ts_ns // 1_000_000_000
+        if second != self.last_second:
+            self.last_value = datetime.fromtimestamp(second).strftime(self.timestamp_format)
+            self.last_second = second
+        return self.last_value
+
+
+def default_workers(file_path):
+    paths = file_path if isinstance(file_path, (list, tuple)) else [file_path]
+    try:
+        size = sum(os.path.getsize(path) for path in paths)
+    except OSError:
+        return 1
+    return (os.cpu_count() or 1) if size >= PARALLEL_MIN_BYTES else 1
+
+
+def packed_ipv4(address):
+    # Only IPv4 headers fill in src_ip/dst_ip, so an address that does not
+    # round-trip through inet_ntoa can never match and packs to b"".
+    if not address:
+        return None
+    try:
+        packed = socket.inet_aton(address)
+    except OSError:
+        return b""
+    return packed if socket.inet_ntoa(packed) == address else b""
+
+
+def host_matcher(ip_a, ip_b):
+    """Raw-frame equivalent of ``matches_hosts``: compares the IPv4 header addresses before anything is decoded."""
+    a = packed_ipv4(ip_a)
+    b = packed_ipv4(ip_b)
+    if a is not None and b is not None:
+        pairs = {a + b, b + a}
+
+        def matches(linktype, frame):
+            ethertype, offset = _link_payload(linktype, frame)
+            return (ethertype == ETHERTYPE_IPV4 and len(frame) >= offset + 20 and
+                    bytes(frame[offset + 12:offset + 20]) in pairs)
+    else:
+        host = a if a is not None else b
+
+        def matches(linktype, frame):
+            ethertype, offset = _link_payload(linktype, frame)
+            if ethertype != ETHERTYPE_IPV4 or len(frame) < offset + 20:
+                return False
+            addresses = bytes(frame[offset + 12:offset + 20])
+            return addresses[:4] == host or addresses[4:] == host
+    return matches
+
+
+def _iter_decoded_frames(file_path, ip_a, ip_b, start=None, end=None, state=None, time_range=None, index=None):
+    # ``index`` records every record read, before any filter drops it.
+    if index is None:
+        frames = iter_frames(file_path, start, end, state)
+    else:
+        frames = index.track(iter_frames(file_path, start, end, state, offsets=True))
+    if time_range is not None:
+        start_ns, end_ns = time_range
+        frames = (frame for frame in frames if start_ns <= frame[0] < end_ns)
+    if ip_a or ip_b:
+        matches = host_matcher(ip_a, ip_b)
+        frames = (frame for frame in frames if matches(frame[2], frame[3]))
+    for ts_ns, orig_len, linktype, frame in frames:
+        yield ts_ns, orig_len, decode_frame(linktype, frame)
+
+
+def _needs_tcp_state(fields):
+    # S7 packets also wait for the tracker, which knows their connection's rack and slot.
+    return (fields["protocol"] not in TCP_APPLICATION_PROTOCOLS or fields["details"] is None
+            or fields["protocol"] == "S7COMM")
+
+
+def _decode_shard(file_path, start, end, state, ip_a, ip_b, timestamp_format, index=False):
+    # Everything that does not depend on TCP stream state is finished here; the
+    # parent only replays the tracker and formats the generic TCP packets. With
+    # ``index`` the shard's part of the capture index comes back alongside.
+    format_timestamp = TimestampFormatter(timestamp_format)
+    decoded = []
+    recorder = IndexRecorder() if index else None
+    for ts_ns, orig_len, fields in _iter_decoded_frames(file_path, ip_a, ip_b, start, end, state, index=recorder):
+        data = fields["data"]
+        if data is not None:
+            fields["data"] = bytes(data[:30])
+        timestamp = format_timestamp(ts_ns)
+        if "tcp" not in fields:
+            decoded.append((make_packet_info(fields, None, ts_ns, timestamp, orig_len), None))
+        elif _needs_tcp_state(fields):
+            decoded.append(((ts_ns, timestamp, orig_len), fields))
+        else:
+            decoded.append((make_packet_info(fields, (None, None, None, False), ts_ns, timestamp, orig_len), fields))
+    return decoded, recorder.recorded() if recorder else None
+
+
+def _iter_parallel_packets(file_path, ip_a, ip_b, timestamp_format, workers, executor=None, index=None):
+    # Shards are decoded out of process but consumed strictly in file order, so
+    # the stateful TCP tracking sees the same sequence as the serial path. Only
+    # a bounded window of shards is in flight at once.
+    shards = iter(plan_shards(file_path, workers * SHARDS_PER_WORKER))
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    tracker = TcpStreamTracker()
+
+    def submit(count):
+        for start, end, state in itertools.islice(shards, count):
+            pending.append(executor.submit(_decode_shard, file_path, start, end, state, ip_a, ip_b,
+                                           timestamp_format, index is not None))
+
+    try:
+        submit(workers * 2)
+        while pending:
+            decoded, recorded = pending.popleft().result()
+            submit(1)
+            if index is not None:
+                index.extend(recorded)
+            for packet_info, fields in decoded:
+                if fields is not None:
+                    tcp_state = tracker.update(fields)
+                    if type(packet_info) is tuple:
+                        packet_info = make_packet_info(fields, tcp_state, *packet_info)
+                yield packet_info
+    finally:
+        if owns_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            for future in pending:
+                future.cancel()
+
+
+def read_packets(file_path, filters=None, timestamp_format="%Y-%m-%d %H:%M:%S", workers=1, time_range=None,
+                 byte_range=None, executor=None, index=None):
+    """Decode a capture into packet records.
+
+    ``time_range`` keeps packets with ``start_ns <= ts_ns < end_ns``;
+    ``byte_range`` is a ``(start, end, state)`` span from the capture index
+    that limits reading to the records that can fall inside it. Parallel
+    decoding submits its shards to ``executor`` when one is shared between
+    several captures. Compressed captures are always decoded serially. An
+    ``IndexRecorder`` passed as ``index`` collects every record read, host
+    filtered or not.
+    """
+    ip_a = filters.get('ip_a') if filters else None
+    ip_b = filters.get('ip_b') if filters else None
+    if workers > 1 and time_range is None and compression(file_path) is None:
+        yield from _iter_parallel_packets(file_path, ip_a, ip_b, timestamp_format, workers, executor, index)
+        return
+    tracker = TcpStreamTracker()
+    format_timestamp = TimestampFormatter(timestamp_format)
+
+    start, end, state = byte_range or (None, None, None)
+    for ts_ns, orig_len, fields in _iter_decoded_frames(file_path, ip_a, ip_b, start, end, state, time_range, index):
+        tcp_state = tracker.update(fields) if "tcp" in fields else None
+        yield make_packet_info(fields, tcp_state, ts_ns, format_timestamp(ts_ns), orig_len)
@@ -0,0 +1,189 @@
+import re
+
+import numpy as np
+
+from pcap_reader import packed_ipv4
+
+TOKEN = re.compile(r'\s*(?:(\(|\)|&&|\|\||==|!=|>=|<=|>|<|!)|"([^"]*)"|([A-Za-z0-9_.:/-]+))')
+KEYWORDS = {"and": "&&", "or": "||", "not": "!", "eq": "==", "ne": "!=", "gt": ">", "lt": "<", "ge": ">=",
+            "le": "<="}
+COMPARISONS = ("==", "!=", ">", "<", ">=", "<=")
+
+ADDRESS_FIELDS = {"ip.src": ("src_ip",), "ip.dst": ("dst_ip",), "ip.addr": ("src_ip", "dst_ip")}
+PORT_FIELDS = {
+    "tcp.srcport": (6, ("src_port",)), "tcp.dstport": (6, ("dst_port",)), "tcp.port": (6, ("src_port", "dst_port")),
+    "udp.srcport": (17, ("src_port",)), "udp.dstport": (17, ("dst_port",)), "udp.port": (17, ("src_port", "dst_port")),
+}
+TRANSPORT_PROTOCOLS = {"tcp": 6, "udp": 17}
+# Only names the decoders put in the protocol column; UDP-borne protocols
+# such as DNS are recorded as "UDP" and have to go through tshark.
+PROTOCOL_NAMES = ("http", "arp", "icmp", "icmpv6", "modbus", "dnp3", "s7comm", "cotp", "tls")
+
+
+class UnsupportedFilterError(Exception):
+    pass
+
+
+def tokenize(expression):
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = TOKEN.match(expression, position)
+        if match is None or match.end() == position:
+            raise UnsupportedFilterError(f"Unexpected input at: {expression[position:]}")
+        operator, quoted, word = match.groups()
+        if operator:
+            tokens.append(operator)
+        elif quoted is not None:
+            tokens.append(("value", quoted))
+        else:
+            tokens.append(KEYWORDS.get(word.lower(), word))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise UnsupportedFilterError(f"Unexpected token: {self.peek()}")
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek() == "||":
+            self.take()
+            node = ("or", node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek() == "&&":
+            self.take()
+            node = ("and", node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.peek() == "!":
+            self.take()
+            return ("not", self.parse_not())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        token = self.take()
+        if token == "(":
+            node = self.parse_or()
+            if self.take() != ")":
+                raise UnsupportedFilterError("Missing closing parenthesis")
+            return node
+        if not isinstance(token, str) or token in ("(", ")", "&&", "||") or token in COMPARISONS:
+            raise UnsupportedFilterError(f"Expected a field, got: {token}")
+        field = token.lower()
+        if self.peek() in COMPARISONS:
+            operator = self.take()
+            value = self.take()
+            if value is None or (isinstance(value, str) and (value in COMPARISONS or value in ("(", ")", "&&",
+                                                                                              "||", "!"))):
+                raise UnsupportedFilterError(f"Missing value after {field} {operator}")
+            return ("compare", field, operator, value[1] if isinstance(value, tuple) else value)
+        return ("field", field)
+
+
+def _compare(column, operator, value):
+    if operator == "==":
+        return column == value
+    if operator == "!=":
+        return column != value
+    if operator == ">":
+        return column > value
+    if operator == "<":
+        return column < value
+    if operator == ">=":
+        return column >= value
+    return column <= value
+
+
+def _any_of(table, names, test):
+    mask = test(getattr(table, names[0]))
+    for name in names[1:]:
+        mask |= test(getattr(table, name))
+    return mask
+
+
+def _evaluate(node, table):
+    kind = node[0]
+    if kind == "or":
+        return _evaluate(node[1], table) | _evaluate(node[2], table)
+    if kind == "and":
+        return _evaluate(node[1], table) & _evaluate(node[2], table)
+    if kind == "not":
+        return ~_evaluate(node[1], table)
+    if kind == "field":
+        return _field_present(node[1], table)
+    return _field_compare(node[1], node[2], node[3], table)
+
+
+def _field_present(field, table):
+    if field in TRANSPORT_PROTOCOLS:
+        return table.l4 == TRANSPORT_PROTOCOLS[field]
+    if field in PROTOCOL_NAMES:
+        return table.protocol.codes == table.protocol.code_of(field.upper())
+    if field in ("ip",) + tuple(ADDRESS_FIELDS):
+        return table.src_ip.codes != table.src_ip.code_of("N/A")
+    if field in PORT_FIELDS:
+        return table.l4 == PORT_FIELDS[field][0]
+    if field in ("frame", "frame.len"):
+        return np.ones(len(table), dtype=bool)
+    raise UnsupportedFilterError(f"Unsupported field: {field}")
+
+
+def _field_compare(field, operator, value, table):
+    # "a != b" is evaluated as "!(a == b)", matching Wireshark's all-not-equal
+    # semantics for fields that occur more than once (ip.addr, tcp.port).
+    if operator == "!=":
+        return ~_field_compare(field, "==", value, table)
+    if field in ADDRESS_FIELDS:
+        if operator != "==" or not packed_ipv4(value):
+            raise UnsupportedFilterError(f"Unsupported address comparison: {field} {operator} {value}")
+        code = table.src_ip.code_of(value)
+        return _any_of(table, ADDRESS_FIELDS[field], lambda column: column.codes == code)
+    if field in PORT_FIELDS or field == "frame.len":
+        try:
+            number = int(value, 0)
+        except ValueError:
+            raise UnsupportedFilterError(f"Expected a number: {field} {operator} {value}")
+        if field == "frame.len":
+            return _compare(table.size, operator, number)
+        l4, names = PORT_FIELDS[field]
+        return (table.l4 == l4) & _any_of(table, names,
+                                          lambda column: (column >= 0) & _compare(column, operator, number))
+    raise UnsupportedFilterError(f"Unsupported field: {field}")
+
+
+def compile_filter(expression):
+    """Parse a display-filter expression into a predicate returning a row mask for a ``PacketTable``.
+
+    Covers ip.src/ip.dst/ip.addr, tcp/udp ports, frame.len and the protocol
+    names the decoders assign, combined with and/or/not; anything else raises
+    ``UnsupportedFilterError`` so the caller can hand the expression to tshark.
+    """
+    tree = _Parser(tokenize(expression)).parse()
+    return lambda table: _evaluate(tree, table)
+
+
+def apply_filter(expression, table):
+    predicate = compile_filter(expression)
+    return table.take(np.flatnonzero(predicate(table)))
@@ -0,0 +1,55 @@
+class RingBuffer:
+    """Fixed-capacity sequence over a preallocated list; appending to a full buffer overwrites the oldest item.
+
+    Indices are relative to the oldest item still held, so it reads like a
+    list of the last ``capacity`` appends. ``dropped`` counts the items that
+    have rolled off so far.
+    """
+
+    __slots__ = ("_items", "_start", "_count", "dropped")
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self._items = [None] * capacity
+        self._start = 0
+        self._count = 0
+        self.dropped = 0
+
+    @property
+    def capacity(self):
+        return len(self._items)
+
+    def __len__(self):
+        return self._count
+
+    def append(self, item):
+        capacity = len(self._items)
+        if self._count < capacity:
+            self._items[(self._start + self._count) % capacity] = item
+            self._count += 1
+        else:
+            self._items[self._start] = item
+            self._start = (self._start + 1) % capacity
+            self.dropped += 1
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("ring buffer index out of range")
+        return self._items[(self._start + index) % len(self._items)]
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def clear(self):
+        self._items = [None] * len(self._items)
+        self._start = 0
+        self._count = 0
+        self.dropped = 0
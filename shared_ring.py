@@ -0,0 +1,130 @@
+import os
+import struct
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+RING_CAPACITY = 65536
+RING_MAGIC = 0x676E6952746B6370
+HEADER_BYTES = 64
+# magic, capacity, generation, head (number of records published so far)
+_header = struct.Struct("<QQQQ")
+_head = struct.Struct("<Q")
+_record = struct.Struct("<Qqqii16s40s40s")
+RECORD_DTYPE = np.dtype([("seq", "<u8"), ("ts_ns", "<i8"), ("size", "<i8"), ("src_port", "<i4"),
+                         ("dst_port", "<i4"), ("protocol", "S16"), ("src_ip", "S40"), ("dst_ip", "S40")])
+assert RECORD_DTYPE.itemsize == _record.size
+
+
+def ring_name():
+    return f"pcap_live_{os.getpid()}"
+
+
+def _attach(name):
+    # Before Python 3.13 every process that attaches registers the segment
+    # with its resource tracker, which unlinks it when that process exits;
+    # only the creator may do that.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        memory = shared_memory.SharedMemory(name=name)
+        if os.name != 'nt':
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(memory._name, "shared_memory")
+        return memory
+
+
+class PacketRing:
+    """Single-writer ring of fixed-size packet records in shared memory.
+
+    Record ``n`` (counting from 0 since the last ``reset``) lives in slot
+    ``n % capacity`` and carries ``seq = n + 1``, written after the rest of the
+    record; the header's ``head`` is bumped last. Readers copy slots without
+    locking and then drop any the writer may have been overwriting meanwhile:
+    those whose ``seq`` changed and the one slot the writer was busy with.
+    """
+
+    def __init__(self, name=None, capacity=RING_CAPACITY):
+        self.capacity = capacity
+        self.memory = shared_memory.SharedMemory(name=name or ring_name(), create=True,
+                                                 size=HEADER_BYTES + capacity * _record.size)
+        self.name = self.memory.name
+        self.generation = 0
+        self.head = 0
+        _header.pack_into(self.memory.buf, 0, RING_MAGIC, capacity, self.generation, self.head)
+
+    def publish(self, packet):
+        """Append one live packet record (or packet dict)."""
+        offset = HEADER_BYTES + (self.head % self.capacity) * _record.size
+        buf = self.memory.buf
+        _record.pack_into(buf, offset, 0, packet.get("ts_ns") or 0, packet["size"], _port(packet["src_port"]),
+                          _port(packet["dst_port"]), packet["protocol"].encode('ascii', 'replace'),
+                          packet["src_ip"].encode('ascii', 'replace'), packet["dst_ip"].encode('ascii', 'replace'))
+        self.head += 1
+        _head.pack_into(buf, offset, self.head)
+        _head.pack_into(buf, 24, self.head)
+
+    def reset(self):
+        """Start a new capture session; readers see the generation change and drop what they have aggregated."""
+        self.generation += 1
+        self.head = 0
+        _header.pack_into(self.memory.buf, 0, RING_MAGIC, self.capacity, self.generation, self.head)
+
+    def close(self):
+        self.memory.close()
+        try:
+            self.memory.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _port(value):
+    if isinstance(value, int):
+        return value
+    return int(value) if isinstance(value, str) and value.isdigit() else -1
+
+
+class RingReader:
+    """Reader of a ``PacketRing`` created by another process."""
+
+    def __init__(self, name):
+        self.memory = _attach(name)
+        magic, self.capacity, _, _ = _header.unpack_from(self.memory.buf, 0)
+        if magic != RING_MAGIC:
+            self.memory.close()
+            raise ValueError(f"{name} is not a packet ring")
+        self.records = np.ndarray((self.capacity,), dtype=RECORD_DTYPE, buffer=self.memory.buf, offset=HEADER_BYTES)
+        self.generation = None
+        self.position = 0
+        self.lost = 0
+
+    def read(self, start=None):
+        """``(records, reset)``: a copy of the records published since the previous call.
+
+        ``reset`` is True when the writer started a new session since then (or
+        on the first call); reading then restarts at record ``start`` if given,
+        else at the oldest record still in the ring. Records overwritten before
+        they could be read are counted in ``lost``.
+        """
+        _, _, generation, head = _header.unpack_from(self.memory.buf, 0)
+        reset = generation != self.generation
+        if reset:
+            self.generation = generation
+            self.position = max(head - self.capacity, 0) if start is None else min(start, head)
+        first = max(self.position, head - self.capacity)
+        self.lost += first - self.position
+        if head <= first:
+            self.position = max(self.position, head)
+            return self.records[:0].copy(), reset
+        indices = np.arange(first, head)
+        records = self.records[indices % self.capacity]
+        head_after = _head.unpack_from(self.memory.buf, 24)[0]
+        valid = (records["seq"] == (indices + 1).astype(np.uint64)) & (indices > head_after - self.capacity)
+        self.lost += int(len(valid) - np.count_nonzero(valid))
+        self.position = head
+        return records[valid], reset
+
+    def close(self):
+        self.records = None
+        self.memory.close()
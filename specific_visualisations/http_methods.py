@@ -1,6 +1,7 @@
 import json
 import re
 import matplotlib.pyplot as plt
+from collections.abc import Iterable, Mapping
 
 def plot_http_methods(data_input):
     import os
@@ -28,12 +29,12 @@ def plot_http_methods(data_input):
         except Exception as e:
             print(f"Chyba pri načítaní JSON: {e}")
             return
-    elif isinstance(data_input, dict):
+    elif isinstance(data_input, Mapping):
         if "packets" in data_input:
             packets = data_input["packets"]
         else:
             packets = [data_input]  
-    elif isinstance(data_input, list):
+    elif isinstance(data_input, Iterable):
         packets = data_input
     else:
         print(f"Neplatný vstup pre vizualizáciu: {type(data_input)}")
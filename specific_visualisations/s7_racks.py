@@ -2,6 +2,7 @@ import json
 import re
 import numpy as np
 import matplotlib.pyplot as plt
+from collections.abc import Iterable, Mapping
 
 
 def plot_s7_racks(data_input):
@@ -30,12 +31,12 @@ def plot_s7_racks(data_input):
         except Exception as e:
             print(f"Chyba pri načítaní JSON: {e}")
             return
-    elif isinstance(data_input, dict):
+    elif isinstance(data_input, Mapping):
         if "packets" in data_input:
             packets = data_input["packets"]
         else:
             packets = [data_input]  
-    elif isinstance(data_input, list):
+    elif isinstance(data_input, Iterable):
         packets = data_input
     else:
         print(f"Neplatný vstup pre vizualizáciu: {type(data_input)}")
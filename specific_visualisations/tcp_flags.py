@@ -1,6 +1,7 @@
 import matplotlib.pyplot as plt
 import json
 import re
+from collections.abc import Iterable, Mapping
 
 def extract_flags(packets):
     flags_count = {
@@ -56,12 +57,12 @@ def plot_tcp_flags(data_input, pcap_file=None):
         except Exception as e:
             print(f"Chyba pri načítaní JSON: {e}")
             return
-    elif isinstance(data_input, dict):
+    elif isinstance(data_input, Mapping):
         if "packets" in data_input:
             packets = data_input["packets"]
         else:
             packets = [data_input]  
-    elif isinstance(data_input, list):
+    elif isinstance(data_input, Iterable):
         packets = data_input
     else:
         print(f"Neplatný vstup pre vizualizáciu: {type(data_input)}")
@@ -2,7 +2,9 @@ import json
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from datetime import datetime
+from packet_record import ns_to_datetime
 import re
+from collections.abc import Iterable, Mapping
 
 def plot_tcp_retransmissions(data_input, pcap_file=None):
     import os
@@ -30,12 +32,12 @@ def plot_tcp_retransmissions(data_input, pcap_file=None):
         except Exception as e:
             print(f"Chyba pri načítaní JSON: {e}")
             return
-    elif isinstance(data_input, dict):
+    elif isinstance(data_input, Mapping):
         if "packets" in data_input:
             packets = data_input["packets"]
         else:
             packets = [data_input]  
-    elif isinstance(data_input, list):
+    elif isinstance(data_input, Iterable):
         packets = data_input
     else:
         print(f"Neplatný vstup pre vizualizáciu: {type(data_input)}")
@@ -52,8 +54,11 @@ def plot_tcp_retransmissions(data_input, pcap_file=None):
         protocol = packet.get("protocol", "").upper()
         if protocol == "TCP":
             timestamp = packet.get("timestamp")
+            ts_ns = packet.get("ts_ns")
             time_val = None
-            if timestamp:
+            if ts_ns is not None:
+                time_val = ns_to_datetime(ts_ns)
+            elif timestamp:
                 try:
                     time_val = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
                 except Exception:
@@ -3,6 +3,7 @@ document.addEventListener('DOMContentLoaded', function() {
     let captureMode = null; 
     let packetCount = 0;
     let packetData = [];
+    let protocolAggregates = {};
     let table = null; 
     let socket = null; 
     let modeModal = null; 
@@ -36,6 +37,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const updateSpecificVisualizationBtn = document.getElementById('updateSpecificVisualizationBtn');
     const generalVisualizationContainer = document.getElementById('generalVisualizationContainer');
     const specificVisualizationContainer = document.getElementById('specificVisualizationContainer');
+    const captureStatsElement = document.getElementById('capture-stats');
+    const aggregatesContainer = document.getElementById('aggregatesContainer');
     
     try {
     table = new DataTable(tableElement, {
@@ -131,7 +134,20 @@ document.addEventListener('DOMContentLoaded', function() {
                 updateVisualizations();
             }
         });
-        socket.on('capture_started', (data) => console.log('Capture started event received from server:', data));
+        // Under the aggregate-only backpressure policy the server sends per-protocol totals instead of packets.
+        socket.on('packet_aggregates', (data) => {
+            for (const [protocol, totals] of Object.entries(data.protocols || {})) {
+                const aggregate = protocolAggregates[protocol] || (protocolAggregates[protocol] = { packets: 0, bytes: 0 });
+                aggregate.packets += totals.packets;
+                aggregate.bytes += totals.bytes;
+            }
+            updateAggregates();
+        });
+        socket.on('capture_stats', (data) => updateCaptureStats(data));
+        socket.on('capture_started', (data) => {
+            console.log('Capture started event received from server:', data);
+            clearCaptureStats();
+        });
         socket.on('capture_stopped', () => {
             console.log('Capture stopped event received from server');
             updateUIForStoppedState();
@@ -151,6 +167,34 @@ document.addEventListener('DOMContentLoaded', function() {
             packetCountElement.textContent = packetCount; 
         }
     }
+    function updateCaptureStats(stats) {
+        if (!captureStatsElement) return;
+        const parts = [`${stats.input_rate} paketov/s`];
+        if (stats.dropped) parts.push(`zahodených ${stats.dropped}`);
+        if (stats.aggregated) parts.push(`agregovaných ${stats.aggregated}`);
+        captureStatsElement.textContent = `(${parts.join(', ')})`;
+    }
+    function updateAggregates() {
+        if (!aggregatesContainer) return;
+        const protocols = Object.keys(protocolAggregates)
+            .sort((a, b) => protocolAggregates[b].packets - protocolAggregates[a].packets);
+        const rows = protocols.map(protocol => {
+            const row = document.createElement('tr');
+            for (const value of [protocol, protocolAggregates[protocol].packets, protocolAggregates[protocol].bytes]) {
+                const cell = document.createElement('td');
+                cell.textContent = value;
+                row.appendChild(cell);
+            }
+            return row;
+        });
+        aggregatesContainer.querySelector('tbody').replaceChildren(...rows);
+        aggregatesContainer.style.display = protocols.length ? '' : 'none';
+    }
+    function clearCaptureStats() {
+        protocolAggregates = {};
+        updateAggregates();
+        if (captureStatsElement) captureStatsElement.textContent = '';
+    }
     function loadInterfaces() {
         fetch('/interfaces')
             .then(response => {
@@ -627,6 +671,7 @@ document.addEventListener('DOMContentLoaded', function() {
             console.warn('clearTableData called but DataTable instance not found.');
         }
         packetData = [];
+        clearCaptureStats();
         updateVisualizations();
     }
     window.clearTableData = clearTableData;
@@ -1,20 +1,24 @@
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+import numpy as np
 import os
 from datetime import datetime
+from packet_table import PacketTable
 
 def plot_data_usage(analysis_result, pcap_file):
-    data_usage = analysis_result.get("data_usage", {})
+    packets = analysis_result.get("filtered_packets")
     timestamps = []
     sizes = []
 
-    for timestamp_str, size in sorted(data_usage.items()):
-        try:
-            dt = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
-            timestamps.append(dt)
+    if isinstance(packets, PacketTable):
+        seconds, sizes = packets.bytes_per_second()
+        timestamps = [datetime.fromtimestamp(second) for second in seconds.tolist()]
+    else:
+        data_usage = analysis_result.get("data_usage", {})
+        for second, size in sorted(data_usage.items()):
+            timestamps.append(datetime.fromtimestamp(second))
             sizes.append(size)
-        except ValueError:
-            continue
+        sizes = np.array(sizes, dtype=np.int64)
     if not timestamps:
         plt.figure(figsize=(10, 6))
         plt.text(0.5, 0.5, "Žiadne údaje nie sú k dispozícii pre zvolené časové obdobie",
@@ -23,9 +27,8 @@ def plot_data_usage(analysis_result, pcap_file):
         plt.show()
         return
     fig, ax = plt.subplots(figsize=(12, 6))
-    ax.plot(timestamps, [size / 1024 for size in sizes], 'b-', linewidth=1.5)
-    ax.fill_between(timestamps, [0] * len(timestamps), [size / 1024 for size in sizes],
-                    color='skyblue', alpha=0.4)
+    ax.plot(timestamps, sizes / 1024, 'b-', linewidth=1.5)
+    ax.fill_between(timestamps, 0, sizes / 1024, color='skyblue', alpha=0.4)
     ax.set_title('Využitie dát v priebehu času')
     ax.set_ylabel('Veľkosť dát (KB)')
     ax.set_xlabel('Čas')
@@ -51,7 +54,7 @@ def plot_data_usage(analysis_result, pcap_file):
 
     ax.xaxis.set_major_locator(locator)
     plt.xticks(rotation=45)
-    total_data = sum(sizes) / (1024 * 1024)
+    total_data = sizes.sum() / (1024 * 1024)
     avg_rate = (total_data * 8) / (time_span.total_seconds() / 60)
 
     stats_text = (f"Celkové dáta: {total_data:.2f} MB\n"
@@ -1,8 +1,8 @@
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import numpy as np
-from datetime import datetime
 from collections import defaultdict
+from packet_record import packet_ts_ns, ns_to_datetime
 
 
 def analyze_flows(filtered_packets, pcap_file):
@@ -14,7 +14,7 @@ def analyze_flows(filtered_packets, pcap_file):
         protocol = packet.get("protocol", "N/A")
         src_port = packet.get("src_port", "N/A")
         dst_port = packet.get("dst_port", "N/A")
-        timestamp = packet.get("timestamp", "")
+        ts_ns = packet_ts_ns(packet)
         size = packet.get("size", 0)
         if src_ip == "N/A" or dst_ip == "N/A":
             continue
@@ -22,11 +22,9 @@ def analyze_flows(filtered_packets, pcap_file):
         ports = sorted([src_port, dst_port])
         flow_key = (ips[0], ips[1], protocol, ports[0], ports[1])
         direction = 1 if src_ip == ips[0] else -1
-        try:
-            dt = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
-            flows[flow_key].append((dt, size, direction))
-        except ValueError:
+        if ts_ns is None:
             continue
+        flows[flow_key].append((ns_to_datetime(ts_ns), size, direction))
     if not flows:
         fig = plt.figure(figsize=(10, 6))
         plt.text(0.5, 0.5, "Žiadne dáta o tokoch nie sú k dispozícii",
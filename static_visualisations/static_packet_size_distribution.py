@@ -1,13 +1,14 @@
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+from packet_table import as_table
 
 def plot_packet_size_distribution(filtered_packets, pcap_file):
-    packets = filtered_packets
-    sizes = [packet["size"] for packet in packets]
+    packets = as_table(filtered_packets)
+    sizes = packets.size
     fig, ax = plt.subplots(figsize=(10, 6))
-    if sizes:
-        max_size = max(sizes)
+    if len(sizes):
+        max_size = sizes.max()
         if max_size <= 1500:
             bins = np.linspace(0, max_size, 30)
         else:
@@ -19,8 +20,8 @@ def plot_packet_size_distribution(filtered_packets, pcap_file):
         ax.set_xlabel('Veľkosť paketu (bajty)')
         ax.set_ylabel('Frekvencia')
         ax.grid(axis='y', linestyle='--', alpha=0.7)
-        stats_text = (f"Minimum: {min(sizes)} bajtov\n"
-                      f"Maximum: {max(sizes)} bajtov\n"
+        stats_text = (f"Minimum: {sizes.min()} bajtov\n"
+                      f"Maximum: {max_size} bajtov\n"
                       f"Priemer: {np.mean(sizes):.2f} bajtov\n"
                       f"Medián: {np.median(sizes):.2f} bajtov\n"
                       f"Štandardná odchýlka: {np.std(sizes):.2f} bajtov")
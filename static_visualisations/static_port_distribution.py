@@ -1,17 +1,19 @@
 import matplotlib.pyplot as plt
-from collections import Counter
+import numpy as np
+from packet_table import as_table, most_common
 
 def plot_port_distribution(filtered_packets, pcap_file=None):
-    packets = filtered_packets
+    packets = as_table(filtered_packets)
+    missing_port = packets.record_type.missing_port
 
-    src_ports = [packet["src_port"] for packet in packets if "src_port" in packet]
-    dst_ports = [packet["dst_port"] for packet in packets if "dst_port" in packet]
+    src_ports = packets.visible_ports(packets.src_port)
+    dst_ports = packets.visible_ports(packets.dst_port)
 
-    src_port_counter = Counter(src_ports)
-    dst_port_counter = Counter(dst_ports)
+    def port_label(port):
+        return str(port) if port >= 0 else missing_port
 
-    top_src_ports = dict(src_port_counter.most_common(10))
-    top_dst_ports = dict(dst_port_counter.most_common(10))
+    top_src_ports = {port_label(port): count for port, count in most_common(src_ports, 10)}
+    top_dst_ports = {port_label(port): count for port, count in most_common(dst_ports, 10)}
 
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 7))
 
@@ -37,8 +39,8 @@ def plot_port_distribution(filtered_packets, pcap_file=None):
     plt.tight_layout()
     plt.subplots_adjust(top=0.9)
 
-    total_src_ports = len(set(src_ports))
-    total_dst_ports = len(set(dst_ports))
+    total_src_ports = len(np.unique(src_ports))
+    total_dst_ports = len(np.unique(dst_ports))
     info_text = f'Celkový počet unikátnych zdrojových portov: {total_src_ports}\n'
     info_text += f'Celkový počet unikátnych cieľových portov: {total_dst_ports}'
 
@@ -1,20 +1,11 @@
 import matplotlib.pyplot as plt
-from collections import Counter
 import os
+from packet_table import as_table
 
 def plot_top_senders_receivers(filtered_packets, pcap_file):
-    packets = filtered_packets
-    src_packet_count = Counter()
-    dst_packet_count = Counter()
-
-    for packet in packets:
-        src_ip = packet["src_ip"]
-        dst_ip = packet["dst_ip"]
-
-        src_packet_count[src_ip] += 1
-        dst_packet_count[dst_ip] += 1
-    top_senders_packets = src_packet_count.most_common(10)
-    top_receivers_packets = dst_packet_count.most_common(10)
+    packets = as_table(filtered_packets)
+    top_senders_packets = packets.src_ip.most_common(10)
+    top_receivers_packets = packets.dst_ip.most_common(10)
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
     sender_ips_packets = [ip for ip, _ in top_senders_packets]
     sender_counts_packets = [count for _, count in top_senders_packets]
@@ -2,50 +2,39 @@ import matplotlib.pyplot as plt
 import numpy as np
 import os
 from datetime import datetime, timedelta
-from collections import defaultdict
+from packet_table import as_table
+
+def _bucket(rows, columns, width, sizes):
+    row_values, row_index = np.unique(rows, return_inverse=True)
+    heat_data = np.zeros((len(row_values), width))
+    np.add.at(heat_data, (row_index, columns), sizes)
+    return row_values, heat_data
 
 def plot_traffic_heatmap(filtered_packets, pcap_file):
-    packets = filtered_packets
-    if not packets:
+    packets = as_table(filtered_packets)
+    if not len(packets):
         plt.figure(figsize=(8, 6))
         plt.text(0.5, 0.5, "Nie sú dostupné žiadne údaje o paketoch",
                  horizontalalignment='center', fontsize=12)
         plt.tight_layout()
         plt.show()
         return
-    timestamps = []
-    for packet in packets:
-        try:
-            dt = datetime.strptime(packet["timestamp"], "%Y-%m-%d %H:%M:%S")
-            timestamps.append((dt, packet["size"]))
-        except ValueError:
-            continue 
+    seconds, sizes = packets.bytes_per_second()
 
-    if not timestamps:
+    if not len(seconds):
         plt.figure(figsize=(8, 6))
         plt.text(0.5, 0.5, "Nie sú dostupné žiadne platné časové údaje",
                  horizontalalignment='center', fontsize=12)
         plt.tight_layout()
         plt.show()
         return
-    timestamps.sort(key=lambda x: x[0])
-    start_time = timestamps[0][0]
-    end_time = timestamps[-1][0]
+    moments = [datetime.fromtimestamp(second) for second in seconds.tolist()]
+    start_time = moments[0]
+    end_time = moments[-1]
     time_span = end_time - start_time
     if time_span.total_seconds() <= 3600:
-        time_matrix = defaultdict(lambda: defaultdict(int))
-
-        for dt, size in timestamps:
-            minute = dt.minute
-            second = dt.second
-            time_matrix[minute][second] += size
-        minutes = sorted(time_matrix.keys())
-        seconds = list(range(60))
-
-        heat_data = np.zeros((len(minutes), 60))
-        for i, minute in enumerate(minutes):
-            for second in seconds:
-                heat_data[i, second] = time_matrix[minute].get(second, 0)
+        minutes, heat_data = _bucket(np.array([dt.minute for dt in moments]),
+                                     np.array([dt.second for dt in moments]), 60, sizes)
         plt.figure(figsize=(10, 7))
         plt.imshow(heat_data, aspect='auto', origin='lower', cmap='viridis')
         plt.xlabel('Sekundy')
@@ -56,19 +45,8 @@ def plot_traffic_heatmap(filtered_packets, pcap_file):
         plt.title(f"Tepelná mapa prevádzky podľa sekúnd ({start_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')})")
 
     elif time_span.total_seconds() <= 86400:
-        time_matrix = defaultdict(lambda: defaultdict(int))
-
-        for dt, size in timestamps:
-            hour = dt.hour
-            minute = dt.minute
-            time_matrix[hour][minute] += size
-        hours = sorted(time_matrix.keys())
-        minutes = list(range(60))
-
-        heat_data = np.zeros((len(hours), 60))
-        for i, hour in enumerate(hours):
-            for minute in minutes:
-                heat_data[i, minute] = time_matrix[hour].get(minute, 0)
+        hours, heat_data = _bucket(np.array([dt.hour for dt in moments]),
+                                   np.array([dt.minute for dt in moments]), 60, sizes)
         plt.figure(figsize=(10, 7))
         plt.imshow(heat_data, aspect='auto', origin='lower', cmap='viridis')
         plt.xlabel('Minúty')
@@ -79,25 +57,14 @@ def plot_traffic_heatmap(filtered_packets, pcap_file):
         plt.title(f"Tepelná mapa prevádzky podľa minút ({start_time.strftime('%Y-%m-%d %H:%M')} - {end_time.strftime('%H:%M')})")
 
     else:
-        time_matrix = defaultdict(lambda: defaultdict(int))
-
-        for dt, size in timestamps:
-            day = (dt - start_time).days
-            hour = dt.hour
-            time_matrix[day][hour] += size
-        days = sorted(time_matrix.keys())
-        hours = list(range(24))
-
-        heat_data = np.zeros((len(days), 24))
-        for i, day in enumerate(days):
-            for hour in hours:
-                heat_data[i, hour] = time_matrix[day].get(hour, 0)
+        days, heat_data = _bucket(np.array([(dt - start_time).days for dt in moments]),
+                                  np.array([dt.hour for dt in moments]), 24, sizes)
         plt.figure(figsize=(10, 7))
         plt.imshow(heat_data, aspect='auto', origin='lower', cmap='viridis')
         plt.xlabel('Hodina dňa')
         plt.ylabel('Deň')
         plt.xticks(range(24))
-        date_labels = [(start_time + timedelta(days=day)).strftime('%Y-%m-%d') for day in days]
+        date_labels = [(start_time + timedelta(days=day)).strftime('%Y-%m-%d') for day in days.tolist()]
         plt.yticks(range(len(days)), date_labels)
 
         plt.title(f"Tepelná mapa prevádzky podľa hodín ({start_time.strftime('%Y-%m-%d')} - {end_time.strftime('%Y-%m-%d')})")
@@ -2,6 +2,8 @@ import argparse
 import curses
 import pcap_analyzer
 
+from packet_record import time_range_ns
+
 from static_visualisations.static_protocol_distribution import plot_protocols
 from static_visualisations.static_data_usage import plot_data_usage
 from static_visualisations.static_top_senders_receivers import plot_top_senders_receivers
@@ -159,7 +161,7 @@ def protocol_menu(stdscr, protocols):
             return "q"
 
 
-def select_visualization(stdscr):
+def select_visualization(stdscr, analysis=None):
     visualizations = [
         "Objem dát v čase",
         "Distribúcia protokolov",
@@ -190,9 +192,19 @@ def select_visualization(stdscr):
 
         stdscr.addstr(len(visualizations) + 4, 0,
                       "Použite šípky na výber vizualizácie a stlačte ENTER. Stlačte 'q' pre ukončenie.")
+        # The capture keeps decoding while the menu waits for a key.
+        decoding = analysis is not None and analysis.result is None
+        if decoding:
+            stdscr.addstr(len(visualizations) + 6, 0,
+                          f"Dekódovanie prebieha: {analysis.stats.total_packets} paketov")
         stdscr.refresh()
 
+        stdscr.timeout(0 if decoding else -1)
         key = stdscr.getch()
+        stdscr.timeout(-1)
+        if key == -1 and decoding:
+            analysis.advance(pcap_analyzer.DECODE_SLICE)
+            continue
 
         if key == curses.KEY_UP and current_selection > 0:
             current_selection -= 1
@@ -223,40 +235,48 @@ def select_visualization(stdscr):
             return "q"
 
 
-def main(stdscr, pcap_file):
+def main(stdscr, pcap_file, session=None, time_range=None, memory_budget=None):
     curses.curs_set(0)
     stdscr.keypad(True)
     filters = {}
-    analysis_result = pcap_analyzer.analyze_packets(pcap_file, filters)
-    filtered_packets = analysis_result.get("filtered_packets", [])
+    analysis = None
+    analysis_result = pcap_analyzer.load_session(session)
+    if analysis_result is None:
+        # The menu comes up straight away; the charts wait for the whole capture.
+        analysis = pcap_analyzer.PacketAnalysis(pcap_file, filters, as_table=True, time_range=time_range,
+                                                memory_budget=memory_budget)
+    pcap_name = pcap_analyzer.capture_name(pcap_analyzer.capture_paths(pcap_file))
 
     while True:
-        selection = select_visualization(stdscr)
+        selection = select_visualization(stdscr, analysis)
         if selection == "q":
             break
 
         if isinstance(selection, tuple):
             mode, choice = selection
+            if analysis is not None:
+                analysis_result = analysis.finish()
+            filtered_packets = analysis_result["filtered_packets"]
             curses.endwin()
 
             if mode == "static":
                 if choice == "1":
-                    plot_data_usage(analysis_result, pcap_file)
+                    plot_data_usage(analysis_result, pcap_name)
                 elif choice == "2":
                     protocol_counts = analysis_result.get("protocol_counts", {})
-                    plot_protocols(protocol_counts, pcap_file)
+                    plot_protocols(protocol_counts, pcap_name)
                 elif choice == "3":
-                    plot_top_senders_receivers(filtered_packets, pcap_file)
+                    plot_top_senders_receivers(filtered_packets, pcap_name)
                 elif choice == "4":
-                    plot_network_topology(filtered_packets, pcap_file)
+                    plot_network_topology(filtered_packets, pcap_name)
                 elif choice == "5":
-                    plot_packet_size_distribution(filtered_packets, pcap_file)
+                    plot_packet_size_distribution(filtered_packets, pcap_name)
                 elif choice == "6":
-                    analyze_flows(filtered_packets, pcap_file)
+                    analyze_flows(filtered_packets, pcap_name)
                 elif choice == "7":
-                    plot_port_distribution(filtered_packets, pcap_file)
+                    plot_port_distribution(filtered_packets, pcap_name)
                 elif choice == "8":
-                    plot_traffic_heatmap(filtered_packets, pcap_file)
+                    plot_traffic_heatmap(filtered_packets, pcap_name)
 
             elif mode == "protocol":
                 func = protocol_vis_function_map.get(choice)
@@ -269,7 +289,13 @@ def main(stdscr, pcap_file):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="PCAP Visualizer")
-    parser.add_argument("pcap_file", help="Path to the PCAP file")
+    parser.add_argument("pcap_file", nargs="+", help="Path to the PCAP file, a directory of captures or a glob pattern")
+    parser.add_argument("--session", help="Decoded session handed over by pcap_analyzer")
+    parser.add_argument("--start", help="Start of the time window, e.g. 2024-05-01 10:00:00")
+    parser.add_argument("--end", help="End of the time window, e.g. 2024-05-01 10:05:00")
+    parser.add_argument("--memory-budget", type=pcap_analyzer.parse_size,
+                        help="Memory for decoded packets, e.g. 512M; the rest is spilled to disk")
     args = parser.parse_args()
 
-    curses.wrapper(main, args.pcap_file)
+    pcap_file = args.pcap_file[0] if len(args.pcap_file) == 1 else args.pcap_file
+    curses.wrapper(main, pcap_file, args.session, time_range_ns(args.start, args.end), args.memory_budget)
@@ -0,0 +1,35 @@
+import os
+import struct
+
+import pytest
+
+import pcap_reader
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def _block(block_type, body):
+    body += b"\0" * (-len(body) % 4)
+    length = len(body) + 12
+    return struct.pack("<II", block_type, length) + body + struct.pack("<I", length)
+
+
+def write_pcapng(source, path, sections=2):
+    """Rewrite a capture as pcapng, its records split over ``sections`` sections with microsecond timestamps."""
+    frames = [(ts_ns, orig_len, linktype, bytes(frame))
+              for ts_ns, orig_len, linktype, frame in pcap_reader.iter_frames(source)]
+    per_section = -(-len(frames) // sections)
+    with open(path, 'wb') as f:
+        for start in range(0, len(frames), per_section):
+            f.write(_block(0x0A0D0D0A, struct.pack("<IHHq", 0x1A2B3C4D, 1, 0, -1)))
+            f.write(_block(1, struct.pack("<HHI", frames[start][2], 0, 65535)))
+            for ts_ns, orig_len, _, frame in frames[start:start + per_section]:
+                ts_us = ts_ns // 1000
+                f.write(_block(6, struct.pack("<IIIII", 0, ts_us >> 32, ts_us & 0xFFFFFFFF, len(frame), orig_len)
+                               + frame))
+    return path
+
+
+@pytest.fixture
+def pcapng_capture(tmp_path):
+    return write_pcapng(os.path.join(DATA, "test2_6000p.pcap"), str(tmp_path / "test2_6000p.pcapng"))
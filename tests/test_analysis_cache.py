@@ -0,0 +1,39 @@
+import os
+import time
+
+import analysis_cache
+import pcap_analyzer
+import pcap_reader
+
+CAPTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "test1_2000p.pcap")
+
+
+def test_evict_leaves_entries_being_written(tmp_path):
+    cache_dir = str(tmp_path)
+    result = pcap_analyzer.analyze_packets(CAPTURE, {}, as_table=True, use_cache=False)
+    key = "0" * 40
+    analysis_cache.store(key, result["filtered_packets"], result["protocol_counts"], cache_dir)
+    in_progress = tmp_path / (key + ".abc123")
+    in_progress.mkdir()
+    (in_progress / "ts_ns.npy").write_bytes(b"\0" * 1024)
+    abandoned = tmp_path / (key + ".def456")
+    abandoned.mkdir()
+    old = time.time() - analysis_cache.STALE_TEMP_SECONDS - 60
+    os.utime(abandoned, (old, old))
+
+    analysis_cache.evict(cache_dir, max_bytes=0)
+
+    assert in_progress.is_dir()
+    assert not abandoned.exists()
+    assert not (tmp_path / key).exists()
+
+
+def test_cached_payloads_render_like_decoded_records(tmp_path):
+    cache_dir = str(tmp_path)
+    decoded = list(pcap_reader.read_packets(CAPTURE))
+    result = pcap_analyzer.analyze_packets(CAPTURE, {}, as_table=True, use_cache=False)
+    key = "1" * 40
+    analysis_cache.store(key, result["filtered_packets"], result["protocol_counts"], cache_dir)
+    table, _ = analysis_cache.load(key, cache_dir)
+
+    assert [packet.to_dict() for packet in table] == [packet.to_dict() for packet in decoded]
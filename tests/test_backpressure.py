@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from backpressure import PacketQueue
+
+
+def _packet(number, protocol="UDP"):
+    return {"number": number, "protocol": protocol, "size": 100}
+
+
+def _numbers(packets):
+    return [packet["number"] for packet in packets]
+
+
+def _accounted(queue):
+    stats = queue.stats()
+    return stats["emitted"] + stats["dropped"] + stats["aggregated"] + stats["queued"] == stats["offered"]
+
+
+def test_drop_oldest_keeps_the_newest_packets():
+    queue = PacketQueue(4, "drop-oldest")
+    for number in range(1, 11):
+        queue.put(_packet(number))
+
+    assert _numbers(queue.get_batch(10)) == [7, 8, 9, 10]
+    assert queue.stats() == {"policy": "drop-oldest", "queued": 0, "offered": 10, "enqueued": 10, "dropped": 6,
+                             "aggregated": 0, "emitted": 4}
+
+
+def test_sample_admits_every_nth_packet_once_half_full():
+    queue = PacketQueue(10, "sample", sample_every=3)
+    for number in range(1, 31):
+        queue.put(_packet(number))
+
+    assert _numbers(queue.get_batch(20)) == [5, 6, 9, 12, 15, 18, 21, 24, 27, 30]
+    assert queue.dropped == 20
+    assert _accounted(queue)
+
+
+def test_aggregate_only_queues_nothing():
+    queue = PacketQueue(4, "aggregate-only")
+    for number in range(5):
+        queue.put(_packet(number, "TCP" if number % 2 else "UDP"))
+
+    assert len(queue) == 0
+    assert queue.take_aggregates() == {"UDP": {"packets": 3, "bytes": 300}, "TCP": {"packets": 2, "bytes": 200}}
+    assert queue.take_aggregates() == {}
+    assert queue.aggregated == 5
+    assert _accounted(queue)
+
+
+def test_block_waits_for_room():
+    queue = PacketQueue(2, "block")
+    queue.put(_packet(1))
+    queue.put(_packet(2))
+    producer = threading.Thread(target=queue.put, args=(_packet(3),))
+    producer.start()
+    producer.join(0.1)
+    assert producer.is_alive()
+
+    assert _numbers(queue.get_batch(1)) == [1]
+    producer.join(5)
+
+    assert not producer.is_alive()
+    assert _numbers(queue.get_batch(10)) == [2, 3]
+    assert queue.dropped == 0
+    assert _accounted(queue)
+
+
+def test_switching_policy_releases_a_blocked_producer():
+    queue = PacketQueue(1, "block")
+    queue.put(_packet(1))
+    producer = threading.Thread(target=queue.put, args=(_packet(2),))
+    producer.start()
+    producer.join(0.1)
+
+    queue.set_policy("drop-oldest")
+    producer.join(5)
+
+    assert not producer.is_alive()
+    assert _numbers(queue.get_batch(10)) == [2]
+    assert queue.dropped == 1
+    assert _accounted(queue)
+
+
+def test_clear_starts_counting_afresh():
+    queue = PacketQueue(2, "drop-oldest")
+    for number in range(5):
+        queue.put(_packet(number))
+
+    queue.clear()
+
+    assert queue.stats() == {"policy": "drop-oldest", "queued": 0, "offered": 0, "enqueued": 0, "dropped": 0,
+                             "aggregated": 0, "emitted": 0}
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        PacketQueue(2, "drop-newest")
@@ -0,0 +1,82 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import capture_index
+import pcap_analyzer
+import pcap_reader
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+@pytest.fixture
+def capture(tmp_path):
+    # A copy, so the index saved next to it stays out of the data directory.
+    return shutil.copy(os.path.join(DATA, "test2_6000p.pcap"), tmp_path)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_first_decode_records_the_index_a_scan_builds(capture, workers):
+    recorder = pcap_reader.IndexRecorder()
+    for _ in pcap_reader.read_packets(capture, {"ip_a": "10.1.1.99"}, workers=workers, index=recorder):
+        pass
+
+    recorded = capture_index.recorded_index(capture, recorder)
+    built = capture_index.build_index(capture)
+
+    assert len(recorded) == 6000
+    assert np.array_equal(recorded.records, built.records)
+
+
+def test_recorded_pcapng_index_keeps_its_sections(pcapng_capture):
+    recorder = pcap_reader.IndexRecorder()
+    for _ in pcap_reader.read_packets(pcapng_capture, workers=3, index=recorder):
+        pass
+
+    recorded = capture_index.recorded_index(pcapng_capture, recorder)
+    built = capture_index.build_index(pcapng_capture)
+
+    assert np.array_equal(recorded.records, built.records)
+    assert recorded.states == built.states
+    assert recorded.records["section"][0] != recorded.records["section"][-1]
+
+
+def test_analysis_saves_the_index_once_the_capture_is_read(capture):
+    packets = pcap_analyzer.iter_packets(capture, None, workers=1, use_cache=False)
+    next(packets)
+    assert not capture_index.has_index(capture)
+
+    for _ in packets:
+        pass
+
+    assert capture_index.has_index(capture)
+    assert np.array_equal(capture_index.load_index(capture, build=False).records,
+                          capture_index.build_index(capture).records)
+
+
+def _windows(ts_ns):
+    return [
+        (ts_ns[1500], ts_ns[4500]),
+        (ts_ns[0], ts_ns[-1] + 1),
+        (ts_ns[2000], ts_ns[2000]),
+        (ts_ns[-1] + 1, ts_ns[-1] + 1_000_000_000),
+    ]
+
+
+@pytest.mark.parametrize("window", range(4))
+def test_time_slice_reads_only_the_window(capture, pcapng_capture, window):
+    for path in (capture, pcapng_capture):
+        index = capture_index.load_index(path)
+        start_ns, end_ns = _windows(index.ts_ns.tolist())[window]
+        byte_range = index.time_slice(start_ns, end_ns)
+
+        expected = [packet.to_dict() for packet in pcap_reader.read_packets(path, time_range=(start_ns, end_ns))]
+        sliced = [packet.to_dict() for packet in pcap_reader.read_packets(path, time_range=(start_ns, end_ns),
+                                                                          byte_range=byte_range)]
+        read = list(pcap_reader.iter_frames(path, *byte_range))
+
+        assert sliced == expected
+        assert len(read) == len(expected)
+        assert all(start_ns <= frame[0] < end_ns for frame in read)
@@ -0,0 +1,51 @@
+import os
+
+import capture_log
+
+
+def _packets(start, count):
+    return [{"number": number} for number in range(start, start + count)]
+
+
+def test_history_includes_the_rotated_segment(tmp_path):
+    path = str(tmp_path / "packets.ndjson")
+    log = capture_log.AppendLog(path, max_bytes=200)
+    log.write(_packets(0, 20))
+    log.write(_packets(20, 5))
+    log.close()
+
+    assert os.path.exists(path + ".1")
+    expected = _packets(0, 25)
+    assert capture_log.read_records(path) == expected
+    assert capture_log.LogTail(path).read() == (expected, False)
+
+
+def test_rotation_is_put_off_while_the_log_is_held_open(tmp_path, monkeypatch):
+    path = str(tmp_path / "packets.ndjson")
+    log = capture_log.AppendLog(path, max_bytes=200)
+    monkeypatch.setattr(capture_log, "REPLACE_RETRY_DELAY", 0)
+
+    def locked(source, target):
+        raise PermissionError(source)
+
+    monkeypatch.setattr(capture_log.os, "replace", locked)
+    log.write(_packets(0, 20))
+    log.write(_packets(20, 5))
+    log.close()
+
+    assert not os.path.exists(path + ".1")
+    assert capture_log.read_records(path) == _packets(0, 25)
+
+
+def test_clear_drops_the_rotated_segment(tmp_path):
+    path = str(tmp_path / "packets.ndjson")
+    log = capture_log.AppendLog(path, max_bytes=200)
+    log.write(_packets(0, 20))
+    log.close()
+    tail = capture_log.LogTail(path)
+    tail.read()
+
+    capture_log.clear(path)
+
+    assert capture_log.read_records(path) == []
+    assert tail.read() == ([], True)
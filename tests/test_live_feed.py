@@ -0,0 +1,33 @@
+import capture_log
+import live_feed
+import shared_ring
+
+
+def _packet(number, ts_ns):
+    return {"timestamp": "", "src_ip": "10.0.0.1", "dst_ip": "10.0.0.2", "protocol": "UDP", "src_port": "53",
+            "dst_port": "5353", "size": number, "payload": "", "ts_ns": ts_ns}
+
+
+def test_ring_carries_on_from_a_rotated_log(tmp_path):
+    path = str(tmp_path / "packets.ndjson")
+    # The last logged packets share their timestamp with the first unlogged ones.
+    packets = [_packet(number, min(number, 48) * 1000) for number in range(60)]
+    ring = shared_ring.PacketRing(capacity=64)
+    log = capture_log.AppendLog(path, max_bytes=1000)
+    try:
+        for packet in packets:
+            ring.publish(packet)
+        for start in range(0, 50, 10):
+            log.write(packets[start:start + 10])
+        log.close()
+        history = capture_log.read_packets(path)
+        assert history[0]["size"] > 0
+
+        feed = live_feed.RingFeed(ring.name, path)
+        received, reset = feed.poll()
+        feed.close()
+    finally:
+        ring.close()
+
+    assert reset
+    assert [packet["size"] for packet in received] == list(range(history[0]["size"], 60))
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+import capture_index
+import pcap_analyzer
+import pcap_reader
+
+CAPTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "test2_6000p.pcap")
+
+
+def _split(tmp_path, chunk=7):
+    # Runs of ``chunk`` records go to the two captures in turn, so equal
+    # timestamps end up on both sides of the merge.
+    offsets = capture_index.build_index(CAPTURE).offsets.tolist()
+    with open(CAPTURE, 'rb') as f:
+        data = f.read()
+    bounds = offsets + [len(data)]
+    paths = [str(tmp_path / "a.pcap"), str(tmp_path / "b.pcap")]
+    parts = [[data[:24]], [data[:24]]]
+    for row in range(len(offsets)):
+        parts[row // chunk % 2].append(data[bounds[row]:bounds[row + 1]])
+    for path, part in zip(paths, parts):
+        with open(path, 'wb') as f:
+            f.write(b"".join(part))
+    return paths
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_captures_merge_in_timestamp_order(tmp_path, workers):
+    paths = _split(tmp_path)
+    decoded = [list(pcap_reader.read_packets(path)) for path in paths]
+    # A stable sort keeps equal timestamps in the order of the captures.
+    expected = [packet.to_dict() for packet in sorted(decoded[0] + decoded[1], key=lambda packet: packet.ts_ns)]
+
+    merged = [packet.to_dict() for packet in pcap_analyzer.iter_packets(paths, None, workers=workers,
+                                                                        use_cache=False)]
+
+    assert len(decoded[0]) > 0 and len(decoded[1]) > 0
+    assert merged == expected
+
+
+def test_analysis_batches_add_up_to_the_result():
+    analysis = pcap_analyzer.PacketAnalysis(CAPTURE, None, workers=1, as_table=True, use_cache=False)
+    seen = []
+    for batch in analysis.batches(batch_size=1000):
+        assert analysis.result is None
+        seen.extend(batch)
+        assert analysis.stats.total_packets == len(seen)
+
+    result = analysis.result
+    assert [packet.to_dict() for packet in result["filtered_packets"]] == [packet.to_dict() for packet in seen]
+    assert result["protocol_counts"] == pcap_analyzer.analyze_packets(CAPTURE, None, use_cache=False)["protocol_counts"]
+
+
+def test_spilled_table_matches_the_in_memory_one(tmp_path, monkeypatch):
+    monkeypatch.setattr(pcap_analyzer, "SPILL_DIR", str(tmp_path))
+    in_memory = pcap_analyzer.analyze_packets(CAPTURE, None, workers=1, as_table=True, use_cache=False)
+    spilled = pcap_analyzer.analyze_packets(CAPTURE, None, workers=1, use_cache=False, memory_budget=64 * 1024)
+
+    table = spilled["filtered_packets"]
+    assert any(path.is_file() for path in tmp_path.rglob("*"))
+    assert [packet.to_dict() for packet in table] == [packet.to_dict() for packet in in_memory["filtered_packets"]]
+    assert spilled["protocol_counts"] == in_memory["protocol_counts"]
@@ -0,0 +1,85 @@
+import gzip
+import lzma
+import os
+import zlib
+
+import pytest
+
+import pcap_reader
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+CAPTURE = os.path.join(DATA, "test2_6000p.pcap")
+CAPTURES = [os.path.join(DATA, name) for name in ("test1_2000p.pcap", "test2_6000p.pcap")]
+
+COMPRESSORS = {
+    "gz": (gzip.compress, lambda data: zlib.decompressobj(wbits=31).decompress(data)),
+    "xz": (lzma.compress, lambda data: lzma.LZMADecompressor().decompress(data)),
+}
+
+
+@pytest.mark.parametrize("suffix", sorted(COMPRESSORS))
+def test_truncated_archive_keeps_every_complete_record(tmp_path, suffix):
+    compress, decompress_prefix = COMPRESSORS[suffix]
+    with open(CAPTURE, 'rb') as f:
+        compressed = compress(f.read())
+    truncated = compressed[:len(compressed) * 2 // 3]
+    archive = tmp_path / f"capture.pcap.{suffix}"
+    archive.write_bytes(truncated)
+    # Everything the truncated archive still decompresses to, as a plain capture.
+    recovered = tmp_path / "recovered.pcap"
+    recovered.write_bytes(decompress_prefix(truncated))
+
+    expected = [frame[:2] for frame in pcap_reader.iter_frames(str(recovered))]
+    frames = [frame[:2] for frame in pcap_reader.iter_frames(str(archive))]
+
+    assert 0 < len(expected) < 6000
+    assert frames == expected
+
+
+@pytest.mark.parametrize("capture", CAPTURES)
+def test_parallel_decoding_matches_serial(capture):
+    serial = [packet.to_dict() for packet in pcap_reader.read_packets(capture)]
+    parallel = [packet.to_dict() for packet in pcap_reader.read_packets(capture, workers=3)]
+
+    assert len(serial) > 0
+    assert parallel == serial
+
+
+@pytest.mark.parametrize("filters", [
+    {"ip_a": "10.1.1.99"},
+    {"ip_b": "1.1.12.1"},
+    {"ip_a": "134.249.62.202", "ip_b": "134.249.61.182"},
+])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_host_filter_keeps_what_filtering_decoded_packets_keeps(filters, workers):
+    expected = [packet.to_dict() for packet in pcap_reader.read_packets(CAPTURE)
+                if pcap_reader.matches_hosts(packet["src_ip"], packet["dst_ip"], filters.get("ip_a"),
+                                             filters.get("ip_b"))]
+    packets = [packet.to_dict() for packet in pcap_reader.read_packets(CAPTURE, filters, workers=workers)]
+
+    assert len(expected) > 0
+    assert packets == expected
+
+
+def _zstd_compress(data):
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(data)
+
+
+@pytest.mark.parametrize("suffix, compress", [("gz", gzip.compress), ("xz", lzma.compress), ("zst", _zstd_compress)])
+def test_compressed_capture_decodes_like_the_plain_one(tmp_path, suffix, compress):
+    with open(CAPTURE, 'rb') as f:
+        archive = tmp_path / f"capture.pcap.{suffix}"
+        archive.write_bytes(compress(f.read()))
+
+    expected = [packet.to_dict() for packet in pcap_reader.read_packets(CAPTURE)]
+    packets = [packet.to_dict() for packet in pcap_reader.read_packets(str(archive), workers=3)]
+
+    assert packets == expected
+
+
+def test_pcapng_capture_decodes_like_the_pcap_one(pcapng_capture):
+    expected = [packet.to_dict() for packet in pcap_reader.read_packets(CAPTURE)]
+
+    assert [packet.to_dict() for packet in pcap_reader.read_packets(pcapng_capture)] == expected
+    assert [packet.to_dict() for packet in pcap_reader.read_packets(pcapng_capture, workers=3)] == expected
@@ -0,0 +1,58 @@
+import os
+import shutil
+
+import pytest
+
+import record_filter
+import tshark_fields
+
+from packet_table import PacketTable
+from pcap_reader import read_packets
+
+CAPTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "test2_6000p.pcap")
+
+# Display filters with the same rows picked out by plain Python over the decoded records.
+FILTERS = {
+    "ip.addr == 10.1.1.99": lambda p: "10.1.1.99" in (p.src_ip, p.dst_ip),
+    "ip.src == 208.21.2.184 && udp": lambda p: p.src_ip == "208.21.2.184" and p.l4 == 17,
+    "ip.dst != 10.1.1.99": lambda p: p.dst_ip != "10.1.1.99",
+    "tcp.port == 80 || frame.len > 1000": lambda p: (p.l4 == 6 and 80 in (p.src_port, p.dst_port)) or p.size > 1000,
+    "tcp.dstport >= 1024": lambda p: p.l4 == 6 and p.dst_port is not None and p.dst_port >= 1024,
+    "not (udp or arp)": lambda p: p.l4 != 17 and p.protocol != "ARP",
+    "ip and frame.len <= 60": lambda p: p.src_ip != "N/A" and p.size <= 60,
+}
+
+
+@pytest.fixture(scope="module")
+def packets():
+    return list(read_packets(CAPTURE))
+
+
+@pytest.mark.parametrize("expression", sorted(FILTERS))
+def test_filter_keeps_the_matching_records(packets, expression):
+    table = PacketTable.from_packets(packets)
+    expected = [packet.to_dict() for packet in packets if FILTERS[expression](packet)]
+
+    filtered = record_filter.apply_filter(expression, table)
+
+    assert len(expected) > 0
+    assert [packet.to_dict() for packet in filtered] == expected
+
+
+@pytest.mark.parametrize("expression", ["dns", "ip.addr > 10.0.0.1", "tcp.port == http", "udp.port =="])
+def test_unsupported_filters_are_left_to_tshark(packets, expression):
+    table = PacketTable.from_packets(packets)
+
+    with pytest.raises(record_filter.UnsupportedFilterError):
+        record_filter.apply_filter(expression, table)
+
+
+@pytest.mark.skipif(shutil.which("tshark") is None, reason="tshark is not installed")
+@pytest.mark.parametrize("expression", sorted(FILTERS))
+def test_filter_picks_the_packets_tshark_picks(packets, expression):
+    table = PacketTable.from_packets(packets)
+    expected = [(packet.ts_ns, packet.size) for packet in tshark_fields.read_packets(CAPTURE, None, expression)]
+
+    filtered = record_filter.apply_filter(expression, table)
+
+    assert [(packet.ts_ns, packet.size) for packet in filtered] == expected
@@ -0,0 +1,358 @@
+import heapq
+import itertools
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import pyshark.tshark.tshark as tshark
+import packet_extraction
+import pcap_reader
+
+FIELDS = [
+    "frame.time_epoch", "frame.len", "frame.protocols",
+    "ip.src", "ip.dst",
+    "tcp.srcport", "tcp.dstport", "tcp.flags", "tcp.seq", "tcp.ack", "tcp.window_size",
+    "tcp.analysis.retransmission",
+    "udp.srcport", "udp.dstport", "udp.length", "udp.payload",
+    "http.request.method", "http.request.uri", "http.response.code", "http.host",
+    "dns.flags.response", "dns.qry.name", "dns.qry.type", "dns.a",
+    "icmp.type", "icmp.code",
+    "arp.opcode", "arp.src.proto_ipv4", "arp.dst.proto_ipv4",
+    "modbus.func_code", "modbus.exception_code", "mbtcp.trans_id",
+    "dnp3.ctl.prifunc", "dnp3.ctl.secfunc", "dnp3.al.obj",
+    "s7comm.param.func", "s7comm.param.setup_rack_num", "s7comm.param.setup_slot_num", "s7comm.item_data_type",
+    "tls.record.content_type", "tls.handshake.type", "tls.handshake.extensions_server_name",
+    "data.data",
+]
+# Packets captured on several interfaces wait this long to be put in timestamp order.
+REORDER_WINDOW_NS = 500_000_000
+REORDER_MAX_PACKETS = 10000
+
+_available_fields = None
+
+
+class TsharkError(Exception):
+    pass
+
+
+def tshark_path():
+    return tshark.get_process_path()
+
+
+def available_fields():
+    global _available_fields
+    if _available_fields is None:
+        result = subprocess.run([tshark_path(), "-G", "fields"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True, encoding="utf-8", errors="replace")
+        known = set()
+        for line in result.stdout.splitlines():
+            columns = line.split("\t")
+            if len(columns) > 2 and columns[0] == "F":
+                known.add(columns[2])
+        _available_fields = [field for field in FIELDS if field in known] if known else list(FIELDS)
+    return _available_fields
+
+
+def build_command(source_args, display_filter=None):
+    command = [tshark_path(), *source_args, "-n", "-T", "fields",
+               "-E", "separator=/t", "-E", "occurrence=f", "-E", "quote=n", "-E", "header=n"]
+    if display_filter:
+        command += ["-Y", display_filter]
+    for field in available_fields():
+        command += ["-e", field]
+    return command
+
+
+def _int(value):
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return int(value, 16)
+        except ValueError:
+            return None
+
+
+def _timestamp_ns(value):
+    seconds, _, fraction = value.partition(".")
+    return int(seconds) * 1_000_000_000 + int((fraction + "000000000")[:9])
+
+
+def _hex_bytes(value):
+    if not value:
+        return None
+    try:
+        return bytes.fromhex(value.replace(":", ""))
+    except ValueError:
+        return None
+
+
+def _dns_details(response, name, answer):
+    return response in ('1', 'true', 'True'), name, answer
+
+
+def _dnp3_details(prifunc, secfunc, obj):
+    ctl_func = _int(prifunc)
+    if ctl_func is None:
+        ctl_func = _int(secfunc)
+    obj = _int(obj)
+    group = obj >> 8 if obj is not None else None
+    variation = obj & 0xFF if obj is not None else None
+    dnp3_class = variation - 1 if group == 60 and 1 <= variation <= 4 else None
+    return ctl_func, group, dnp3_class
+
+
+def _int_details(*values):
+    return tuple(_int(value) for value in values)
+
+
+def _s7comm_details(*values):
+    # Requests with several items repeat the per-item fields; the first one is shown.
+    return tuple(_int(value.split(",", 1)[0]) for value in values)
+
+
+def _tls_details(content_type, handshake_type, server_name):
+    return _int(content_type), _int(handshake_type), server_name or None
+
+
+def _arp_details(opcode, sender, target):
+    return _int(opcode), sender, target
+
+
+DETAIL_FIELDS = {
+    'HTTP': (("http.request.method", "http.request.uri", "http.response.code", "http.host"), lambda *values: values),
+    'DNS': (("dns.flags.response", "dns.qry.name", "dns.a"), _dns_details),
+    'MDNS': (("dns.qry.name", "dns.qry.type", "dns.a"), lambda *values: values),
+    'ICMP': (("icmp.type", "icmp.code"), lambda *values: values),
+    'ARP': (("arp.opcode", "arp.src.proto_ipv4", "arp.dst.proto_ipv4"), _arp_details),
+    'MODBUS': (("modbus.func_code", "modbus.exception_code", "mbtcp.trans_id"), _int_details),
+    'DNP3': (("dnp3.ctl.prifunc", "dnp3.ctl.secfunc", "dnp3.al.obj"), _dnp3_details),
+    'S7COMM': (("s7comm.param.func", "s7comm.param.setup_rack_num", "s7comm.param.setup_slot_num",
+                "s7comm.item_data_type"), _s7comm_details),
+    'TLS': (("tls.record.content_type", "tls.handshake.type", "tls.handshake.extensions_server_name"),
+            _tls_details),
+}
+
+
+def make_row_parser(columns, live=False):
+    index = {field: i for i, field in enumerate(columns)}
+    width = len(columns)
+    missing = width
+
+    def position(name):
+        return index.get(name, missing)
+
+    time_epoch = position("frame.time_epoch")
+    frame_len = position("frame.len")
+    protocols = position("frame.protocols")
+    ip_src = position("ip.src")
+    ip_dst = position("ip.dst")
+    tcp_srcport = position("tcp.srcport")
+    tcp_dstport = position("tcp.dstport")
+    tcp_flags = position("tcp.flags")
+    tcp_seq = position("tcp.seq")
+    tcp_ack = position("tcp.ack")
+    tcp_window = position("tcp.window_size")
+    tcp_retransmission = position("tcp.analysis.retransmission")
+    udp_srcport = position("udp.srcport")
+    udp_dstport = position("udp.dstport")
+    udp_length = position("udp.length")
+    udp_payload = position("udp.payload")
+    data_data = position("data.data")
+    detail_parsers = {protocol: (tuple(position(name) for name in names), build)
+                      for protocol, (names, build) in DETAIL_FIELDS.items()}
+
+    def parse(line):
+        values = line.rstrip("\r\n").split("\t")
+        if len(values) <= width:
+            values += [""] * (width + 1 - len(values))
+        fields = {
+            "src_ip": sys.intern(values[ip_src]) or "N/A",
+            "dst_ip": sys.intern(values[ip_dst]) or "N/A",
+            "protocol": sys.intern(values[protocols].rsplit(":", 1)[-1].upper()) or "DATA",
+            "l4": 0,
+            "src_port": None,
+            "dst_port": None,
+            "details": None,
+            "data": _hex_bytes(values[data_data][:90].replace(":", "")[:60]),
+        }
+        tcp_state = None
+        if values[udp_srcport]:
+            fields["protocol"] = "UDP"
+            fields["l4"] = 17
+            fields["src_port"] = _int(values[udp_srcport])
+            fields["dst_port"] = _int(values[udp_dstport])
+            fields["details"] = _int(values[udp_length])
+            if live and fields["dst_port"] == packet_extraction.LATENCY_PROBE_PORT:
+                fields["data"] = _hex_bytes(values[udp_payload] or values[data_data])
+            return _timestamp_ns(values[time_epoch]), _int(values[frame_len]) or 0, fields, tcp_state
+        if values[tcp_srcport]:
+            fields["l4"] = 6
+            fields["src_port"] = _int(values[tcp_srcport])
+            fields["dst_port"] = _int(values[tcp_dstport])
+            fields["tcp"] = (None, None, _int(values[tcp_flags]) or 0, None, None)
+            tcp_state = (_int(values[tcp_seq]), _int(values[tcp_ack]), _int(values[tcp_window]),
+                         bool(values[tcp_retransmission]))
+        detail_parser = detail_parsers.get(fields["protocol"])
+        if detail_parser is not None:
+            positions, build = detail_parser
+            fields["details"] = build(*[values[i] for i in positions])
+        return _timestamp_ns(values[time_epoch]), _int(values[frame_len]) or 0, fields, tcp_state
+
+    return parse
+
+
+def _iter_rows(command, stop_event=None):
+    # stderr goes to a file rather than a pipe nobody reads while rows stream in.
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, text=True,
+                                   encoding="utf-8", errors="replace", bufsize=1)
+        try:
+            for line in process.stdout:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                yield line
+            else:
+                # tshark ran to completion; a bad filter or interface only shows in its exit status.
+                if process.wait() != 0:
+                    stderr.seek(0)
+                    message = stderr.read().decode("utf-8", "replace").strip()
+                    raise TsharkError(f"tshark exited with status {process.returncode}: {message}")
+        finally:
+            if process.poll() is None:
+                process.terminate()
+            process.stdout.close()
+            process.wait()
+
+
+def host_display_filter(ip_a, ip_b):
+    """tshark display filter keeping at least the packets ``pcap_reader.matches_hosts`` keeps, or None."""
+    hosts = [ip for ip in (ip_a, ip_b) if ip]
+    if any(not pcap_reader.packed_ipv4(ip) for ip in hosts):
+        return "frame.number == 0"
+    if len(hosts) == 2:
+        return (f"(ip.src == {ip_a} && ip.dst == {ip_b}) || "
+                f"(ip.src == {ip_b} && ip.dst == {ip_a})")
+    if hosts:
+        return f"ip.addr == {hosts[0]}"
+    return None
+
+
+def time_display_filter(time_range):
+    if time_range is None:
+        return None
+    start_ns, end_ns = time_range
+    return (f"frame.time_epoch >= {start_ns // 1_000_000_000}.{start_ns % 1_000_000_000:09d} && "
+            f"frame.time_epoch < {end_ns // 1_000_000_000}.{end_ns % 1_000_000_000:09d}")
+
+
+def read_packets(file_path, filters=None, display_filter=None, timestamp_format="%Y-%m-%d %H:%M:%S",
+                 time_range=None):
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"{file_path} cannot be found")
+    ip_a = filters.get('ip_a') if filters else None
+    ip_b = filters.get('ip_b') if filters else None
+    for extra_filter in (host_display_filter(ip_a, ip_b), time_display_filter(time_range)):
+        if extra_filter:
+            display_filter = f"({display_filter}) && ({extra_filter})" if display_filter else extra_filter
+    command = build_command(["-r", file_path], display_filter)
+    parse = make_row_parser(available_fields())
+    format_timestamp = pcap_reader.TimestampFormatter(timestamp_format)
+
+    for line in _iter_rows(command):
+        try:
+            ts_ns, size, fields, tcp_state = parse(line)
+        except ValueError as e:
+            print(f"Error processing packet: {e}")
+            continue
+        if (ip_a or ip_b) and not pcap_reader.matches_hosts(fields["src_ip"], fields["dst_ip"], ip_a, ip_b):
+            continue
+        yield packet_extraction.make_packet_info(fields, tcp_state, ts_ns, format_timestamp(ts_ns), size)
+
+
+def live_packets(interface, display_filter=None, timestamp_format="%H:%M:%S", stop_event=None):
+    command = build_command(["-i", interface, "-l"], display_filter)
+    parse = make_row_parser(available_fields(), live=True)
+    format_timestamp = pcap_reader.TimestampFormatter(timestamp_format)
+
+    for line in _iter_rows(command, stop_event):
+        try:
+            ts_ns, size, fields, tcp_state = parse(line)
+        except ValueError as e:
+            print(f"Error processing packet: {e}")
+            continue
+        yield packet_extraction.make_packet_info(fields, tcp_state, ts_ns, format_timestamp(ts_ns), size, live=True,
+                                                 interface=interface)
+
+
+_capture_done = object()
+
+
+def live_capture(interfaces, display_filter=None, timestamp_format="%H:%M:%S", stop_event=None,
+                 window_ns=REORDER_WINDOW_NS, max_pending=REORDER_MAX_PACKETS):
+    """Packets captured on one interface or several at once, as a single stream in timestamp order.
+
+    Each interface gets its own tshark process, read by its own thread. The
+    packets wait in a reorder buffer until the clock is ``window_ns`` past
+    their timestamp (tshark stamps live packets with the wall-clock time) or
+    the buffer holds more than ``max_pending``. A packet that arrives later
+    than that is passed on as soon as it comes.
+    """
+    if isinstance(interfaces, str):
+        interfaces = [interfaces]
+    if len(interfaces) == 1:
+        yield from live_packets(interfaces[0], display_filter, timestamp_format, stop_event)
+        return
+
+    arrivals = queue.Queue(maxsize=max_pending)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                arrivals.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def capture(interface):
+        try:
+            for packet in live_packets(interface, display_filter, timestamp_format, stopped):
+                put(packet)
+        except Exception as e:
+            print(f"Error during packet capture on {interface}: {e}")
+        finally:
+            put(_capture_done)
+
+    for interface in interfaces:
+        threading.Thread(target=capture, args=(interface,), daemon=True).start()
+
+    def stopping():
+        return stop_event is not None and stop_event.is_set()
+
+    pending = []
+    order = itertools.count()
+    running = len(interfaces)
+    try:
+        while running and not stopping():
+            try:
+                item = arrivals.get(timeout=window_ns / 2_000_000_000)
+            except queue.Empty:
+                item = None
+            if item is _capture_done:
+                running -= 1
+            elif item is not None:
+                heapq.heappush(pending, (item.ts_ns, next(order), item))
+            watermark = time.time_ns() - window_ns
+            while pending and (pending[0][0] <= watermark or len(pending) > max_pending) and not stopping():
+                yield heapq.heappop(pending)[2]
+        while pending and not stopping():
+            yield heapq.heappop(pending)[2]
+    finally:
+        stopped.set()
@@ -1,8 +1,9 @@
+import argparse
 import curses
+import itertools
 import time
 
-from datetime import datetime
-from pcap_analyzer import wrap_text, clean_string, analyze_packets
+from pcap_analyzer import wrap_text, clean_string, iter_packets, PacketStats
 
 def draw_box(stdscr, x, width, height, content, title=None):
     max_y, max_x = stdscr.getmaxyx()
@@ -28,13 +29,16 @@ def draw_box_protocol(stdscr, x, width, height, content, title=None):
     for i, line in enumerate(content[:height - 2]):
         stdscr.addstr(device_y + i + 1, x + 2, line[:width - 4])
 
-def get_user_input(stdscr):
+def get_user_input(stdscr, file_path=None):
     curses.echo()
     stdscr.clear()
     stdscr.addstr(0, 0, "Zadajte parametre pre spustenie vizualizácie:")
 
     stdscr.addstr(2, 0, "Cesta k súboru PCAP: ")
-    file_path = stdscr.getstr(2, 25).decode('utf-8')
+    if file_path:
+        stdscr.addstr(2, 25, file_path)
+    else:
+        file_path = stdscr.getstr(2, 25).decode('utf-8')
 
     stdscr.addstr(3, 0, "IP adresa zariadenia A: ")
     ip_a = stdscr.getstr(3, 25).decode('utf-8')
@@ -48,10 +52,10 @@ def get_user_input(stdscr):
     curses.noecho()
     return file_path, ip_a, ip_b, replay_speed
 
-def main(stdscr):
+def main(stdscr, file_path=None, session=None):
     stdscr.clear()
     max_y, max_x = stdscr.getmaxyx()
-    file_path, ip_a, ip_b, replay_speed = get_user_input(stdscr)
+    file_path, ip_a, ip_b, replay_speed = get_user_input(stdscr, file_path)
     device_box_width = 20
     device_box_height = 5
     protocol_height = 3
@@ -59,35 +63,40 @@ def main(stdscr):
     device_a_x = 2
     device_b_x = 45
     protocol_x = (device_a_x + device_b_x + device_box_width - protocol_width) // 2
+    stats = PacketStats()
     try:
-        packets = analyze_packets(file_path, {
-            "src_ip": [ip_a, ip_b],
-            "dst_ip": [ip_b, ip_a]
-        })
+        # Only packets between the two hosts (either direction) are replayed.
+        packet_source = iter_packets(file_path, {"ip_a": ip_a, "ip_b": ip_b}, stats=stats, session=session)
+        first_packet = next(packet_source, None)
     except FileNotFoundError:
         stdscr.addstr(max_y - 3, 0, f"Súbor {file_path} neexistuje. Stlačte tlačidlo pre ukončenie programu.")
         stdscr.getch()
         return
-    total_packets = len(packets["filtered_packets"])
+    if first_packet is None:
+        stdscr.addstr(max_y - 3, 0, "IP adresy neboli nájdené v zozname. Stlačte tlačidlo pre ukončenie programu")
+        stdscr.getch()
+        return
 
-    remaining_packets = total_packets
-    protocol_counts = {protocol: 0 for protocol in packets["protocol_counts"].keys()}
     previous_timestamp = None
     progress_bar_width = 50
     current_value = 1
     packet_lines = []
+    # Known up front for a cached capture or a handed-over session; a fresh decode is counted as it goes.
+    total_packets = stats.expected_packets
 
-    for idx, packet_info in enumerate(packets["filtered_packets"], 1):
-        current_timestamp = datetime.strptime(packet_info["timestamp"], "%Y-%m-%d %H:%M:%S")
+    for idx, packet_info in enumerate(itertools.chain([first_packet], packet_source), 1):
+        current_timestamp = packet_info.ts_ns
         if previous_timestamp:
-            delta_time = (current_timestamp - previous_timestamp).total_seconds()
-            time.sleep(delta_time / replay_speed)
+            delta_time = (current_timestamp - previous_timestamp) / 1_000_000_000
+            time.sleep(max(delta_time, 0) / replay_speed)
         previous_timestamp = current_timestamp
 
-        current_timestamp_str = current_timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        sliced_timestamp = current_timestamp_str[11:]
-        num_hashes = int((current_value / total_packets) * progress_bar_width)
-        progress_bar = f"Progress: [{'#' * num_hashes}{' ' * (progress_bar_width - num_hashes)}] {current_value}/{total_packets}"
+        sliced_timestamp = packet_info["timestamp"][11:]
+        if total_packets:
+            num_hashes = int((current_value / total_packets) * progress_bar_width)
+            progress_bar = f"Progress: [{'#' * num_hashes}{' ' * (progress_bar_width - num_hashes)}] {current_value}/{total_packets}"
+        else:
+            progress_bar = f"Progress: {current_value} paketov"
 
         if packet_info["src_ip"] == ip_a or packet_info["src_ip"] == ip_b and packet_info["dst_ip"] == ip_a or packet_info["dst_ip"] == ip_b:
             device_a_content = [f"IP: {ip_a}", f"Port: {packet_info['src_port']}", f"Time: {sliced_timestamp}"]
@@ -101,11 +110,9 @@ def main(stdscr):
 
         stdscr.addstr(1, 2, progress_bar)
 
-        protocol_counts[packet_info["protocol"]] += 1
-
         protocol_y_offset = 2
-        for protocol, count in protocol_counts.items():
-            protocol_percentage = (count / total_packets) * 100
+        for protocol, count in stats.protocol_counts.items():
+            protocol_percentage = (count / (total_packets or stats.total_packets)) * 100
             num_hashes_protocol = int((protocol_percentage / 100) * progress_bar_width)
 
             protocol_bar = f"{protocol}: [{'#' * num_hashes_protocol}{' ' * (progress_bar_width - num_hashes_protocol)}] {protocol_percentage:.2f}%"
@@ -143,12 +150,14 @@ def main(stdscr):
             stdscr.addstr(max_y // 7 + 8 + i, device_a_x, line)
 
         current_value += 1
-        remaining_packets -= 1
-
-        if remaining_packets == 0:
-            stdscr.addstr(max_y - 3, 2, "Vizualizácia ukončená. Stlačte tlačidlo pre ukončenie programu")
-            stdscr.getch()
         stdscr.refresh()
+    else:
+        stdscr.addstr(max_y - 3, 2, "Vizualizácia ukončená. Stlačte tlačidlo pre ukončenie programu")
+        stdscr.getch()
 
 if __name__ == "__main__":
-    curses.wrapper(main)
+    parser = argparse.ArgumentParser(description="Vizualizácia komunikácie dvoch zariadení")
+    parser.add_argument("--pcap_file", help="Cesta k súboru PCAP (voliteľné)")
+    parser.add_argument("--session", help="Dekódovaná relácia odovzdaná z pcap_analyzer (voliteľné)")
+    args = parser.parse_args()
+    curses.wrapper(main, args.pcap_file, args.session)